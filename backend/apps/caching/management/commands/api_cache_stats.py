@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.caching.resources import cache_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Shows hit/miss counts of the API response cache per endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        for endpoint, stats in cache_stats().items():
+            self.stdout.write(
+                f"{endpoint:<24} hits={stats['hits']:<8} misses={stats['misses']:<8} "
+                f"hit_rate={stats['hit_rate']:.1%}"
+            )
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,122 @@
+"""Read-through cache for API responses, keyed by resource version.
+
+A resource is a name such as 'study_groups' or 'meetings:user:7' with a
+version number in the cache. Cached responses embed the versions of the
+resources they were built from, so bumping a version (see signals.py)
+makes every dependent entry unreachable at once; stale entries simply
+expire after their endpoint's TTL from settings.API_CACHE_TTLS.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60
+_MISSING = object()
+
+
+def _version_key(resource):
+    return f'api_version:{resource}'
+
+
+def resource_versions(resources):
+    """Returns the current version of each resource, in order."""
+    keys = [_version_key(resource) for resource in resources]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start from the clock rather than 1, so a version lost to
+            # eviction can never coincide with one used by a live entry.
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(resources):
+    """Invalidates everything cached from these resources.
+
+    Bumps right away, so later reads in this transaction miss, and again on
+    commit, dropping anything a concurrent request cached from the data as
+    it was before the commit.
+    """
+    keys = [_version_key(resource) for resource in set(resources)]
+    if keys:
+        _bump_now(keys)
+        transaction.on_commit(lambda: _bump_now(keys))
+
+
+def _bump_now(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass  # never read yet; the first read starts a fresh version
+
+
+def _stats_key(endpoint, outcome):
+    return f'api_cache_stats:{endpoint}:{outcome}'
+
+
+def record(endpoint, outcome):
+    key = _stats_key(endpoint, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def cache_stats():
+    """{endpoint: {'hits': n, 'misses': n, 'hit_rate': float}} for configured endpoints."""
+    endpoints = list(settings.API_CACHE_TTLS)
+    counts = cache.get_many(
+        [_stats_key(endpoint, outcome) for endpoint in endpoints for outcome in ('hit', 'miss')]
+    )
+    stats = {}
+    for endpoint in endpoints:
+        hits = counts.get(_stats_key(endpoint, 'hit'), 0)
+        misses = counts.get(_stats_key(endpoint, 'miss'), 0)
+        total = hits + misses
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+    return stats
+
+
+def reset_stats():
+    cache.delete_many([
+        _stats_key(endpoint, outcome)
+        for endpoint in settings.API_CACHE_TTLS for outcome in ('hit', 'miss')
+    ])
+
+
+def cached_response(request, endpoint, resources, build, per_user=True):
+    """Serves `endpoint` from the cache, or calls build() and caches it.
+
+    build() returns a DRF Response; only 200 responses are stored. The key
+    covers the query string, the resource versions and, with per_user, the
+    requesting user.
+    """
+    params = sorted(request.query_params.lists())
+    user = request.user.id if per_user else '*'
+    raw = f'{user}|{params}|{resource_versions(resources)}'
+    key = f'api_cache:{endpoint}:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    data = cache.get(key, _MISSING)
+    if data is not _MISSING:
+        record(endpoint, 'hit')
+        return Response(data)
+
+    record(endpoint, 'miss')
+    response = build()
+    if response.status_code == 200:
+        ttl = settings.API_CACHE_TTLS.get(endpoint, DEFAULT_TTL)
+        cache.set(key, response.data, ttl)
+    return response
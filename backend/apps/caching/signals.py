@@ -0,0 +1,101 @@
+"""Maps model changes to the API resources they invalidate.
+
+Resources:
+  study_groups            the group listing (names, counts, flags)
+  study_group:<id>        one group's member list
+  meetings:user:<id>      one user's meeting feed
+  tasks, tasks:group:<id> task boards
+  users                   the user directory
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.group_tasks.models import Task
+from apps.meetings.models import Meeting
+from apps.study_groups.models import StudyGroup
+from .resources import bump
+
+User = get_user_model()
+
+
+def _member_ids(group_ids):
+    return StudyGroup.members.through.objects.filter(
+        studygroup_id__in=list(group_ids)
+    ).values_list('user_id', flat=True)
+
+
+def invalidate_group_meetings(group_ids):
+    """For bulk meeting updates, which send no signals."""
+    bump(f'meetings:user:{user_id}' for user_id in _member_ids(group_ids))
+
+
+@receiver(post_save, sender=StudyGroup)
+@receiver(post_delete, sender=StudyGroup)
+def group_changed(sender, instance, **kwargs):
+    # Meeting and task lists embed or filter on the group too.
+    bump(['study_groups', f'study_group:{instance.pk}', 'tasks', f'tasks:group:{instance.pk}'])
+    invalidate_group_meetings([instance.pk])
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    through = StudyGroup.members.through.objects
+    if reverse:
+        # user.joined_groups.add(...): instance is the user
+        user_ids = [instance.pk]
+        if action == 'pre_clear':
+            group_ids = list(through.filter(user_id=instance.pk).values_list('studygroup_id', flat=True))
+        elif action in ('post_add', 'post_remove'):
+            group_ids = pk_set
+        else:
+            return
+    else:
+        group_ids = [instance.pk]
+        if action == 'pre_clear':
+            user_ids = list(_member_ids(group_ids))
+        elif action in ('post_add', 'post_remove'):
+            user_ids = pk_set
+        else:
+            return
+    bump(
+        ['study_groups']
+        + [f'study_group:{group_id}' for group_id in group_ids]
+        + [f'meetings:user:{user_id}' for user_id in user_ids]
+    )
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def meeting_changed(sender, instance, **kwargs):
+    invalidate_group_meetings([instance.study_group_id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    bump(['tasks', f'tasks:group:{instance.group_id}'])
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.assigned_tasks.add(...): instance is the user
+        if action == 'pre_clear':
+            tasks = Task.objects.filter(assigned_to=instance)
+        elif action in ('post_add', 'post_remove'):
+            tasks = Task.objects.filter(pk__in=pk_set)
+        else:
+            return
+        group_ids = set(tasks.values_list('group_id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        group_ids = {instance.group_id}
+    else:
+        return
+    bump(['tasks'] + [f'tasks:group:{group_id}' for group_id in group_ids])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    bump(['users'])
@@ -0,0 +1,132 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.group_tasks.models import Task
+from apps.meetings.models import Meeting
+from apps.study_groups.models import StudyGroup
+from .resources import cache_stats
+
+User = get_user_model()
+
+
+class ApiCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='cached@nyu.edu',
+            password='segroup2',
+            first_name='Cached',
+            last_name='User',
+            is_verified=True
+        )
+        self.other = User.objects.create_user(
+            email='other@nyu.edu',
+            password='segroup2',
+            first_name='Other',
+            last_name='User',
+            is_verified=True
+        )
+        self.group = StudyGroup.objects.create(
+            name='Databases',
+            description='Indexes',
+            subject='CS',
+            creator=self.user,
+            max_members=10
+        )
+        self.group.add_member(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_hit_serves_without_queries(self):
+        first = self.client.get('/api/study-groups/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/study-groups/')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(cache_stats()['study_groups.list'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_query_string_and_user_are_part_of_the_key(self):
+        self.client.get('/api/study-groups/')
+        self.client.get('/api/study-groups/', {'subject': 'CS'})
+        other = APIClient()
+        other.force_authenticate(user=self.other)
+        other.get('/api/study-groups/')
+        self.assertEqual(cache_stats()['study_groups.list']['misses'], 3)
+
+    def test_group_changes_invalidate_list_and_members(self):
+        self.client.get('/api/study-groups/')
+        self.assertEqual(len(self.client.get(f'/api/study-groups/{self.group.id}/members/').json()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.add_member(self.other)
+        members = self.client.get(f'/api/study-groups/{self.group.id}/members/').json()
+        self.assertEqual({member['id'] for member in members}, {self.user.id, self.other.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.name = 'Distributed Databases'
+            self.group.save()
+        names = [group['name'] for group in self.client.get('/api/study-groups/').json()]
+        self.assertIn('Distributed Databases', names)
+
+    def test_cached_members_are_still_checked_against_the_requester(self):
+        self.client.get(f'/api/study-groups/{self.group.id}/members/')
+        outsider = APIClient()
+        outsider.force_authenticate(user=self.other)
+        response = outsider.get(f'/api/study-groups/{self.group.id}/members/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(cache_stats()['study_groups.members']['hits'], 1)
+
+    def test_meeting_save_invalidates_member_feeds(self):
+        self.assertEqual(self.client.get('/api/meetings/').json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Meeting.objects.create(study_group=self.group, title='Kickoff', creator=self.user)
+        titles = [meeting['title'] for meeting in self.client.get('/api/meetings/').json()]
+        self.assertEqual(titles, ['Kickoff'])
+
+    def test_task_changes_invalidate_the_group_board(self):
+        url = f'/api/group_tasks/?group_id={self.group.id}'
+        self.assertEqual(self.client.get(url).json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(group=self.group, title='Normalize schema')
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_to.add(self.other)
+        self.assertEqual(self.client.get(url).json()[0]['assigned_to'], [self.other.id])
+
+    def test_user_directory_is_shared_but_excludes_the_requester(self):
+        mine = self.client.get('/api/users/').json()
+        other = APIClient()
+        other.force_authenticate(user=self.other)
+        theirs = other.get('/api/users/').json()
+        self.assertEqual([user['id'] for user in mine], [self.other.id])
+        self.assertEqual([user['id'] for user in theirs], [self.user.id])
+        self.assertEqual(cache_stats()['users.list'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    @override_settings(API_CACHE_TTLS={'study_groups.list': 15})
+    def test_entries_use_the_endpoint_ttl(self):
+        with mock.patch('apps.caching.resources.cache.set', wraps=cache.set) as cache_set:
+            self.client.get('/api/study-groups/')
+        ttls = [call.args[2] for call in cache_set.call_args_list if call.args[0].startswith('api_cache:')]
+        self.assertEqual(ttls, [15])
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/api/meetings/', {'status': 'BOGUS'})
+        response = self.client.get('/api/meetings/', {'status': 'BOGUS'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(cache_stats()['meetings.list']['misses'], 2)
+
+    def test_stats_command_prints_and_resets(self):
+        self.client.get('/api/study-groups/')
+        self.client.get('/api/study-groups/')
+        out = StringIO()
+        call_command('api_cache_stats', '--reset', stdout=out)
+        self.assertIn('study_groups.list', out.getvalue())
+        self.assertIn('hit_rate=50.0%', out.getvalue())
+        self.assertEqual(cache_stats()['study_groups.list']['hits'], 0)
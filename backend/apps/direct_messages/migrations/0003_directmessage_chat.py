@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='directmessage',
+            name='chat',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='direct_messages.directchat'),
+        ),
+        migrations.AlterField(
+            model_name='directchat',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='direct_messages.directmessage'),
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['chat', 'timestamp', 'id'], name='dm_chat_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def attach_messages_to_chats(apps, schema_editor):
+    """Points every existing DirectMessage at the chat between its two users.
+
+    Pairs that only ever messaged through /messages/ have no DirectChat
+    yet; one is created for them.
+    """
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    DirectChat = apps.get_model('direct_messages', 'DirectChat')
+    Participant = DirectChat.participants.through
+
+    members = {}
+    for chat_id, user_id in Participant.objects.values_list('directchat_id', 'user_id').order_by('directchat_id'):
+        members.setdefault(chat_id, set()).add(user_id)
+    chat_for_pair = {}
+    for chat_id, user_ids in members.items():
+        if len(user_ids) == 2:
+            chat_for_pair.setdefault(tuple(sorted(user_ids)), chat_id)
+
+    pairs = {
+        tuple(sorted(pair))
+        for pair in DirectMessage.objects.filter(chat__isnull=True).values_list('sender_id', 'receiver_id').distinct()
+    }
+    for low, high in sorted(pairs):
+        if low == high:
+            continue
+        chat_id = chat_for_pair.get((low, high))
+        if chat_id is None:
+            chat_id = DirectChat.objects.create().id
+            Participant.objects.bulk_create([
+                Participant(directchat_id=chat_id, user_id=low),
+                Participant(directchat_id=chat_id, user_id=high),
+            ])
+        DirectMessage.objects.filter(chat__isnull=True).filter(
+            Q(sender_id=low, receiver_id=high) | Q(sender_id=high, receiver_id=low)
+        ).update(chat_id=chat_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0003_directmessage_chat'),
+    ]
+
+    operations = [
+        migrations.RunPython(attach_messages_to_chats, migrations.RunPython.noop),
+    ]
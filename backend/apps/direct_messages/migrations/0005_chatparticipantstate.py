@@ -0,0 +1,57 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_chat_state(apps, schema_editor):
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    DirectChat = apps.get_model('direct_messages', 'DirectChat')
+    ChatParticipantState = apps.get_model('direct_messages', 'ChatParticipantState')
+    Participant = DirectChat.participants.through
+
+    unread = {
+        (row['chat_id'], row['receiver_id']): row['total']
+        for row in DirectMessage.objects.filter(is_read=False, chat__isnull=False)
+        .values('chat_id', 'receiver_id').annotate(total=Count('id'))
+    }
+    ChatParticipantState.objects.bulk_create(
+        [
+            ChatParticipantState(chat_id=chat_id, user_id=user_id, unread_count=unread.get((chat_id, user_id), 0))
+            for chat_id, user_id in Participant.objects.values_list('directchat_id', 'user_id').iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+    latest = DirectMessage.objects.filter(chat_id=OuterRef('pk')).order_by('-timestamp', '-id')
+    DirectChat.objects.filter(pk__in=DirectMessage.objects.values('chat_id')).update(
+        last_message_id=Subquery(latest.values('id')[:1]),
+        updated_at=Subquery(latest.values('timestamp')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('direct_messages', '0004_backfill_directmessage_chat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatParticipantState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('chat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participant_states', to='direct_messages.directchat')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('chat', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_chat_state, migrations.RunPython.noop),
+    ]
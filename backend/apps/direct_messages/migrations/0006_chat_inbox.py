@@ -0,0 +1,41 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:06
+
+from django.db import migrations, models
+import django.utils.timezone
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def backfill_inbox_state(apps, schema_editor):
+    DirectChat = apps.get_model('direct_messages', 'DirectChat')
+    DeletedChat = apps.get_model('direct_messages', 'DeletedChat')
+    ChatParticipantState = apps.get_model('direct_messages', 'ChatParticipantState')
+
+    ChatParticipantState.objects.update(
+        updated_at=Subquery(DirectChat.objects.filter(pk=OuterRef('chat_id')).values('updated_at')[:1]),
+        hidden=Exists(DeletedChat.objects.filter(chat_id=OuterRef('chat_id'), user_id=OuterRef('user_id')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0005_chatparticipantstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatparticipantstate',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='chatparticipantstate',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='chatparticipantstate',
+            index=models.Index(fields=['user', 'hidden', '-updated_at', '-chat'], name='chatstate_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_inbox_state, migrations.RunPython.noop),
+    ]
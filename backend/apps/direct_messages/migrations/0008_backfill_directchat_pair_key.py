@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+def assign_pair_keys(apps, schema_editor):
+    """Fills min_user/max_user for 1:1 chats, merging duplicate chats per pair.
+
+    The oldest chat of a pair is kept. Messages of the duplicates move to
+    it and their unread counters are added to it before the duplicates are
+    deleted, so the unique constraint can be created afterwards.
+    """
+    DirectChat = apps.get_model('direct_messages', 'DirectChat')
+    DirectMessage = apps.get_model('direct_messages', 'DirectMessage')
+    ChatParticipantState = apps.get_model('direct_messages', 'ChatParticipantState')
+    Participant = DirectChat.participants.through
+
+    members = {}
+    for chat_id, user_id in Participant.objects.values_list('directchat_id', 'user_id'):
+        members.setdefault(chat_id, set()).add(user_id)
+    chats_by_pair = {}
+    for chat_id, user_ids in sorted(members.items()):
+        if len(user_ids) == 2:
+            chats_by_pair.setdefault(tuple(sorted(user_ids)), []).append(chat_id)
+
+    for (low, high), chat_ids in chats_by_pair.items():
+        keeper, duplicates = chat_ids[0], chat_ids[1:]
+        if duplicates:
+            DirectMessage.objects.filter(chat_id__in=duplicates).update(chat_id=keeper)
+            for user_id in (low, high):
+                states = list(ChatParticipantState.objects.filter(chat_id__in=chat_ids, user_id=user_id))
+                kept = next((state for state in states if state.chat_id == keeper), None)
+                if kept is None:
+                    continue
+                kept.unread_count = sum(state.unread_count for state in states)
+                kept.hidden = all(state.hidden for state in states)
+                kept.updated_at = max(state.updated_at for state in states)
+                kept.save(update_fields=['unread_count', 'hidden', 'updated_at'])
+            DirectChat.objects.filter(id__in=duplicates).delete()
+            latest = DirectMessage.objects.filter(chat_id=keeper).order_by('-timestamp', '-id').first()
+            if latest is not None:
+                DirectChat.objects.filter(id=keeper).update(last_message=latest, updated_at=latest.timestamp)
+        DirectChat.objects.filter(id=keeper).update(min_user_id=low, max_user_id=high)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0007_directchat_pair_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_pair_keys, migrations.RunPython.noop),
+    ]
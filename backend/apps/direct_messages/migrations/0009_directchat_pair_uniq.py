@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0008_backfill_directchat_pair_key'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='directchat',
+            constraint=models.UniqueConstraint(condition=models.Q(('min_user__isnull', False)), fields=('min_user', 'max_user'), name='directchat_pair_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0009_directchat_pair_uniq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['chat', 'receiver', 'id'], name='dm_unread_idx'),
+        ),
+    ]
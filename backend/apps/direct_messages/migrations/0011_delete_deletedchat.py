@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def move_deleted_chats_to_state(apps, schema_editor):
+    """Makes ChatParticipantState.hidden the only record of a deleted chat.
+
+    Existing state rows keep their hidden flag (0008 already decided it when
+    it merged duplicate chats); a DeletedChat without a state row becomes a
+    hidden state row.
+    """
+    DeletedChat = apps.get_model('direct_messages', 'DeletedChat')
+    ChatParticipantState = apps.get_model('direct_messages', 'ChatParticipantState')
+
+    existing = set(ChatParticipantState.objects.values_list('chat_id', 'user_id'))
+    ChatParticipantState.objects.bulk_create([
+        ChatParticipantState(chat_id=deleted.chat_id, user_id=deleted.user_id, hidden=True,
+                             updated_at=deleted.chat.updated_at)
+        for deleted in DeletedChat.objects.select_related('chat')
+        if (deleted.chat_id, deleted.user_id) not in existing
+    ], batch_size=1000)
+
+
+def restore_deleted_chats(apps, schema_editor):
+    DeletedChat = apps.get_model('direct_messages', 'DeletedChat')
+    ChatParticipantState = apps.get_model('direct_messages', 'ChatParticipantState')
+
+    DeletedChat.objects.bulk_create([
+        DeletedChat(chat_id=chat_id, user_id=user_id)
+        for chat_id, user_id in ChatParticipantState.objects.filter(hidden=True).values_list('chat_id', 'user_id')
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('direct_messages', '0010_directmessage_unread_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_deleted_chats_to_state, restore_deleted_chats),
+        migrations.DeleteModel(
+            name='DeletedChat',
+        ),
+    ]
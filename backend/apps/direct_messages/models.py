@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class DirectMessage(models.Model):
+    chat = models.ForeignKey('DirectChat', on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_direct_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_direct_messages')
     content = models.TextField()
@@ -12,28 +16,219 @@ class DirectMessage(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['chat', 'timestamp', 'id'], name='dm_chat_ts_idx'),
+            models.Index(fields=['chat', 'receiver', 'id'], condition=models.Q(is_read=False), name='dm_unread_idx'),
+        ]
         
     def __str__(self):
         return f"{self.sender.get_full_name()} to {self.receiver.get_full_name()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 class DirectChat(models.Model):
     participants = models.ManyToManyField(User, related_name='direct_chats')
-    last_message = models.ForeignKey(DirectMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='chat')
+    # The two participants ordered by id: one row per pair, enforced by the DB.
+    min_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    max_user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    last_message = models.ForeignKey(DirectMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-updated_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['min_user', 'max_user'],
+                condition=models.Q(min_user__isnull=False),
+                name='directchat_pair_uniq'
+            ),
+        ]
+
+    @classmethod
+    def get_or_create_between(cls, user, other_user):
+        """Returns (chat, created) for the 1:1 chat between two users.
+
+        The lookup is a single fetch on the pair key. When two requests race
+        to create the same chat, the unique constraint rejects the second
+        insert and that request returns the winner's row. Raises ValueError
+        when both users are the same.
+        """
+        if user.pk == other_user.pk:
+            raise ValueError('A direct chat needs two different users.')
+        low, high = sorted([user, other_user], key=lambda u: u.pk)
+        chat = cls.objects.filter(min_user=low, max_user=high).first()
+        if chat is not None:
+            return chat, False
+        try:
+            with transaction.atomic():
+                chat = cls.objects.create(min_user=low, max_user=high)
+                chat.participants.add(low, high)
+                ChatParticipantState.objects.bulk_create([
+                    ChatParticipantState(chat=chat, user=low, updated_at=chat.updated_at),
+                    ChatParticipantState(chat=chat, user=high, updated_at=chat.updated_at),
+                ])
+        except IntegrityError:
+            return cls.objects.get(min_user=low, max_user=high), False
+        return chat, True
+
+    @classmethod
+    def between(cls, user, other_user):
+        """Returns the chat between two users, creating it if needed."""
+        return cls.get_or_create_between(user, other_user)[0]
+
+    def post_message(self, sender, receiver, content):
+        """Creates a message and updates the chat's denormalized state with it.
+
+        last_message, updated_at and the receiver's unread counter change in
+        the same transaction as the insert, using UPDATEs relative to the
+        stored values so concurrent senders never lose an increment.
+        """
+        with transaction.atomic():
+            message = DirectMessage.objects.create(
+                chat=self, sender=sender, receiver=receiver, content=content
+            )
+            DirectChat.objects.filter(pk=self.pk).update(last_message=message, updated_at=message.timestamp)
+            ChatParticipantState.increment_unread(self, receiver, 1)
+            ChatParticipantState.objects.filter(chat=self).update(updated_at=message.timestamp)
+        self.last_message = message
+        self.updated_at = message.timestamp
+        return message
+
+    @classmethod
+    def post_batch(cls, sender, outgoing):
+        """Sends many messages at once; `outgoing` is a list of (receiver, content).
+
+        Existing chats are fetched in one query and the messages inserted
+        with one bulk_create. Each chat's last_message/updated_at and the
+        receivers' unread counters are then updated with one CASE UPDATE per
+        table, so the cost does not grow with the batch.
+        """
+        from .signals import messages_bulk_created
+
+        receivers = {receiver.pk: receiver for receiver, _ in outgoing}
+        chats = {}
+        for chat in cls.objects.filter(
+            Q(min_user=sender, max_user_id__in=list(receivers)) |
+            Q(max_user=sender, min_user_id__in=list(receivers))
+        ):
+            chats[chat.max_user_id if chat.min_user_id == sender.pk else chat.min_user_id] = chat
+        for receiver_id, receiver in receivers.items():
+            if receiver_id not in chats:
+                chats[receiver_id] = cls.between(sender, receiver)
+
+        with transaction.atomic():
+            messages = DirectMessage.objects.bulk_create([
+                DirectMessage(chat=chats[receiver.pk], sender=sender, receiver=receiver, content=content)
+                for receiver, content in outgoing
+            ])
+            latest, unread = {}, {}
+            for message in messages:
+                latest[message.chat_id] = message
+                unread[message.chat_id] = unread.get(message.chat_id, 0) + 1
+
+            cls.objects.filter(pk__in=latest).update(
+                last_message=Case(
+                    *[When(pk=chat_id, then=Value(m.pk)) for chat_id, m in latest.items()],
+                    output_field=models.BigIntegerField()
+                ),
+                updated_at=Case(
+                    *[When(pk=chat_id, then=Value(m.timestamp)) for chat_id, m in latest.items()],
+                    output_field=models.DateTimeField()
+                )
+            )
+            ChatParticipantState.objects.filter(chat_id__in=latest).update(
+                unread_count=Case(
+                    *[When(chat_id=chat_id, user_id=latest[chat_id].receiver_id, then=F('unread_count') + n)
+                      for chat_id, n in unread.items()],
+                    default=F('unread_count'),
+                    output_field=models.IntegerField()
+                ),
+                updated_at=Case(
+                    *[When(chat_id=chat_id, then=Value(m.timestamp)) for chat_id, m in latest.items()],
+                    output_field=models.DateTimeField()
+                )
+            )
+            messages_bulk_created.send(sender=DirectMessage, messages=messages)
+        return messages
         
     def __str__(self):
         return f"Chat between {', '.join([p.get_full_name() for p in self.participants.all()])}"
 
-class DeletedChat(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deleted_chats')
-    chat = models.ForeignKey(DirectChat, on_delete=models.CASCADE, related_name='deleted_by_users')
-    deleted_at = models.DateTimeField(auto_now_add=True)
+class ChatParticipantState(models.Model):
+    """Per-user view of a chat; unread_count is maintained by post_message/mark_read.
+
+    updated_at mirrors DirectChat.updated_at and hidden marks a chat the user
+    deleted, so a user's inbox is a range scan over chatstate_inbox_idx alone.
+    """
+    chat = models.ForeignKey(DirectChat, on_delete=models.CASCADE, related_name='participant_states')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_states')
+    unread_count = models.PositiveIntegerField(default=0)
+    hidden = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(default=now)
 
     class Meta:
-        unique_together = ['user', 'chat']
-        
+        unique_together = ['chat', 'user']
+        indexes = [
+            models.Index(fields=['user', 'hidden', '-updated_at', '-chat'], name='chatstate_inbox_idx'),
+        ]
+
     def __str__(self):
-        return f"Chat {self.chat.id} deleted by {self.user.get_full_name()}" 
\ No newline at end of file
+        return f"{self.user_id} in chat {self.chat_id}: {self.unread_count} unread"
+
+    @classmethod
+    def increment_unread(cls, chat, user, amount):
+        if not cls.objects.filter(chat=chat, user=user).update(unread_count=F('unread_count') + amount):
+            state, created = cls.objects.get_or_create(chat=chat, user=user, defaults={'unread_count': amount})
+            if not created:
+                cls.objects.filter(pk=state.pk).update(unread_count=F('unread_count') + amount)
+
+    @classmethod
+    def mark_read(cls, user, messages):
+        """Marks `user`'s unread messages among `messages` read; returns how many changed.
+
+        The rows are locked first so a concurrent call cannot decrement the
+        same messages twice; every affected chat's counter is then lowered
+        in a single UPDATE.
+        """
+        with transaction.atomic():
+            rows = list(
+                messages.filter(receiver=user, is_read=False)
+                .select_for_update().values_list('id', 'chat_id')
+            )
+            if not rows:
+                return 0
+            DirectMessage.objects.filter(id__in=[pk for pk, _ in rows]).update(is_read=True)
+
+            per_chat = {}
+            for _, chat_id in rows:
+                if chat_id is not None:
+                    per_chat[chat_id] = per_chat.get(chat_id, 0) + 1
+            if per_chat:
+                cls.objects.filter(user=user, chat_id__in=per_chat).update(
+                    unread_count=Greatest(
+                        Case(
+                            *[When(chat_id=chat_id, then=F('unread_count') - n) for chat_id, n in per_chat.items()],
+                            default=F('unread_count'),
+                            output_field=models.IntegerField()
+                        ),
+                        0,
+                        output_field=models.IntegerField()
+                    )
+                )
+        return len(rows)
+
+    @classmethod
+    def mark_read_up_to(cls, user, chat, message_id):
+        """Watermark receipt: everything `user` received in `chat` up to message_id is read.
+
+        One ranged UPDATE over the unread partial index flips the rows; its
+        row count is what the counter is lowered by. Rows another request
+        already flipped are not matched again, so retries are harmless.
+        """
+        with transaction.atomic():
+            count = DirectMessage.objects.filter(
+                chat=chat, receiver=user, is_read=False, id__lte=message_id
+            ).update(is_read=True)
+            if count:
+                cls.objects.filter(chat=chat, user=user).update(
+                    unread_count=Greatest(F('unread_count') - count, 0, output_field=models.IntegerField())
+                )
+        return count
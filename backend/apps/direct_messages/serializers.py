@@ -26,4 +26,37 @@ class DirectChatSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = DirectChat
-        fields = ['id', 'participants', 'last_message', 'updated_at'] 
\ No newline at end of file
+        fields = ['id', 'participants', 'last_message', 'updated_at'] 
+
+class InboxEntrySerializer(serializers.Serializer):
+    """One inbox row, built from a ChatParticipantState (see DirectChatViewSet.inbox)."""
+    PREVIEW_LENGTH = 100
+
+    id = serializers.IntegerField(source='chat_id')
+    counterpart = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
+
+    def get_counterpart(self, obj):
+        user = self.context['counterparts'].get(obj.counterpart_id)
+        if user is None:
+            return None
+        return {
+            'id': user.id,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'email': user.email,
+        }
+
+    def get_last_message(self, obj):
+        message = obj.chat.last_message
+        if message is None:
+            return None
+        return {
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'preview': message.content[:self.PREVIEW_LENGTH],
+            'timestamp': message.timestamp,
+            'is_read': message.is_read,
+        }
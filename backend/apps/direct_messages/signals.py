@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by DirectChat.post_batch, since bulk_create does not send post_save.
+# Receivers get `messages`, the list of created DirectMessage instances.
+messages_bulk_created = Signal()
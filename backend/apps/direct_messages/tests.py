@@ -1,12 +1,19 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import DirectChat, DirectMessage
-from datetime import datetime, timezone
+from .models import DirectChat, DirectMessage, ChatParticipantState
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+from datetime import datetime, timedelta, timezone
+from importlib import import_module
 import json
 
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 User = get_user_model()
 
 class DirectMessagesTests(TestCase):
@@ -172,4 +179,478 @@ class DirectMessagesTests(TestCase):
 
         self.client.force_authenticate(user=self.user2)
         response = self.client.get(list_url)
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data), 1)
+
+
+class DirectChatHistoryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.dm@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob.dm@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        self.carol = User.objects.create_user(
+            email='carol.dm@nyu.edu',
+            password='segroup2',
+            first_name='Carol',
+            last_name='C'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+
+    def send(self, receiver, content):
+        response = self.client.post(
+            reverse('direct-message-list'), {'receiver': receiver.id, 'content': content}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_send_files_message_under_chat(self):
+        first = self.send(self.bob, 'Hi Bob')
+        second = self.send(self.bob, 'Still there?')
+        self.send(self.carol, 'Hi Carol')
+
+        chat = DirectChat.objects.get(messages__id=first)
+        self.assertEqual(set(chat.participants.values_list('id', flat=True)), {self.alice.id, self.bob.id})
+        self.assertEqual(DirectMessage.objects.get(id=second).chat_id, chat.id)
+        self.assertEqual(DirectChat.objects.count(), 2)
+
+    def test_messages_are_keyset_paginated(self):
+        ids = [self.send(self.bob, f'message {i}') for i in range(5)]
+        chat = DirectChat.objects.get(messages__id=ids[0])
+        url = reverse('direct-chat-messages', args=[chat.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': 2})
+        self.assertEqual([m['id'] for m in response.data], ids[3:])
+        self.assertLessEqual(len(queries), 2)
+
+        response = self.client.get(url, {'before': ids[3], 'limit': 2})
+        self.assertEqual([m['id'] for m in response.data], ids[1:3])
+
+        response = self.client.get(url, {'since_id': ids[2]})
+        self.assertEqual([m['id'] for m in response.data], ids[3:])
+
+        response = self.client.get(url, {'before': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.carol)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_backfill_attaches_orphaned_messages(self):
+        chat = DirectChat.objects.create()
+        chat.participants.add(self.alice, self.bob)
+        to_bob = DirectMessage.objects.create(sender=self.alice, receiver=self.bob, content='old')
+        from_bob = DirectMessage.objects.create(sender=self.bob, receiver=self.alice, content='reply')
+        to_carol = DirectMessage.objects.create(sender=self.carol, receiver=self.alice, content='hey')
+
+        migration = import_module('apps.direct_messages.migrations.0004_backfill_directmessage_chat')
+        migration.attach_messages_to_chats(apps, None)
+
+        self.assertEqual(DirectMessage.objects.get(id=to_bob.id).chat_id, chat.id)
+        self.assertEqual(DirectMessage.objects.get(id=from_bob.id).chat_id, chat.id)
+        carol_chat = DirectMessage.objects.get(id=to_carol.id).chat
+        self.assertEqual(
+            set(carol_chat.participants.values_list('id', flat=True)), {self.alice.id, self.carol.id}
+        )
+
+
+class ChatCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.count@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob.count@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        self.carol = User.objects.create_user(
+            email='carol.count@nyu.edu',
+            password='segroup2',
+            first_name='Carol',
+            last_name='C'
+        )
+        self.client = APIClient()
+
+    def send(self, sender, receiver, content):
+        self.client.force_authenticate(user=sender)
+        response = self.client.post(
+            reverse('direct-message-list'), {'receiver': receiver.id, 'content': content}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def unread_for(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(reverse('direct-message-unread-count')).data['unread_count']
+
+    def test_send_updates_last_message_and_counter(self):
+        self.send(self.alice, self.bob, 'one')
+        last = self.send(self.alice, self.bob, 'two')
+        self.send(self.carol, self.bob, 'hello')
+
+        chat = DirectChat.between(self.alice, self.bob)
+        self.assertEqual(chat.last_message_id, last)
+        self.assertEqual(chat.updated_at, DirectMessage.objects.get(id=last).timestamp)
+        state = ChatParticipantState.objects.get(chat=chat, user=self.bob)
+        self.assertEqual(state.unread_count, 2)
+        self.assertEqual(ChatParticipantState.objects.get(chat=chat, user=self.alice).unread_count, 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.unread_for(self.bob), 3)
+        self.assertEqual(len(queries), 1)
+
+    def test_mark_as_read_decrements_per_chat(self):
+        first = self.send(self.alice, self.bob, 'one')
+        second = self.send(self.alice, self.bob, 'two')
+        from_carol = self.send(self.carol, self.bob, 'hello')
+        own = self.send(self.bob, self.alice, 'reply')
+
+        self.client.force_authenticate(user=self.bob)
+        url = reverse('direct-message-mark-as-read')
+        self.client.post(url, {'message_ids': [first, from_carol, own]}, format='json')
+        # Repeating the call must not decrement again.
+        self.client.post(url, {'message_ids': [first, from_carol]}, format='json')
+
+        self.assertEqual(self.unread_for(self.bob), 1)
+        self.assertEqual(self.unread_for(self.alice), 1)
+        self.assertFalse(DirectMessage.objects.get(id=own).is_read)
+        self.assertFalse(DirectMessage.objects.get(id=second).is_read)
+
+    def test_backfill_builds_counters(self):
+        chat = DirectChat.objects.create()
+        chat.participants.add(self.alice, self.bob)
+        DirectMessage.objects.create(chat=chat, sender=self.alice, receiver=self.bob, content='a')
+        latest = DirectMessage.objects.create(chat=chat, sender=self.alice, receiver=self.bob, content='b')
+
+        migration = import_module('apps.direct_messages.migrations.0005_chatparticipantstate')
+        migration.backfill_chat_state(apps, None)
+
+        chat.refresh_from_db()
+        self.assertEqual(chat.last_message_id, latest.id)
+        self.assertEqual(ChatParticipantState.objects.get(chat=chat, user=self.bob).unread_count, 2)
+        self.assertEqual(ChatParticipantState.objects.get(chat=chat, user=self.alice).unread_count, 0)
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.inbox@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse('direct-chat-inbox')
+
+    def seed_chats(self, count):
+        """Bulk-creates `count` chats for Alice, each with one unread message."""
+        others = User.objects.bulk_create([
+            User(email=f'peer{i}@nyu.edu', first_name='Peer', last_name=str(i), password='!')
+            for i in range(count)
+        ])
+        chats = DirectChat.objects.bulk_create([DirectChat() for _ in range(count)])
+        Participant = DirectChat.participants.through
+        Participant.objects.bulk_create(
+            [Participant(directchat=chat, user=self.alice) for chat in chats] +
+            [Participant(directchat=chat, user=other) for chat, other in zip(chats, others)]
+        )
+        messages = DirectMessage.objects.bulk_create([
+            DirectMessage(chat=chat, sender=other, receiver=self.alice, content=f'hello from {other.last_name}')
+            for chat, other in zip(chats, others)
+        ])
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for i, (chat, message) in enumerate(zip(chats, messages)):
+            chat.last_message = message
+            chat.updated_at = start + timedelta(minutes=i)
+        DirectChat.objects.bulk_update(chats, ['last_message', 'updated_at'])
+        ChatParticipantState.objects.bulk_create(
+            [ChatParticipantState(chat=chat, user=self.alice, unread_count=1, updated_at=chat.updated_at) for chat in chats] +
+            [ChatParticipantState(chat=chat, user=other, updated_at=chat.updated_at) for chat, other in zip(chats, others)]
+        )
+        return chats, others
+
+    def test_inbox_entries(self):
+        bob = User.objects.create_user(
+            email='bob.inbox@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        carol = User.objects.create_user(
+            email='carol.inbox@nyu.edu',
+            password='segroup2',
+            first_name='Carol',
+            last_name='C'
+        )
+        DirectChat.between(self.alice, bob).post_message(bob, self.alice, 'x' * 300)
+        carol_chat = DirectChat.between(self.alice, carol)
+        carol_chat.post_message(self.alice, carol, 'latest')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = response.data
+        self.assertEqual(first['counterpart']['email'], 'carol.inbox@nyu.edu')
+        self.assertEqual(first['unread_count'], 0)
+        self.assertEqual(first['last_message']['preview'], 'latest')
+        self.assertEqual(second['unread_count'], 1)
+        self.assertEqual(len(second['last_message']['preview']), 100)
+
+        self.client.delete(reverse('direct-chat-detail', args=[carol_chat.id]))
+        self.assertEqual([c['counterpart']['first_name'] for c in self.client.get(self.url).data], ['Bob'])
+
+    def test_benchmark_thousands_of_chats(self):
+        chats, _ = self.seed_chats(2000)
+
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(self.url, {'limit': 50})
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['id'], chats[-1].id)
+        self.assertEqual(response.data[0]['counterpart']['last_name'], '1999')
+
+        with CaptureQueriesContext(connection) as deep_page:
+            response = self.client.get(self.url, {'limit': 50, 'before': chats[1000].id})
+        self.assertEqual(response.data[0]['id'], chats[999].id)
+
+        self.assertEqual(len(first_page), 2)
+        self.assertEqual(len(deep_page), 3)
+
+    def test_chat_list_reads_the_inbox_index(self):
+        chats, _ = self.seed_chats(2000)
+        list_url = reverse('direct-chat-list')
+
+        with CaptureQueriesContext(connection) as page:
+            response = self.client.get(list_url, {'limit': 50, 'before': chats[1000].id})
+        self.assertEqual([chat['id'] for chat in response.data], [chat.id for chat in reversed(chats[950:1000])])
+        self.assertEqual(response.data[0]['last_message']['content'], 'hello from 999')
+
+        with CaptureQueriesContext(connection) as everything:
+            response = self.client.get(list_url)
+        self.assertEqual(len(response.data), 2000)
+
+        self.assertEqual(len(page), 3)
+        self.assertEqual(len(everything), 2)
+
+        response = self.client.get(list_url, {'before': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChatPairKeyTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.pair@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob.pair@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse('direct-chat-get-or-create-chat')
+
+    def test_lookup_is_one_query_on_the_pair_key(self):
+        created = self.client.post(self.url, {'email': self.bob.email}).data
+        chat = DirectChat.objects.get(id=created['id'])
+        self.assertEqual((chat.min_user_id, chat.max_user_id), (self.alice.id, self.bob.id))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(DirectChat.between(self.bob, self.alice), chat)
+        self.assertEqual(len(queries), 1)
+
+    def test_deleted_chat_is_reopened(self):
+        chat_id = self.client.post(self.url, {'email': self.bob.email}).data['id']
+        self.client.delete(reverse('direct-chat-detail', args=[chat_id]))
+        self.assertEqual(self.client.get(reverse('direct-chat-list')).data, [])
+
+        response = self.client.post(self.url, {'email': self.bob.email})
+        self.assertEqual(response.data['id'], chat_id)
+        self.assertEqual(len(self.client.get(reverse('direct-chat-list')).data), 1)
+        self.assertEqual(DirectChat.objects.count(), 1)
+
+    def test_hidden_state_drives_list_messages_and_inbox(self):
+        chat_id = self.client.post(self.url, {'email': self.bob.email}).data['id']
+        ChatParticipantState.objects.filter(chat_id=chat_id, user=self.alice).delete()
+        self.client.delete(reverse('direct-chat-detail', args=[chat_id]))
+        self.assertTrue(ChatParticipantState.objects.get(chat_id=chat_id, user=self.alice).hidden)
+
+        messages_url = reverse('direct-chat-messages', args=[chat_id])
+        self.assertEqual(self.client.get(reverse('direct-chat-list')).data, [])
+        self.assertEqual(self.client.get(reverse('direct-chat-inbox')).data, [])
+        self.assertEqual(self.client.get(messages_url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.post(self.url, {'email': self.bob.email})
+        self.assertEqual([chat['id'] for chat in self.client.get(reverse('direct-chat-list')).data], [chat_id])
+        self.assertEqual(len(self.client.get(reverse('direct-chat-inbox')).data), 1)
+        self.assertEqual(self.client.get(messages_url).status_code, status.HTTP_200_OK)
+
+    def test_messaging_yourself_is_rejected(self):
+        response = self.client.post(
+            reverse('direct-message-list'), {'receiver': self.alice.id, 'content': 'note to self'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Cannot send a message to yourself'})
+        with self.assertRaises(ValueError):
+            DirectChat.get_or_create_between(self.alice, self.alice)
+        self.assertFalse(DirectChat.objects.exists())
+
+    def test_backfill_merges_duplicate_chats(self):
+        chats = []
+        for content in ('first', 'second'):
+            chat = DirectChat.objects.create()
+            chat.participants.add(self.alice, self.bob)
+            message = DirectMessage.objects.create(chat=chat, sender=self.bob, receiver=self.alice, content=content)
+            ChatParticipantState.objects.create(chat=chat, user=self.alice, unread_count=1, updated_at=message.timestamp)
+            chats.append(chat)
+
+        migration = import_module('apps.direct_messages.migrations.0008_backfill_directchat_pair_key')
+        migration.assign_pair_keys(apps, None)
+
+        keeper = DirectChat.objects.get()
+        self.assertEqual(keeper.id, chats[0].id)
+        self.assertEqual((keeper.min_user_id, keeper.max_user_id), (self.alice.id, self.bob.id))
+        self.assertEqual(keeper.messages.count(), 2)
+        self.assertEqual(keeper.last_message.content, 'second')
+        self.assertEqual(ChatParticipantState.objects.get(chat=keeper, user=self.alice).unread_count, 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs real concurrent transactions')
+class ConcurrentChatCreationTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.race@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob.race@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+
+    def open_chat(self, pair):
+        user, other = pair
+        client = APIClient()
+        client.force_authenticate(user=user)
+        try:
+            response = client.post(reverse('direct-chat-get-or-create-chat'), {'email': other.email})
+            return response.status_code, response.data['id']
+        finally:
+            connection.close()
+
+    def test_parallel_clicks_create_one_chat(self):
+        pairs = [(self.alice, self.bob), (self.bob, self.alice)] * 6
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(self.open_chat, pairs))
+
+        self.assertEqual({code for code, _ in results}, {status.HTTP_200_OK})
+        self.assertEqual(len({chat_id for _, chat_id in results}), 1)
+        self.assertEqual(DirectChat.objects.count(), 1)
+        self.assertEqual(DirectChat.objects.get().participants.count(), 2)
+
+
+class BatchSendAndReceiptTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            email='alice.batch@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob.batch@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        self.carol = User.objects.create_user(
+            email='carol.batch@nyu.edu',
+            password='segroup2',
+            first_name='Carol',
+            last_name='C'
+        )
+        DirectChat.between(self.alice, self.bob)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse('direct-message-send-batch')
+
+    def test_batch_send(self):
+        batch = [
+            {'receiver': self.bob.id, 'content': 'queued 1'},
+            {'receiver': self.carol.id, 'content': 'queued 2'},
+            {'receiver': self.bob.id, 'content': 'queued 3'},
+        ]
+        response = self.client.post(self.url, {'messages': batch}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([m['content'] for m in response.data], ['queued 1', 'queued 2', 'queued 3'])
+
+        bob_chat = DirectChat.between(self.alice, self.bob)
+        self.assertEqual(bob_chat.last_message.content, 'queued 3')
+        self.assertEqual(bob_chat.messages.count(), 2)
+        self.assertEqual(ChatParticipantState.objects.get(chat=bob_chat, user=self.bob).unread_count, 2)
+        carol_chat = DirectChat.between(self.alice, self.carol)
+        self.assertEqual(ChatParticipantState.objects.get(chat=carol_chat, user=self.carol).unread_count, 1)
+        self.assertEqual(ChatParticipantState.objects.get(chat=carol_chat, user=self.alice).unread_count, 0)
+
+    def test_batch_query_count_is_flat(self):
+        batch = [{'receiver': self.bob.id, 'content': f'm{i}'} for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {'messages': batch}, format='json')
+        # receivers, chats, savepoint pair, insert, chat update, state update
+        self.assertLessEqual(len(queries), 7)
+
+    def test_batch_is_all_or_nothing(self):
+        batch = [{'receiver': self.bob.id, 'content': 'ok'}, {'receiver': 999999, 'content': 'lost'}]
+        response = self.client.post(self.url, {'messages': batch}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['receivers'], [999999])
+        self.assertFalse(DirectMessage.objects.exists())
+
+        response = self.client.post(self.url, {'messages': [{'receiver': self.bob.id}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_watermark_receipt(self):
+        chat = DirectChat.between(self.alice, self.bob)
+        messages = [chat.post_message(self.bob, self.alice, f'm{i}') for i in range(4)]
+        mine = chat.post_message(self.alice, self.bob, 'reply')
+        url = reverse('direct-chat-mark-read', args=[chat.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'up_to': messages[2].id}, format='json')
+        self.assertEqual(response.data['marked'], 3)
+        self.assertLessEqual(len(queries), 5)
+        self.assertEqual(ChatParticipantState.objects.get(chat=chat, user=self.alice).unread_count, 1)
+
+        response = self.client.post(url, {'up_to': messages[2].id}, format='json')
+        self.assertEqual(response.data['marked'], 0)
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.data['marked'], 1)
+        self.assertEqual(ChatParticipantState.objects.get(chat=chat, user=self.alice).unread_count, 0)
+        self.assertFalse(DirectMessage.objects.get(id=mine.id).is_read)
+
+        self.client.force_authenticate(user=self.carol)
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_mark_as_read_is_bounded(self):
+        url = reverse('direct-message-mark-as-read')
+        response = self.client.post(url, {'message_ids': list(range(501))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,13 +2,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from django.db.models import Q, Sum, Exists, OuterRef, Subquery
 from django.contrib.auth import get_user_model
-from .models import DirectMessage, DirectChat, DeletedChat
-from .serializers import DirectMessageSerializer, DirectChatSerializer, UserSerializer
+from .models import DirectMessage, DirectChat, ChatParticipantState
+from .serializers import DirectMessageSerializer, DirectChatSerializer, UserSerializer, InboxEntrySerializer
+from apps.study_groups.pagination import parse_page_params, keyset_page
 
 User = get_user_model()
 
+MAX_BATCH_MESSAGES = 100
+MAX_READ_IDS = 500
+
+def hidden_for(user):
+    """Matches chats `user` has deleted, i.e. whose participant state is hidden."""
+    return Exists(ChatParticipantState.objects.filter(chat=OuterRef('pk'), user=user, hidden=True))
+
 class DirectMessageViewSet(viewsets.ModelViewSet):
     serializer_class = DirectMessageSerializer
     permission_classes = [IsAuthenticated]
@@ -42,13 +50,16 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
                 {'error': 'Receiver not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+        if receiver == request.user:
+            return Response(
+                {'error': 'Cannot send a message to yourself'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             
         # Create the message
-        message = DirectMessage.objects.create(
-            sender=request.user,
-            receiver=receiver,
-            content=content
-        )
+        chat = DirectChat.between(request.user, receiver)
+        message = chat.post_message(request.user, receiver, content)
         
         serializer = self.get_serializer(message)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -58,19 +69,80 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        count = DirectMessage.objects.filter(
-            receiver=request.user,
-            is_read=False
-        ).count()
+        # Sums one counter per chat instead of counting unread messages.
+        count = ChatParticipantState.objects.filter(
+            user=request.user
+        ).aggregate(total=Sum('unread_count'))['total'] or 0
         return Response({'unread_count': count})
     
+    @action(detail=False, methods=['post'])
+    def send_batch(self, request):
+        """Send several messages in one request, e.g. a queue flushed on reconnect.
+
+        Body: {"messages": [{"receiver": <user id>, "content": "..."}, ...]}.
+        All receivers are checked in one query and nothing is sent unless
+        every entry is valid. Returns the created messages in order.
+        """
+        entries = request.data.get('messages')
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {'error': 'messages must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(entries) > MAX_BATCH_MESSAGES:
+            return Response(
+                {'error': f'At most {MAX_BATCH_MESSAGES} messages per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        outgoing = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('content'):
+                return Response(
+                    {'error': 'Every message needs a receiver and content'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                outgoing.append((int(entry.get('receiver')), entry['content']))
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'Receiver ID is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        receivers = User.objects.in_bulk({receiver_id for receiver_id, _ in outgoing})
+        missing = sorted({receiver_id for receiver_id, _ in outgoing} - set(receivers))
+        if missing:
+            return Response(
+                {'error': 'Receiver not found', 'receivers': missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if request.user.pk in receivers:
+            return Response(
+                {'error': 'Cannot send a message to yourself'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        messages = DirectChat.post_batch(
+            request.user,
+            [(receivers[receiver_id], content) for receiver_id, content in outgoing]
+        )
+        serializer = self.get_serializer(messages, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['post'])
     def mark_as_read(self, request):
         message_ids = request.data.get('message_ids', [])
-        DirectMessage.objects.filter(
-            id__in=message_ids,
-            receiver=request.user
-        ).update(is_read=True)
+        if not isinstance(message_ids, list) or len(message_ids) > MAX_READ_IDS:
+            return Response(
+                {'error': f'message_ids must be a list of at most {MAX_READ_IDS} ids; '
+                          'use chats/<id>/mark_read/ to mark a whole conversation'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ChatParticipantState.mark_read(
+            request.user,
+            DirectMessage.objects.filter(id__in=message_ids)
+        )
         return Response({'status': 'success'})
 
 class DirectChatViewSet(viewsets.ModelViewSet):
@@ -83,8 +155,78 @@ class DirectChatViewSet(viewsets.ModelViewSet):
         return DirectChat.objects.filter(
             participants=user
         ).exclude(
-            deleted_by_users__user=user
-        ).order_by('-updated_at')
+            hidden_for(user)
+        ).select_related(
+            'last_message__sender', 'last_message__receiver'
+        ).prefetch_related('participants').order_by('-updated_at')
+
+    def inbox_states(self, request):
+        """The caller's visible ChatParticipantState rows, newest chat first.
+
+        Applies ?before=<chat id> as a keyset cursor on (updated_at, chat) so
+        every page is a range scan over chatstate_inbox_idx. Raises
+        ValueError with a client-facing message on bad paging parameters.
+        """
+        params = parse_page_params(request.query_params)
+        states = ChatParticipantState.objects.filter(user=request.user, hidden=False)
+        if params['before'] is not None:
+            anchor = states.filter(chat_id=params['before']).values('updated_at', 'chat_id').first()
+            if anchor is None:
+                raise ValueError('Unknown chat in before.')
+            states = states.filter(
+                Q(updated_at__lt=anchor['updated_at']) |
+                Q(updated_at=anchor['updated_at'], chat_id__lt=anchor['chat_id'])
+            )
+        return states.order_by('-updated_at', '-chat_id'), params
+
+    def list(self, request, *args, **kwargs):
+        """The user's chats, most recently active first.
+
+        Read from the inbox index like `inbox`, in a fixed number of queries.
+        Paging with ?limit= and ?before=<chat id> is opt-in; without either
+        the whole list is returned, as existing clients expect.
+        """
+        try:
+            states, params = self.inbox_states(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        states = states.select_related(
+            'chat__last_message__sender', 'chat__last_message__receiver'
+        ).prefetch_related('chat__participants')
+        if 'limit' in request.query_params or params['before'] is not None:
+            states = states[:params['limit']]
+
+        serializer = self.get_serializer([state.chat for state in states], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """The user's conversations, most recently active first.
+
+        Each entry has the other participant, a preview of the last message
+        and the unread count. Pages with ?limit= and ?before=<chat id>; the
+        page is read from the user's ChatParticipantState rows in two
+        queries regardless of how many chats there are.
+        """
+        try:
+            states, params = self.inbox_states(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        counterpart = DirectChat.participants.through.objects.filter(
+            directchat_id=OuterRef('chat_id')
+        ).exclude(user_id=request.user.id).values('user_id')[:1]
+        page = list(
+            states.select_related('chat__last_message')
+            .annotate(counterpart_id=Subquery(counterpart))[:params['limit']]
+        )
+        counterparts = User.objects.only('id', 'first_name', 'last_name', 'email').in_bulk(
+            {state.counterpart_id for state in page if state.counterpart_id}
+        )
+
+        serializer = InboxEntrySerializer(page, many=True, context={'counterparts': counterparts})
+        return Response(serializer.data)
     
     @action(detail=False, methods=['post'])
     def get_or_create_chat(self, request):
@@ -110,65 +252,43 @@ class DirectChatViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        # Check if chat already exists and is not deleted
-        existing_chat = DirectChat.objects.filter(
-            participants=request.user
-        ).filter(
-            participants=other_user
-        ).exclude(
-            deleted_by_users__user=request.user
-        ).first()
-        
-        if existing_chat:
-            serializer = self.get_serializer(existing_chat)
-            return Response(serializer.data)
-            
-        # Check if there's a deleted chat that we can reuse
-        deleted_chat = DirectChat.objects.filter(
-            participants=request.user
-        ).filter(
-            participants=other_user
-        ).filter(
-            deleted_by_users__user=request.user
-        ).first()
-        
-        if deleted_chat:
-            # Remove the deleted mark and reuse the chat
-            DeletedChat.objects.filter(user=request.user, chat=deleted_chat).delete()
-            serializer = self.get_serializer(deleted_chat)
-            return Response(serializer.data)
-            
-        # Create new chat if no existing or deleted chat found
-        chat = DirectChat.objects.create()
-        chat.participants.add(request.user, other_user)
+        # One indexed fetch on the (min_user, max_user) key; concurrent
+        # requests for the same pair end up with the same chat.
+        chat, created = DirectChat.get_or_create_between(request.user, other_user)
         
-        # Only return the chat if it has messages
-        if chat.last_message:
+        if not created:
+            # Reuse the chat, removing the deleted mark if this user had one
+            ChatParticipantState.objects.filter(user=request.user, chat=chat, hidden=True).update(hidden=False)
             serializer = self.get_serializer(chat)
             return Response(serializer.data)
-        else:
-            # Return just the chat ID and participants if no messages yet
-            return Response({
-                'id': chat.id,
-                'participants': [
-                    {
-                        'id': p.id,
-                        'first_name': p.first_name,
-                        'last_name': p.last_name,
-                        'email': p.email
-                    } for p in chat.participants.all()
-                ]
-            })
+        
+        # Return just the chat ID and participants since there are no messages yet
+        return Response({
+            'id': chat.id,
+            'participants': [
+                {
+                    'id': p.id,
+                    'first_name': p.first_name,
+                    'last_name': p.last_name,
+                    'email': p.email
+                } for p in (request.user, other_user)
+            ]
+        })
     
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
+        """Messages of one conversation, oldest first.
+
+        Returns the latest page by default; ?before=<message id> pages back,
+        ?after=<message id> forward and ?since_id= polls for new messages.
+        """
         # First check if the chat exists and hasn't been deleted for this user
         try:
             chat = DirectChat.objects.filter(
                 id=pk,
                 participants=request.user
             ).exclude(
-                deleted_by_users__user=request.user
+                hidden_for(request.user)
             ).get()
         except DirectChat.DoesNotExist:
             return Response(
@@ -176,14 +296,45 @@ class DirectChatViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        messages = DirectMessage.objects.filter(
-            Q(sender=request.user, receiver__in=chat.participants.all()) |
-            Q(receiver=request.user, sender__in=chat.participants.all())
-        ).order_by('timestamp')
+        try:
+            params = parse_page_params(request.query_params)
+            messages = keyset_page(
+                DirectMessage.objects.filter(chat=chat).select_related('sender', 'receiver'),
+                **params
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = DirectMessageSerializer(messages, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Read receipt by watermark: everything received up to message id up_to is read.
+
+        Without up_to the whole conversation is marked read.
+        """
+        chat = DirectChat.objects.filter(id=pk, participants=request.user).first()
+        if chat is None:
+            return Response(
+                {'error': 'Chat not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        up_to = request.data.get('up_to')
+        if up_to is None:
+            up_to = chat.last_message_id or 0
+        try:
+            up_to = int(up_to)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'up_to must be a message id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        marked = ChatParticipantState.mark_read_up_to(request.user, chat, up_to)
+        return Response({'status': 'success', 'marked': marked})
+
     def destroy(self, request, *args, **kwargs):
         chat = self.get_object()
         
@@ -195,6 +346,8 @@ class DirectChatViewSet(viewsets.ModelViewSet):
             )
             
         # Instead of deleting the chat and messages, mark it as deleted for this user
-        DeletedChat.objects.create(user=request.user, chat=chat)
+        ChatParticipantState.objects.update_or_create(
+            chat=chat, user=request.user, defaults={'hidden': True}
+        )
         
         return Response(status=status.HTTP_204_NO_CONTENT) 
\ No newline at end of file
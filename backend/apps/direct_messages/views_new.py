@@ -4,8 +4,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 from django.contrib.auth import get_user_model
-from .models import DirectMessage, DirectChat, DeletedChat
+from .models import DirectMessage, DirectChat, ChatParticipantState
 from .serializers import DirectMessageSerializer, DirectChatSerializer, UserSerializer
+from .views import hidden_for
 
 User = get_user_model()
 
@@ -83,7 +84,7 @@ class DirectChatViewSet(viewsets.ModelViewSet):
         return DirectChat.objects.filter(
             participants=user
         ).exclude(
-            deleted_by_users__user=user
+            hidden_for(user)
         ).order_by('-updated_at')
     
     @action(detail=False, methods=['post'])
@@ -151,7 +152,7 @@ class DirectChatViewSet(viewsets.ModelViewSet):
                 id=pk,
                 participants=request.user
             ).exclude(
-                deleted_by_users__user=request.user
+                hidden_for(request.user)
             ).get()
         except DirectChat.DoesNotExist:
             return Response(
@@ -178,6 +179,6 @@ class DirectChatViewSet(viewsets.ModelViewSet):
             )
             
         # Instead of deleting the chat and messages, mark it as deleted for this user
-        DeletedChat.objects.create(user=request.user, chat=chat)
+        ChatParticipantState.objects.update_or_create(chat=chat, user=request.user, defaults={'hidden': True})
         
         return Response(status=status.HTTP_204_NO_CONTENT) 
\ No newline at end of file
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+BLOB_DIR = 'blobs'
+_COPY_BUFFER = 64 * 1024
+
+
+def blob_name(sha256):
+    """Storage name of a blob, fanned out so no directory grows too large."""
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def _staging_path():
+    handle, path = tempfile.mkstemp(prefix='blob-', dir=settings.FILE_UPLOAD_TEMP_DIR)
+    os.close(handle)
+    return path
+
+
+def store_blob(fileobj):
+    """Stores an uploaded file and returns its Blob, with one reference taken.
+
+    The content is hashed while it is copied to a staging file, so the
+    upload is read exactly once and never held in memory. Call it in the
+    same transaction as the insert of the row that holds the reference.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    path = _staging_path()
+    chunks = fileobj.chunks() if hasattr(fileobj, 'chunks') else iter(lambda: fileobj.read(_COPY_BUFFER), b'')
+    try:
+        with open(path, 'wb') as staging:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                staging.write(chunk)
+        return adopt_file(path, digest.hexdigest(), size)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def acquire_blob(sha256, size):
+    """Takes a reference on an existing blob; returns None if there is none.
+
+    Only for content the caller is entitled to read: holding a hash is not
+    proof of having the bytes.
+    """
+    from .models import Blob
+
+    if Blob.objects.filter(pk=sha256, size=size, ref_count__gt=0).update(ref_count=F('ref_count') + 1):
+        return Blob.objects.get(pk=sha256)
+    return None
+
+
+def adopt_file(path, sha256, size):
+    """Copies a fully written local file at `path` into the store, or skips
+    it as a duplicate, and takes one reference on the blob. `path` is
+    removed once that succeeded.
+
+    The Blob row is locked while the bytes are placed, which serializes this
+    with _remove_orphan deleting the same content.
+    """
+    from .models import Blob
+
+    name = blob_name(sha256)
+    with transaction.atomic():
+        blob, _ = Blob.objects.select_for_update().get_or_create(
+            sha256=sha256, defaults={'size': size, 'ref_count': 0}
+        )
+        if blob.ref_count == 0:
+            # New content, or a row whose bytes are due for removal.
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            with open(path, 'rb') as source:
+                stored = default_storage.save(name, DjangoFile(source))
+            if stored != name:
+                raise RuntimeError(f"Storage saved blob {sha256} as {stored}")
+        Blob.objects.filter(pk=sha256).update(ref_count=F('ref_count') + 1)
+        blob.refresh_from_db(fields=['ref_count'])
+    os.remove(path)
+    return blob
+
+
+def release_blob(sha256):
+    """Drops one reference; after commit, the bytes of an unused blob are removed."""
+    from .models import Blob
+
+    Blob.objects.filter(pk=sha256, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    transaction.on_commit(lambda: _remove_orphan(sha256))
+
+
+def _remove_orphan(sha256):
+    from .models import Blob
+
+    # Deleting the row locks it until the bytes are gone, so adopt_file
+    # cannot store the same content again in between. If it got there
+    # first, ref_count is no longer 0 and nothing is deleted.
+    with transaction.atomic():
+        deleted, _ = Blob.objects.filter(pk=sha256, ref_count=0).delete()
+        if deleted:
+            default_storage.delete(blob_name(sha256))
@@ -1,6 +1,25 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MaxValueValidator
 
+class Blob(models.Model):
+    """File content stored once under blobs/ and shared by every row that uses it.
+
+    ref_count counts the File and FileAttachment rows pointing here; the
+    bytes are removed when it drops to zero (see blobs.release_blob).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def name(self):
+        from .blobs import blob_name
+        return blob_name(self.sha256)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
 class File(models.Model):
     name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=50)  # e.g., PDF, DOCX or any other 
@@ -17,6 +36,7 @@ class File(models.Model):
         upload_to='uploads/%Y/%m/%d/',
         validators=[MaxValueValidator(25*1024*1024, message=("File size must be ≤25MB"))]
     )   
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
 
     shared_with = models.ManyToManyField(
@@ -25,6 +45,14 @@ class File(models.Model):
         help_text="Users this file is shared with"
     )
 
+    @classmethod
+    def from_upload(cls, upload, **fields):
+        """Creates a File whose bytes live in the shared blob store."""
+        from .blobs import store_blob
+        with transaction.atomic():
+            blob = store_blob(upload)
+            return cls.objects.create(file_path=blob.name, blob=blob, **fields)
+
     @property
     def metadata(self):
         return {
@@ -33,14 +61,27 @@ class File(models.Model):
             "file_type": self.file_type,
         }
 
-    def share(self, user):
-        self.shared_with.add(user)
-        from apps.notifications.models import Notification 
-        Notification.create_notification(
-            user_id=user.id,
-            message=f"New shared file: {self.name}",
-            notification_type='FILE_UPLOAD'
+    def share(self, *users):
+        """Shares the file with one or more users and notifies them in one insert."""
+        from apps.notifications.services import notify_users
+        self.shared_with.add(*users)
+        notify_users(
+            [user.id for user in users],
+            f"New shared file: {self.name}",
+            'FILE_UPLOAD'
+        )
+        return True
+
+    def share_with_group(self):
+        """Shares the file with every other member of its study group."""
+        from apps.notifications.services import notify_group
+        notifications = notify_group(
+            self.study_group_id,
+            f"New shared file: {self.name}",
+            'FILE_UPLOAD',
+            exclude=[self.uploaded_by_id]
         )
+        self.shared_with.add(*[notification.user_id for notification in notifications])
         return True
 
     def download(self):
@@ -49,4 +90,5 @@ class File(models.Model):
         return FileResponse(self.file_path.open(), as_attachment=True)
 
     def delete_file(self):
+        # The blob reference is released by the post_delete signal.
         self.delete()
\ No newline at end of file
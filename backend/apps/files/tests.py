@@ -1,3 +1,108 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from apps.study_groups.models import StudyGroup, FileAttachment
+from .blobs import acquire_blob, blob_name
+from .models import Blob, File
+
+User = get_user_model()
+
+
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.user = User.objects.create_user(
+            email='sharer@nyu.edu',
+            password='segroup2',
+            first_name='Sha',
+            last_name='Rer'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Statistics',
+            description='Regression',
+            subject='Math',
+            creator=self.user
+        )
+
+    def upload(self, content=b'%PDF syllabus'):
+        return File.from_upload(
+            SimpleUploadedFile('syllabus.pdf', content),
+            name='syllabus.pdf',
+            file_type='PDF',
+            study_group=self.group,
+            uploaded_by=self.user
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload()
+        second = self.upload()
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file_path.name, blob_name(first.blob_id))
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        blob_dir = os.path.join(self.media_root, 'blobs', first.blob_id[:2], first.blob_id[2:4])
+        self.assertEqual(os.listdir(blob_dir), [first.blob_id])
+
+    def test_bytes_go_with_the_last_reference(self):
+        first = self.upload()
+        blob = acquire_blob(first.blob_id, first.blob.size)
+        attachment = FileAttachment.from_blob(blob, 'copy.pdf', self.user)
+        path = first.file_path.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete_file()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_reupload_before_removal_keeps_the_bytes(self):
+        first = self.upload()
+        path = first.file_path.path
+        with self.captureOnCommitCallbacks() as removals:
+            first.delete_file()
+        self.assertEqual(Blob.objects.get().ref_count, 0)
+
+        # The same content comes back before the removal has run.
+        second = self.upload()
+        for callback in removals:
+            callback()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        with open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF syllabus')
+        self.assertEqual(second.file_path.name, blob_name(second.blob_id))
+
+    def test_failed_insert_takes_no_reference(self):
+        with self.assertRaises(IntegrityError):
+            File.from_upload(
+                SimpleUploadedFile('orphan.pdf', b'%PDF orphan'),
+                name='orphan.pdf',
+                file_type='PDF',
+                study_group_id=None,
+                uploaded_by=self.user
+            )
+        self.assertFalse(Blob.objects.exists())
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_works_with_storage_without_local_paths(self):
+        stored = self.upload(b'%PDF in memory')
+        with default_storage.open(stored.file_path.name) as content:
+            self.assertEqual(content.read(), b'%PDF in memory')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'blobs')))
@@ -1,11 +1,12 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from apps.caching.resources import cached_response
 from .models import Task
 from .serializers import TaskSerializer
 
 class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    queryset = Task.objects.filter(group__deleted_at__isnull=True)
     serializer_class = TaskSerializer
 
     def get_queryset(self):
@@ -15,6 +16,14 @@ class TaskViewSet(viewsets.ModelViewSet):
             return self.queryset.filter(group_id=group_id)
         return self.queryset
 
+    def list(self, request, *args, **kwargs):
+        group_id = request.query_params.get('group_id')
+        return cached_response(
+            request, 'tasks.list', [f'tasks:group:{group_id}' if group_id else 'tasks'],
+            lambda: super(TaskViewSet, self).list(request, *args, **kwargs),
+            per_user=False
+        )
+
     @action(detail=True, methods=['post'])
     def move(self, request, pk=None):
         task = self.get_object()
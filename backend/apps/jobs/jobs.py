@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Job
+from .queue import register
+
+KEEP_FINISHED = timedelta(days=7)
+
+
+@register('jobs.purge_finished', every=timedelta(days=1))
+def purge_finished():
+    """Keeps the queue table small by dropping old finished jobs."""
+    Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        finished_at__lt=timezone.now() - KEEP_FINISHED
+    ).delete()
@@ -0,0 +1,26 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (reminders, notifications, periodic upkeep)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run one batch of due jobs and exit.')
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help='Jobs claimed per poll.')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        worker = Worker(batch_size=options['batch_size'], poll_interval=options['poll_interval'])
+        if options['once']:
+            self.stdout.write(f"Ran {worker.run_once()} jobs.")
+            return
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        worker.run()
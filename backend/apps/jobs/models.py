@@ -0,0 +1,58 @@
+from django.db import models
+from django.db.models import Q
+
+
+class Job(models.Model):
+    """One unit of background work, stored in the database.
+
+    Rows are claimed by `manage.py run_worker`; nothing but the database is
+    needed to queue or run them.
+    """
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Periodic jobs carry their name as key; at most one of them is pending.
+    key = models.CharField(max_length=100, null=True, blank=True)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_at', 'id'],
+                name='job_due_idx',
+                condition=Q(status='QUEUED')
+            ),
+            models.Index(
+                fields=['locked_at'],
+                name='job_running_idx',
+                condition=Q(status='RUNNING')
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                name='job_pending_key_uniq',
+                condition=Q(status__in=['QUEUED', 'RUNNING'])
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
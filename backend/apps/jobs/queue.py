@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+# name -> handler; filled by @register in each app's jobs.py
+HANDLERS = {}
+# name -> interval for handlers registered with every=
+PERIODIC = {}
+# names of handlers registered with atomic=False
+NON_ATOMIC = set()
+
+
+class UnknownJob(Exception):
+    """Raised when a job name has no registered handler."""
+
+
+def register(name, every=None, atomic=True):
+    """Registers a job handler, optionally to run every `every` timedelta.
+
+    Handlers take the payload as keyword arguments. The worker runs each
+    one in a single transaction; handlers that commit their progress as
+    they go register with atomic=False and open their own.
+    """
+    def decorator(func):
+        HANDLERS[name] = func
+        if every is not None:
+            PERIODIC[name] = every
+        if not atomic:
+            NON_ATOMIC.add(name)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=3):
+    """Queues a job. Inside a transaction, the job only becomes visible to
+    workers once that transaction commits."""
+    if name not in HANDLERS:
+        raise UnknownJob(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts
+    )
+
+
+def run_soon(name):
+    """Moves the pending run of a periodic job forward to now.
+
+    For work that is polled periodically but sometimes wanted right away,
+    like an outbox that just received a message.
+    """
+    now = timezone.now()
+    return Job.objects.filter(key=name, status=Job.QUEUED, run_at__gt=now).update(run_at=now)
+
+
+def schedule_periodic(now=None):
+    """Makes sure every periodic job has exactly one pending run.
+
+    The next run is due one interval after the previous one finished. The
+    partial unique constraint on key lets several workers call this at once.
+    """
+    now = now or timezone.now()
+    pending = set(
+        Job.objects.filter(key__in=PERIODIC, status__in=[Job.QUEUED, Job.RUNNING])
+        .values_list('key', flat=True)
+    )
+    scheduled = 0
+    for name, every in PERIODIC.items():
+        if name in pending:
+            continue
+        last_finished = (
+            Job.objects.filter(key=name, finished_at__isnull=False)
+            .order_by('-finished_at').values_list('finished_at', flat=True).first()
+        )
+        run_at = max(now, last_finished + every) if last_finished else now
+        try:
+            with transaction.atomic():
+                Job.objects.create(name=name, key=name, run_at=run_at)
+        except IntegrityError:
+            continue  # another worker got there first
+        scheduled += 1
+    return scheduled
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 60s, 120s, ... capped at one hour."""
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
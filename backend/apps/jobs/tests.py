@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import HANDLERS, PERIODIC, UnknownJob, enqueue, register, schedule_periodic
+from .worker import Worker, STALE_AFTER
+
+calls = []
+
+
+@register('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@register('tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        # Keep real periodic jobs out of the way; tests add their own.
+        patcher = mock.patch.dict(PERIODIC, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.worker = Worker(batch_size=5, name='test-worker')
+
+    def test_due_jobs_run_in_order_and_future_jobs_wait(self):
+        enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2})
+        later = enqueue('tests.record', {'value': 3}, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(self.worker.run_once(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        later.refresh_from_db()
+        self.assertEqual(later.status, Job.QUEUED)
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failures_back_off_then_give_up(self):
+        job = enqueue('tests.explode', max_attempts=2)
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_jobs_are_rejected(self):
+        with self.assertRaises(UnknownJob):
+            enqueue('tests.missing')
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue('tests.record', {'value': 'again'})
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING,
+            locked_by='dead-worker',
+            locked_at=timezone.now() - STALE_AFTER - timedelta(minutes=1)
+        )
+        self.worker.run_once()
+        self.assertEqual(calls, ['again'])
+
+    def test_periodic_jobs_keep_one_pending_run(self):
+        HANDLERS['tests.tick'] = lambda: calls.append('tick')
+        self.addCleanup(HANDLERS.pop, 'tests.tick')
+        PERIODIC['tests.tick'] = timedelta(minutes=10)
+
+        self.assertEqual(schedule_periodic(), 1)
+        self.assertEqual(schedule_periodic(), 0)
+        self.worker.run_once()
+        self.assertEqual(calls, ['tick'])
+
+        # The next run is due one interval after the last one finished.
+        self.assertEqual(self.worker.run_once(), 0)
+        pending = Job.objects.get(key='tests.tick', status=Job.QUEUED)
+        self.assertGreater(pending.run_at, timezone.now() + timedelta(minutes=9))
+
+    def test_run_worker_once(self):
+        enqueue('tests.record', {'value': 'cli'})
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertEqual(calls, ['cli'])
+        self.assertIn('Ran 1 jobs.', out.getvalue())
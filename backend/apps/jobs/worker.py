@@ -0,0 +1,119 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .queue import HANDLERS, NON_ATOMIC, schedule_periodic, retry_delay
+
+logger = logging.getLogger(__name__)
+
+# A RUNNING job whose worker has been silent this long is assumed dead.
+STALE_AFTER = timedelta(minutes=15)
+
+
+class Worker:
+    """Claims due jobs from the Job table and runs them.
+
+    Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database has
+    it, so any number of workers can share the table; on SQLite the write
+    lock serializes them instead.
+    """
+
+    def __init__(self, batch_size=10, poll_interval=5.0, name=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def run(self):
+        logger.info("Job worker %s started", self.name)
+        while not self.stopping.is_set():
+            close_old_connections()
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Job worker %s failed to poll", self.name)
+                processed = 0
+            if not processed:
+                self.stopping.wait(self.poll_interval)
+        logger.info("Job worker %s stopped", self.name)
+
+    def stop(self):
+        self.stopping.set()
+
+    def run_once(self):
+        """Runs one batch of due jobs; returns how many were run."""
+        schedule_periodic()
+        self.requeue_stale()
+        jobs = self.claim()
+        for job in jobs:
+            self.execute(job)
+        return len(jobs)
+
+    def requeue_stale(self):
+        return Job.objects.filter(
+            status=Job.RUNNING,
+            locked_at__lt=timezone.now() - STALE_AFTER
+        ).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=Job.QUEUED, run_at__lte=now)
+                .order_by('run_at', 'id')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return []
+            Job.objects.filter(id__in=ids).update(
+                status=Job.RUNNING,
+                locked_by=self.name,
+                locked_at=now,
+                attempts=F('attempts') + 1
+            )
+        return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id'))
+
+    def execute(self, job):
+        handler = HANDLERS.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{job.name}'")
+            if job.name in NON_ATOMIC:
+                handler(**job.payload)
+            else:
+                with transaction.atomic():
+                    handler(**job.payload)
+        except Exception:
+            logger.exception("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+            self.fail(job, traceback.format_exc())
+        else:
+            Job.objects.filter(id=job.id).update(
+                status=Job.DONE,
+                finished_at=timezone.now(),
+                locked_by='',
+                locked_at=None,
+                last_error=''
+            )
+
+    def fail(self, job, error):
+        now = timezone.now()
+        if job.attempts < job.max_attempts and job.name in HANDLERS:
+            changes = {'status': Job.QUEUED, 'run_at': now + retry_delay(job.attempts)}
+        else:
+            # finished_at also lets a failed periodic job be rescheduled.
+            changes = {'status': Job.FAILED, 'finished_at': now}
+        Job.objects.filter(id=job.id).update(
+            last_error=error[-4000:],
+            locked_by='',
+            locked_at=None,
+            **changes
+        )
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from apps.jobs.queue import register
+from .outbox import deliver_pending
+
+# Upper bound on batches per run, so one run cannot hold the worker forever.
+MAX_BATCHES = 20
+
+
+@register('mailer.deliver', every=timedelta(minutes=1), atomic=False)
+def deliver():
+    """Drains the outbox; queue_email() pulls this run forward.
+
+    Each batch commits on its own, so a failure later in the run does not
+    undo the SENT status of messages already delivered, and rows are only
+    locked while their batch is being sent.
+    """
+    for _ in range(MAX_BATCHES):
+        with transaction.atomic():
+            sent = deliver_pending()
+        if not sent:
+            break
@@ -0,0 +1,37 @@
+from django.db import models
+from django.db.models import Q
+
+
+class OutgoingEmail(models.Model):
+    """A message waiting in the outbox; see apps.mailer.outbox."""
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                name='outbox_due_idx',
+                condition=Q(status='PENDING')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
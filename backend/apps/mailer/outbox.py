@@ -0,0 +1,104 @@
+"""Transactional outbox for email.
+
+Request code calls queue_email(), which only inserts a row; the
+mailer.deliver job sends pending rows in batches over one SMTP
+connection. Failed messages are retried with exponential backoff and
+marked FAILED after MAX_ATTEMPTS.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from apps.jobs.queue import retry_delay, run_soon
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+
+
+def queue_email(subject, body, to, from_email=None):
+    """Stores a message for delivery by the worker.
+
+    Called inside a transaction, the message is only sent if that
+    transaction commits.
+    """
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=list(to),
+        from_email=from_email or '',
+        next_attempt_at=timezone.now()
+    )
+    run_soon('mailer.deliver')
+    return email
+
+
+def _message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=connection
+    )
+
+
+def _failed(email, error, now):
+    email.attempts += 1
+    email.last_error = error[-2000:]
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_pending(batch_size=BATCH_SIZE):
+    """Sends one batch of due messages; returns how many were sent.
+
+    Must run inside a transaction: the batch stays locked while it is sent
+    so concurrent workers never deliver the same message twice.
+    """
+    now = timezone.now()
+    batch = list(
+        OutgoingEmail.objects.select_for_update(skip_locked=True)
+        .filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')[:batch_size]
+    )
+    if not batch:
+        return 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning("Could not connect to the mail server: %s", exc)
+        for email in batch:
+            _failed(email, f'connection failed: {exc!r}', now)
+        return 0
+
+    sent = []
+    try:
+        for email in batch:
+            try:
+                _message(email, connection).send()
+            except Exception as exc:
+                logger.warning("Sending email %s failed: %s", email.id, exc)
+                _failed(email, repr(exc), now)
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+
+    OutgoingEmail.objects.filter(id__in=sent).update(
+        status=OutgoingEmail.SENT,
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        last_error=''
+    )
+    return len(sent)
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.jobs.queue import schedule_periodic
+from apps.jobs.worker import Worker
+from . import outbox
+from .models import OutgoingEmail
+
+
+class BouncingBackend(LocmemBackend):
+    """locmem backend that refuses mail for addresses starting with 'bounce'."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].startswith('bounce'):
+                raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise OSError('connection refused')
+
+    def send_messages(self, messages):
+        raise AssertionError('should not send without a connection')
+
+
+class OutboxTests(TestCase):
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(3):
+            outbox.queue_email('Hello', f'Message {i}', [f'student{i}@nyu.edu'])
+        self.assertEqual(len(mail.outbox), 0)
+
+        with mock.patch.object(outbox, 'get_connection', wraps=outbox.get_connection) as connect:
+            self.assertEqual(outbox.deliver_pending(), 3)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual([m.body for m in mail.outbox], ['Message 0', 'Message 1', 'Message 2'])
+        self.assertEqual(mail.outbox[0].from_email, 'ClassBuddy <classbuddy8@gmail.com>')
+        self.assertFalse(OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists())
+        self.assertEqual(outbox.deliver_pending(), 0)
+
+    @override_settings(EMAIL_BACKEND='apps.mailer.tests.BouncingBackend')
+    def test_failures_back_off_without_blocking_the_batch(self):
+        bounced = outbox.queue_email('Hi', 'x', ['bounce@nyu.edu'])
+        outbox.queue_email('Hi', 'y', ['ok@nyu.edu'])
+
+        self.assertEqual(outbox.deliver_pending(), 1)
+        self.assertEqual([m.to for m in mail.outbox], [['ok@nyu.edu']])
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), (OutgoingEmail.PENDING, 1))
+        self.assertIn('mailbox unavailable', bounced.last_error)
+        self.assertGreater(bounced.next_attempt_at, timezone.now())
+
+        # Not due yet, then given up after MAX_ATTEMPTS.
+        self.assertEqual(outbox.deliver_pending(), 0)
+        for _ in range(outbox.MAX_ATTEMPTS - 1):
+            OutgoingEmail.objects.filter(id=bounced.id).update(next_attempt_at=timezone.now())
+            outbox.deliver_pending()
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), (OutgoingEmail.FAILED, outbox.MAX_ATTEMPTS))
+
+    @override_settings(EMAIL_BACKEND='apps.mailer.tests.UnreachableBackend')
+    def test_unreachable_server_defers_the_whole_batch(self):
+        outbox.queue_email('Hi', 'x', ['a@nyu.edu'])
+        outbox.queue_email('Hi', 'y', ['b@nyu.edu'])
+        self.assertEqual(outbox.deliver_pending(), 0)
+        self.assertEqual(
+            list(OutgoingEmail.objects.values_list('status', 'attempts')),
+            [(OutgoingEmail.PENDING, 1)] * 2
+        )
+
+    def test_queueing_pulls_the_delivery_job_forward(self):
+        with mock.patch.dict('apps.jobs.queue.PERIODIC', {'mailer.deliver': timedelta(minutes=1)}, clear=True):
+            schedule_periodic()
+        Job.objects.filter(key='mailer.deliver').update(run_at=timezone.now() + timedelta(minutes=1))
+
+        outbox.queue_email('Hi', 'x', ['a@nyu.edu'])
+        job = Job.objects.get(key='mailer.deliver')
+        self.assertLessEqual(job.run_at, timezone.now())
+
+    def test_worker_keeps_batches_sent_before_a_failure(self):
+        first = outbox.queue_email('Hi', 'x', ['a@nyu.edu'])
+        second = outbox.queue_email('Hi', 'y', ['b@nyu.edu'])
+        batches = []
+
+        def one_batch_then_fail():
+            if batches:
+                raise DatabaseError('connection lost')
+            batches.append(1)
+            return outbox.deliver_pending(batch_size=1)
+
+        with mock.patch.dict('apps.jobs.queue.PERIODIC', {'mailer.deliver': timedelta(minutes=1)}, clear=True), \
+                mock.patch('apps.mailer.jobs.deliver_pending', side_effect=one_batch_then_fail):
+            Worker(name='test-worker').run_once()
+
+        self.assertEqual(Job.objects.get(key='mailer.deliver').status, Job.QUEUED)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), (OutgoingEmail.SENT, OutgoingEmail.PENDING))
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,170 @@
+"""iCalendar (RFC 5545) export of a user's meetings.
+
+Each user has a feed version in the cache that signals bump whenever one
+of their meetings or group memberships changes. The version doubles as
+the ETag and Last-Modified of the feed, so a polling calendar client is
+answered with 304 after one token lookup and one cache read, without
+touching the meetings tables. When a feed does have to be rebuilt, each
+event is rendered once per meeting revision and reused from the cache.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+FEED_TIMEOUT = 3600
+EVENT_TIMEOUT = 24 * 3600
+DEFAULT_DURATION = timedelta(hours=1)
+PRODID = '-//ClassBuddy//Meetings//EN'
+
+
+def _version_key(user_id):
+    return f'calendar_version:user:{user_id}'
+
+
+def bump_feed_versions(user_ids):
+    """Marks the feeds of these users as changed now."""
+    stamp = timezone.now().timestamp()
+    cache.set_many({_version_key(user_id): stamp for user_id in set(user_ids)}, None)
+
+
+def bump_group_feeds(group_ids):
+    """Bumps the feeds of all members of these groups once the current
+    transaction commits, so a feed rebuilt for the new version sees it."""
+    from apps.study_groups.models import StudyGroup
+
+    user_ids = list(
+        StudyGroup.members.through.objects.filter(
+            studygroup_id__in=list(group_ids)
+        ).values_list('user_id', flat=True)
+    )
+    if user_ids:
+        transaction.on_commit(lambda: bump_feed_versions(user_ids))
+
+
+def feed_version(user_id):
+    """Returns the version stamp of a user's feed (a POSIX timestamp).
+
+    A missing version, e.g. after the cache was flushed, is treated as a
+    change happening now: clients refetch once instead of ever seeing a
+    stale feed.
+    """
+    key = _version_key(user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = timezone.now().timestamp()
+        if not cache.add(key, stamp, None):
+            stamp = cache.get(key, stamp)
+    return stamp
+
+
+def feed_etag(user_id, stamp):
+    return f'"{user_id}-{int(stamp * 1_000_000)}"'
+
+
+def escape_text(value):
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Folds a content line at 75 octets as RFC 5545 requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character.
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(meeting, group_name):
+    """Returns the VEVENT block of a meeting, or '' if it has no date."""
+    if meeting['date'] is None:
+        return ''
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:meeting-{meeting['id']}@classbuddy",
+        f"DTSTAMP:{_utc(meeting['updated_at'])}",
+        f"LAST-MODIFIED:{_utc(meeting['updated_at'])}",
+    ]
+    if meeting['time'] is None:
+        day = meeting['date']
+        lines += [
+            f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",
+        ]
+    else:
+        start = timezone.make_aware(datetime.combine(meeting['date'], meeting['time']))
+        lines += [
+            f'DTSTART:{_utc(start)}',
+            f'DTEND:{_utc(start + DEFAULT_DURATION)}',
+        ]
+    lines.append(f"SUMMARY:{escape_text(meeting['title'])} ({escape_text(group_name)})")
+    if meeting['description']:
+        lines.append(f"DESCRIPTION:{escape_text(meeting['description'])}")
+    lines.append(f'CATEGORIES:{escape_text(group_name)}')
+    lines.append('STATUS:CONFIRMED')
+    lines.append('END:VEVENT')
+    return '\r\n'.join(fold(line) for line in lines) + '\r\n'
+
+
+def _event_key(meeting, group_name):
+    revision = f"{meeting['id']}:{meeting['updated_at'].isoformat()}:{group_name}"
+    return 'calendar_event:' + hashlib.sha1(revision.encode('utf-8')).hexdigest()
+
+
+def build_feed(meetings):
+    """Renders the VCALENDAR for rows of Meeting.values() plus group_name.
+
+    Events are cached per meeting revision, so after a change only the
+    edited meeting is rendered again.
+    """
+    keys = [_event_key(meeting, meeting['study_group__name']) for meeting in meetings]
+    cached = cache.get_many(keys)
+    missing = {}
+    events = []
+    for key, meeting in zip(keys, meetings):
+        event = cached.get(key)
+        if event is None:
+            event = missing[key] = render_event(meeting, meeting['study_group__name'])
+        events.append(event)
+    if missing:
+        cache.set_many(missing, EVENT_TIMEOUT)
+    return (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        f'PRODID:{PRODID}\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        'X-WR-CALNAME:ClassBuddy meetings\r\n'
+        + ''.join(events)
+        + 'END:VCALENDAR\r\n'
+    )
+
+
+def cached_feed(user_id, etag, load_meetings):
+    """Returns the feed body for this version, building it at most once."""
+    key = f'calendar_feed:{user_id}:{etag}'
+    body = cache.get(key)
+    if body is None:
+        body = build_feed(load_meetings())
+        cache.set(key, body, FEED_TIMEOUT)
+    return body
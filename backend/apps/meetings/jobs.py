@@ -0,0 +1,93 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.caching.signals import invalidate_group_meetings
+from apps.jobs.queue import register
+from apps.notifications.models import Notification
+from apps.notifications.services import create_notifications, notify_users
+from apps.study_groups.models import StudyGroup
+from .ical import DEFAULT_DURATION, bump_group_feeds
+from .models import Meeting
+
+
+def meeting_start(meeting):
+    """Aware start of a dated meeting; all-day meetings start at midnight."""
+    return timezone.make_aware(datetime.combine(meeting.date, meeting.time or time.min))
+
+
+@register('meetings.notify')
+def notify(user_id, message):
+    """Records an in-app notification queued by views.send_notification."""
+    notify_users([user_id], message, 'GROUP_UPDATE')
+
+
+@register('meetings.complete_past', every=timedelta(minutes=5))
+def complete_past_meetings():
+    """Marks meetings COMPLETED once they are over, in one UPDATE.
+
+    A timed meeting is over DEFAULT_DURATION after its start, an all-day
+    meeting at the end of its day. Meetings without a date never end.
+    """
+    now = timezone.localtime()
+    cutoff = now - DEFAULT_DURATION
+    past = Meeting.objects.filter(status='UPCOMING').filter(
+        Q(time__isnull=True, date__lt=now.date())
+        | Q(time__isnull=False, date__lt=cutoff.date())
+        | Q(date=cutoff.date(), time__lte=cutoff.time())
+    )
+    group_ids = set(past.values_list('study_group_id', flat=True))
+    if not group_ids:
+        return 0
+    # update() skips auto_now and post_save, so do their work here.
+    completed = past.update(status='COMPLETED', updated_at=timezone.now())
+    bump_group_feeds(group_ids)
+    invalidate_group_meetings(group_ids)
+    return completed
+
+
+@register('meetings.send_reminders', every=timedelta(minutes=5))
+def send_meeting_reminders():
+    """Creates MEETING_REMINDER notifications for meetings starting soon.
+
+    Each meeting is reminded once: reminder_sent_at is set in the same
+    transaction that creates its notifications.
+    """
+    now = timezone.localtime()
+    horizon = now + timedelta(minutes=settings.MEETING_REMINDER_LEAD_MINUTES)
+    candidates = (
+        Meeting.objects.select_for_update(skip_locked=True, of=('self',))
+        .filter(
+            status='UPCOMING',
+            reminder_sent_at__isnull=True,
+            date__gte=now.date(),
+            date__lte=horizon.date()
+        )
+        .select_related('study_group')
+    )
+    due = [meeting for meeting in candidates if now <= meeting_start(meeting) <= horizon]
+    if not due:
+        return 0
+
+    members = {}
+    for group_id, user_id in StudyGroup.members.through.objects.filter(
+        studygroup_id__in={meeting.study_group_id for meeting in due}
+    ).values_list('studygroup_id', 'user_id'):
+        members.setdefault(group_id, []).append(user_id)
+
+    notifications = []
+    for meeting in due:
+        if meeting.time is None:
+            when = f"is on {meeting.date:%b %d}"
+        else:
+            when = f"starts at {meeting.time:%H:%M} on {meeting.date:%b %d}"
+        message = f"Reminder: '{meeting.title}' ({meeting.study_group.name}) {when}."
+        notifications += [
+            Notification(user_id=user_id, message=message, notification_type='MEETING_REMINDER')
+            for user_id in members.get(meeting.study_group_id, [])
+        ]
+    create_notifications(notifications)
+    Meeting.objects.filter(id__in=[meeting.id for meeting in due]).update(reminder_sent_at=now)
+    return len(notifications)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['study_group', 'date'], name='meeting_group_date_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0004_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('status', 'UPCOMING')), fields=['date', 'time'], name='meeting_upcoming_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -22,6 +24,8 @@ class Meeting(models.Model):
     date = models.DateField(null=True, blank=True)  # <-- make nullable
     time = models.TimeField(null=True, blank=True)  # <-- make nullable
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
 
     attendees = models.ManyToManyField(User, related_name='meeting_attendees', blank=True)
 
@@ -31,6 +35,18 @@ class Meeting(models.Model):
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='UPCOMING')
 
+    class Meta:
+        indexes = [
+            # Feed lookups: the user's groups, narrowed by date range.
+            models.Index(fields=['study_group', 'date'], name='meeting_group_date_idx'),
+            # Scanned by the reminder and completion jobs.
+            models.Index(
+                fields=['date', 'time'],
+                name='meeting_upcoming_idx',
+                condition=models.Q(status='UPCOMING')
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.study_group.name} on {self.date}"
 
@@ -87,3 +103,34 @@ class AvailabilitySlot(models.Model):
 
     def get_attendees(self):
         return self.attendees.all()
+
+
+class CalendarFeedToken(models.Model):
+    """Secret that authenticates a user's iCalendar feed URL.
+
+    Calendar apps cannot send auth headers, so the key lives in the URL;
+    rotating it revokes every subscription made with the old link.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='calendar_token'
+    )
+    key = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Calendar feed for {self.user}"
+
+    @staticmethod
+    def generate_key():
+        return secrets.token_urlsafe(32)
+
+    @classmethod
+    def for_user(cls, user):
+        token, _ = cls.objects.get_or_create(user=user, defaults={'key': cls.generate_key()})
+        return token
+
+    def rotate(self):
+        self.key = self.generate_key()
+        self.save(update_fields=['key', 'created_at'])
@@ -0,0 +1,192 @@
+"""Common availability windows from AvailabilitySlot intervals.
+
+Each user's slots are first merged, then a sweep over the sorted slot
+endpoints yields the segments between consecutive endpoints together with
+how many users are free for the whole segment. A segment is only a piece
+of a window: another user's shorter slot splits the time a group shares.
+So each segment is then widened to the longest stretch in which all of
+its users stay free, which gives the maximal window for that attendee set.
+
+Large inputs are swept with NumPy when it is installed; the pure-Python
+sweep gives identical results and is used otherwise.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+NUMPY_THRESHOLD = 256
+CACHE_TIMEOUT = 60 * 60
+UPCOMING_BUCKET = 5 * 60
+
+
+def merge_intervals(intervals):
+    """Merges overlapping or adjacent (start, end) pairs of one user.
+
+    Works with any comparable values (numbers or datetimes); empty
+    intervals are dropped and the result is sorted by start.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+            continue
+        merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def merge_user_intervals(intervals):
+    """Merges overlapping or adjacent intervals per user.
+
+    `intervals` is an iterable of (user_id, start, end) with numeric times;
+    returns a list of the same shape, sorted by user and start.
+    """
+    per_user = {}
+    for user_id, start, end in intervals:
+        per_user.setdefault(user_id, []).append((start, end))
+    return [
+        (user_id, start, end)
+        for user_id in sorted(per_user)
+        for start, end in merge_intervals(per_user[user_id])
+    ]
+
+
+def _segments_python(merged):
+    deltas = {}
+    for _, start, end in merged:
+        deltas[start] = deltas.get(start, 0) + 1
+        deltas[end] = deltas.get(end, 0) - 1
+    times = sorted(deltas)
+    segments = []
+    active = 0
+    for left, right in zip(times, times[1:]):
+        active += deltas[left]
+        if active:
+            segments.append((left, right, active))
+    return segments
+
+
+def _segments_numpy(merged):
+    starts = np.fromiter((start for _, start, _ in merged), dtype=np.float64, count=len(merged))
+    ends = np.fromiter((end for _, _, end in merged), dtype=np.float64, count=len(merged))
+    times, inverse = np.unique(np.concatenate([starts, ends]), return_inverse=True)
+    deltas = np.zeros(len(times), dtype=np.int64)
+    np.add.at(deltas, inverse, np.concatenate([np.ones(len(starts), np.int64), -np.ones(len(ends), np.int64)]))
+    active = np.cumsum(deltas)[:-1]
+    keep = active > 0
+    return list(zip(times[:-1][keep].tolist(), times[1:][keep].tolist(), active[keep].tolist()))
+
+
+def _maximal_windows(merged, segments):
+    """Widens every segment to the maximal window of the users free in it.
+
+    Those users are free from the latest start to the earliest end of
+    their merged intervals that cover the segment. Returns a dict mapping
+    (start, end) to the sorted attendee ids; segments of the same attendee
+    set widen to the same window and are reported once.
+    """
+    by_start = sorted(merged, key=lambda interval: interval[1])
+    active = {}
+    windows = {}
+    position = 0
+    for left, right, _ in segments:
+        while position < len(by_start) and by_start[position][1] <= left:
+            user_id, start, end = by_start[position]
+            active[user_id] = (start, end)
+            position += 1
+        for user_id in [user_id for user_id, (_, end) in active.items() if end <= left]:
+            del active[user_id]
+        start = max(start for start, _ in active.values())
+        end = min(end for _, end in active.values())
+        windows[(start, end)] = sorted(active)
+    return windows
+
+
+def common_windows(intervals, min_duration=0, min_attendees=2, limit=10, use_numpy=None):
+    """Returns the best windows when several users are free at once.
+
+    Every window is as long as its attendees are all free. Windows are
+    ranked by attendee count, then duration, then start time, and shorter
+    than `min_duration` or with fewer than `min_attendees` users are
+    dropped. Each result is a dict with start, end, duration and the
+    sorted attendee ids.
+    """
+    merged = merge_user_intervals(intervals)
+    if not merged:
+        return []
+    if use_numpy is None:
+        use_numpy = np is not None and len(merged) >= NUMPY_THRESHOLD
+    segments = _segments_numpy(merged) if use_numpy else _segments_python(merged)
+
+    candidates = [
+        (start, end, attendees)
+        for (start, end), attendees in _maximal_windows(merged, segments).items()
+        if len(attendees) >= min_attendees and end - start >= min_duration
+    ]
+    candidates.sort(key=lambda w: (-len(w[2]), -(w[1] - w[0]), w[0]))
+
+    return [
+        {
+            'start': start,
+            'end': end,
+            'duration': end - start,
+            'attendees': attendees,
+        }
+        for start, end, attendees in candidates[:limit]
+    ]
+
+
+def _version_key(scope, object_id):
+    return f'availability_version:{scope}:{object_id}'
+
+
+def availability_version(scope, object_id):
+    return cache.get_or_set(_version_key(scope, object_id), 1, None)
+
+
+def invalidate_availability(meeting):
+    """Drops cached windows for a meeting and its study group."""
+    for scope, object_id in (('meeting', meeting.pk), ('group', meeting.study_group_id)):
+        key = _version_key(scope, object_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def upcoming_since(now=None):
+    """Start of the UPCOMING_BUCKET-second bucket that contains `now`.
+
+    Upcoming windows are computed from this instant and cached under it, so
+    slots that have ended drop out of the answer within one bucket.
+    """
+    now = now or timezone.now()
+    return now - timedelta(seconds=now.timestamp() % UPCOMING_BUCKET)
+
+
+def cached_common_windows(scope, object_id, load_intervals, since=None, **options):
+    """common_windows() memoized per scope object and options.
+
+    The key embeds a version number that invalidate_availability bumps, so
+    stale entries are never read and simply expire. Results that depend on
+    the current time pass the upcoming_since() instant they were loaded
+    from as `since`, which becomes part of the key.
+    """
+    version = availability_version(scope, object_id)
+    params = ':'.join(f'{name}={options[name]}' for name in sorted(options))
+    key = f'availability_windows:{scope}:{object_id}:v{version}:{params}'
+    if since is not None:
+        key += f':since={int(since.timestamp())}'
+    windows = cache.get(key)
+    if windows is None:
+        windows = common_windows(load_intervals(), **options)
+        cache.set(key, windows, CACHE_TIMEOUT)
+    return windows
@@ -33,6 +33,16 @@ class AvailabilitySlotSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'start_time', 'end_time', 'created_at']
         read_only_fields = ['user', 'created_at']
 
+class AvailabilityIntervalSerializer(serializers.Serializer):
+    """One interval of a bulk availability submission."""
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError('end_time must be after start_time')
+        return data
+
 class MeetingSerializer(serializers.ModelSerializer):
     study_group = StudyGroupSerializer(read_only=True)
     study_group_id = serializers.PrimaryKeyRelatedField(
@@ -80,4 +90,17 @@ class MeetingSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Set the creator field to the current user
         validated_data['creator'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class StudyGroupSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StudyGroup
+        fields = ['id', 'name', 'subject']
+
+class MeetingListSerializer(MeetingSerializer):
+    """Meeting card for the feed: group summary, no availability slots."""
+    study_group = StudyGroupSummarySerializer(read_only=True)
+
+    class Meta(MeetingSerializer.Meta):
+        fields = ['id', 'title', 'description', 'study_group', 'creator',
+                 'date', 'time', 'status', 'created_at']
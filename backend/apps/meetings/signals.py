@@ -0,0 +1,57 @@
+import weakref
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.study_groups.models import StudyGroup
+from .models import Meeting, AvailabilitySlot
+from .overlap import invalidate_availability
+from .ical import bump_feed_versions, bump_group_feeds
+
+
+# delete() signals once per slot; remember which meetings each delete call
+# (its origin) has already invalidated so a bulk delete loads each meeting once.
+_invalidated_by_delete = weakref.WeakKeyDictionary()
+
+
+@receiver(post_save, sender=AvailabilitySlot)
+def availability_changed(sender, instance, **kwargs):
+    invalidate_availability(instance.meeting)
+
+
+@receiver(post_delete, sender=AvailabilitySlot)
+def availability_deleted(sender, instance, origin=None, **kwargs):
+    try:
+        invalidated = _invalidated_by_delete.setdefault(origin, set())
+    except TypeError:
+        invalidated = set()
+    if instance.meeting_id not in invalidated:
+        invalidated.add(instance.meeting_id)
+        invalidate_availability(instance.meeting)
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def meeting_changed(sender, instance, **kwargs):
+    bump_group_feeds([instance.study_group_id])
+
+
+@receiver(post_save, sender=StudyGroup)
+def group_changed(sender, instance, created, **kwargs):
+    # Renames and soft deletes change what members see in their feeds.
+    if not created:
+        bump_group_feeds([instance.pk])
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            user_id = instance.pk
+            transaction.on_commit(lambda: bump_feed_versions([user_id]))
+    elif action == 'pre_clear':
+        bump_group_feeds([instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        user_ids = list(pk_set)
+        transaction.on_commit(lambda: bump_feed_versions(user_ids))
@@ -1,3 +1,614 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.test import TestCase, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.jobs.models import Job
+from apps.jobs.worker import Worker
+from apps.notifications.models import Notification
+from apps.study_groups.models import StudyGroup
+from . import jobs as meeting_jobs
+from .models import Meeting, AvailabilitySlot, CalendarFeedToken
+from . import overlap, ical
+
+User = get_user_model()
+
+
+class OverlapEngineTests(SimpleTestCase):
+    def test_windows_ranked_by_attendees_then_duration(self):
+        intervals = [
+            (1, 0, 100), (1, 90, 120),   # merged into 0-120
+            (2, 30, 80),
+            (3, 40, 60), (3, 110, 200),
+            (4, 110, 130),
+        ]
+        windows = overlap.common_windows(intervals, min_attendees=2)
+        self.assertEqual(windows[0], {'start': 40, 'end': 60, 'duration': 20, 'attendees': [1, 2, 3]})
+        self.assertEqual(windows[1]['attendees'], [1, 3, 4])
+        self.assertEqual((windows[2]['start'], windows[2]['end']), (30, 80))
+
+        windows = overlap.common_windows(intervals, min_duration=15, min_attendees=3)
+        self.assertEqual([(w['start'], w['end']) for w in windows], [(40, 60)])
+
+    def test_shorter_slot_of_another_user_does_not_split_a_window(self):
+        windows = overlap.common_windows([(1, 0, 600), (2, 0, 600), (3, 180, 300)], min_duration=240)
+        self.assertEqual(windows, [{'start': 0, 'end': 600, 'duration': 600, 'attendees': [1, 2]}])
+
+        windows = overlap.common_windows([(1, 0, 600), (2, 0, 600), (3, 180, 300)])
+        self.assertEqual(
+            [(w['start'], w['end'], w['attendees']) for w in windows],
+            [(180, 300, [1, 2, 3]), (0, 600, [1, 2])]
+        )
+
+    def test_adjacent_slots_of_one_user_are_merged(self):
+        self.assertEqual(
+            overlap.merge_user_intervals([(1, 0, 10), (1, 10, 20), (2, 5, 6), (1, 30, 40)]),
+            [(1, 0, 20), (1, 30, 40), (2, 5, 6)]
+        )
+
+    @skipIf(overlap.np is None, 'numpy is not installed')
+    def test_numpy_sweep_matches_python(self):
+        rng = random.Random(7)
+        intervals = []
+        for user_id in range(60):
+            for _ in range(8):
+                start = rng.randrange(0, 7 * 24 * 4) * 900
+                intervals.append((user_id, start, start + rng.randrange(1, 12) * 900))
+        self.assertEqual(
+            overlap.common_windows(intervals, limit=25, use_numpy=True),
+            overlap.common_windows(intervals, limit=25, use_numpy=False)
+        )
+
+
+class CommonAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(
+                email=f'student{i}@nyu.edu',
+                password='segroup2',
+                first_name='Student',
+                last_name=str(i)
+            ) for i in range(3)
+        ]
+        self.outsider = User.objects.create_user(
+            email='outsider.meet@nyu.edu',
+            password='segroup2',
+            first_name='Out',
+            last_name='Sider'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Linear Algebra',
+            description='Eigenvalues',
+            subject='Math',
+            creator=self.users[0]
+        )
+        for user in self.users:
+            self.group.add_member(user)
+        self.meeting = Meeting.objects.create(
+            title='Midterm review',
+            study_group=self.group,
+            creator=self.users[0]
+        )
+        self.monday = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=7)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def slot(self, user, start_hour, end_hour):
+        return AvailabilitySlot.objects.create(
+            meeting=self.meeting,
+            user=user,
+            start_time=self.monday + timedelta(hours=start_hour),
+            end_time=self.monday + timedelta(hours=end_hour)
+        )
+
+    def test_meeting_windows_are_cached_until_slots_change(self):
+        self.slot(self.users[0], 9, 12)
+        self.slot(self.users[1], 10, 13)
+        url = reverse('meeting-common-availability', args=[self.meeting.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['start'], self.monday + timedelta(hours=10))
+        self.assertEqual(response.data[0]['duration_minutes'], 120)
+        self.assertEqual(response.data[0]['attendees'], [self.users[0].id, self.users[1].id])
+
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(url, {'min_duration': 60})
+        self.assertEqual(len(uncached), len(cached) + 1)
+
+        self.slot(self.users[2], 11, 12)
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['attendee_count'], 3)
+
+    def test_group_windows_require_membership(self):
+        self.slot(self.users[0], 9, 12)
+        self.slot(self.users[2], 8, 10)
+        url = reverse('meeting-group-availability')
+
+        response = self.client.get(url, {'study_group': self.group.id})
+        self.assertEqual(response.data[0]['duration_minutes'], 60)
+
+        self.client.force_authenticate(user=self.outsider)
+        response = self.client.get(url, {'study_group': self.group.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('meeting-common-availability', args=[self.meeting.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_group_windows_drop_slots_that_have_ended(self):
+        self.slot(self.users[0], 9, 12)
+        self.slot(self.users[1], 10, 13)
+        url = reverse('meeting-group-availability')
+        self.assertEqual(len(self.client.get(url, {'study_group': self.group.id}).data), 1)
+
+        later = self.monday + timedelta(hours=14)
+        with mock.patch('apps.meetings.overlap.timezone.now', return_value=later):
+            response = self.client.get(url, {'study_group': self.group.id})
+        self.assertEqual(response.data, [])
+
+        now = datetime(2026, 3, 2, 9, 7, 30, tzinfo=timezone.utc)
+        self.assertEqual(overlap.upcoming_since(now), datetime(2026, 3, 2, 9, 5, tzinfo=timezone.utc))
+
+
+class BulkAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(
+            email='bulk.member@nyu.edu',
+            password='segroup2',
+            first_name='Bulk',
+            last_name='Member'
+        )
+        self.other = User.objects.create_user(
+            email='bulk.other@nyu.edu',
+            password='segroup2',
+            first_name='Bulk',
+            last_name='Other'
+        )
+        self.outsider = User.objects.create_user(
+            email='bulk.outsider@nyu.edu',
+            password='segroup2',
+            first_name='Bulk',
+            last_name='Outsider'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Operating Systems',
+            description='Schedulers',
+            subject='CS',
+            creator=self.member
+        )
+        self.group.add_member(self.member)
+        self.group.add_member(self.other)
+        self.meeting = Meeting.objects.create(
+            title='Project sync',
+            study_group=self.group,
+            creator=self.member
+        )
+        self.monday = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=7)
+        self.url = reverse('availability-bulk', kwargs={'meeting_pk': self.meeting.id})
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+
+    def interval(self, day, start_hour, end_hour):
+        base = self.monday + timedelta(days=day)
+        return {
+            'start_time': (base + timedelta(hours=start_hour)).isoformat(),
+            'end_time': (base + timedelta(hours=end_hour)).isoformat(),
+        }
+
+    def test_merge_intervals(self):
+        self.assertEqual(
+            overlap.merge_intervals([(5, 7), (0, 2), (2, 3), (1, 2), (9, 9)]),
+            [(0, 3), (5, 7)]
+        )
+
+    def test_week_is_merged_and_replaces_previous_slots(self):
+        AvailabilitySlot.objects.create(
+            meeting=self.meeting,
+            user=self.member,
+            start_time=self.monday,
+            end_time=self.monday + timedelta(hours=1)
+        )
+        kept = AvailabilitySlot.objects.create(
+            meeting=self.meeting,
+            user=self.other,
+            start_time=self.monday,
+            end_time=self.monday + timedelta(hours=1)
+        )
+        week = []
+        for day in range(7):
+            # Half-hour grid cells from 9 to 12 collapse into one interval.
+            week += [self.interval(day, 9 + half / 2, 9.5 + half / 2) for half in range(6)]
+        week.append(self.interval(0, 11, 14))
+
+        response = self.client.put(self.url, {'slots': week}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+
+        slots = list(AvailabilitySlot.objects.filter(meeting=self.meeting, user=self.member).order_by('start_time'))
+        self.assertEqual(len(slots), 7)
+        self.assertEqual(slots[0].start_time, self.monday + timedelta(hours=9))
+        self.assertEqual(slots[0].end_time, self.monday + timedelta(hours=14))
+        self.assertEqual(slots[1].end_time - slots[1].start_time, timedelta(hours=3))
+        self.assertTrue(AvailabilitySlot.objects.filter(id=kept.id).exists())
+
+    def test_resubmitting_the_same_week_does_not_conflict(self):
+        week = [self.interval(day, 9, 12) for day in range(5)]
+        for _ in range(2):
+            response = self.client.put(self.url, {'slots': week}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AvailabilitySlot.objects.filter(user=self.member).count(), 5)
+
+        response = self.client.put(self.url, {'slots': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AvailabilitySlot.objects.filter(user=self.member).exists())
+
+    def test_bulk_submission_invalidates_cached_windows(self):
+        self.client.force_authenticate(user=self.other)
+        self.client.put(self.url, {'slots': [self.interval(0, 9, 12)]}, format='json')
+        self.client.force_authenticate(user=self.member)
+        windows_url = reverse('meeting-common-availability', args=[self.meeting.id])
+        self.assertEqual(self.client.get(windows_url).data, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {'slots': [self.interval(0, 10, 11)]}, format='json')
+        response = self.client.get(windows_url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['attendee_count'], 2)
+
+    def test_query_count_is_independent_of_interval_count(self):
+        week = [self.interval(day, hour, hour + 0.5) for day in range(7) for hour in range(8, 20, 1)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, {'slots': week}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 84)
+        # Membership lookup, delete and a single INSERT (plus savepoints).
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertLessEqual(len(statements), 3)
+
+    def test_replacing_a_week_loads_the_meeting_once(self):
+        week = [self.interval(day, hour, hour + 0.5) for day in range(7) for hour in range(8, 20, 1)]
+        self.client.put(self.url, {'slots': week}, format='json')
+        with mock.patch('apps.meetings.signals.invalidate_availability') as invalidate:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(self.url, {'slots': week}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AvailabilitySlot.objects.filter(user=self.member).count(), 84)
+        self.assertEqual(invalidate.call_count, 1)
+        # Membership lookup, the old slots, their meeting, delete and insert.
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertLessEqual(len(statements), 5)
+
+    def test_invalid_submissions_are_rejected(self):
+        bad = self.interval(0, 12, 9)
+        response = self.client.put(self.url, {'slots': [bad]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.put(self.url, {'slots': 'monday'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.outsider)
+        response = self.client.put(self.url, {'slots': [self.interval(0, 9, 10)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_duplicate_single_slot_is_a_client_error(self):
+        url = reverse('availability-list', kwargs={'meeting_pk': self.meeting.id})
+        payload = self.interval(0, 9, 10)
+        self.assertEqual(self.client.post(url, payload, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(url, payload, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MeetingFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='feed.user@nyu.edu',
+            password='segroup2',
+            first_name='Feed',
+            last_name='User'
+        )
+        self.classmate = User.objects.create_user(
+            email='feed.classmate@nyu.edu',
+            password='segroup2',
+            first_name='Feed',
+            last_name='Classmate'
+        )
+        self.groups = []
+        for i in range(3):
+            group = StudyGroup.objects.create(
+                name=f'Feed group {i}',
+                description='Weekly sync',
+                subject='CS',
+                creator=self.user
+            )
+            group.add_member(self.user)
+            group.add_member(self.classmate)
+            self.groups.append(group)
+        self.today = date.today()
+        self.url = reverse('meeting-list')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def add_meetings(self, count, offset=0):
+        for i in range(count):
+            meeting = Meeting.objects.create(
+                title=f'Meeting {offset + i}',
+                study_group=self.groups[i % len(self.groups)],
+                creator=self.classmate,
+                date=self.today + timedelta(days=offset + i)
+            )
+            AvailabilitySlot.objects.create(
+                meeting=meeting,
+                user=self.classmate,
+                start_time=datetime.now(timezone.utc),
+                end_time=datetime.now(timezone.utc) + timedelta(hours=1)
+            )
+
+    def test_list_uses_compact_group_summary(self):
+        self.add_meetings(2)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([m['title'] for m in response.data], ['Meeting 0', 'Meeting 1'])
+        self.assertEqual(
+            response.data[0]['study_group'],
+            {'id': self.groups[0].id, 'name': 'Feed group 0', 'subject': 'CS'}
+        )
+        self.assertNotIn('availability_slots', response.data[0])
+
+        detail = self.client.get(reverse('meeting-detail', args=[response.data[0]['id']]))
+        self.assertEqual(len(detail.data['availability_slots']), 1)
+
+    def test_meetings_are_not_duplicated_or_leaked(self):
+        self.add_meetings(3)
+        outsider_group = StudyGroup.objects.create(
+            name='Other group',
+            description='Not ours',
+            subject='Math',
+            creator=self.classmate
+        )
+        outsider_group.add_member(self.classmate)
+        Meeting.objects.create(title='Private', study_group=outsider_group, creator=self.classmate)
+        self.groups[1].delete_group()
+
+        response = self.client.get(self.url)
+        titles = [m['title'] for m in response.data]
+        self.assertEqual(titles, ['Meeting 0', 'Meeting 2'])
+
+    def test_date_range_status_and_pagination(self):
+        self.add_meetings(10)
+        Meeting.objects.filter(title='Meeting 3').update(status='COMPLETED')
+
+        response = self.client.get(self.url, {
+            'date_after': (self.today + timedelta(days=2)).isoformat(),
+            'date_before': (self.today + timedelta(days=6)).isoformat(),
+            'status': 'UPCOMING',
+        })
+        self.assertEqual([m['title'] for m in response.data], ['Meeting 2', 'Meeting 4', 'Meeting 5'])
+
+        response = self.client.get(self.url, {'page_size': 4, 'page': 2})
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual([m['title'] for m in response.data['results']],
+                         ['Meeting 4', 'Meeting 5', 'Meeting 6', 'Meeting 7'])
+
+        for params in ({'date_after': 'tomorrow'}, {'status': 'CANCELLED'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_query_count_is_constant(self):
+        self.add_meetings(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self.add_meetings(60, offset=2)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 62)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        self.assertLessEqual(len(large.captured_queries), 2)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ical.user@nyu.edu',
+            password='segroup2',
+            first_name='Ical',
+            last_name='User'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Databases, Spring',
+            description='Query planning',
+            subject='CS',
+            creator=self.user
+        )
+        self.group.add_member(self.user)
+        self.meeting = Meeting.objects.create(
+            title='Index tuning',
+            description='Bring your EXPLAIN output',
+            study_group=self.group,
+            creator=self.user,
+            date=date(2026, 11, 2),
+            time=time(15, 30)
+        )
+        Meeting.objects.create(
+            title='Reading day',
+            study_group=self.group,
+            creator=self.user,
+            date=date(2026, 11, 3)
+        )
+        Meeting.objects.create(title='Unscheduled', study_group=self.group, creator=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        link = self.client.get(reverse('meeting-calendar-link')).data['url']
+        self.feed_url = link[link.index('/api/'):]
+        self.feed = APIClient()
+
+    def test_feed_lists_dated_meetings(self):
+        response = self.feed.get(self.feed_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:20261102T153000Z\r\n', body)
+        self.assertIn('DTSTART;VALUE=DATE:20261103\r\n', body)
+        self.assertIn('SUMMARY:Index tuning (Databases\\, Spring)\r\n', body)
+        self.assertNotIn('Unscheduled', body)
+
+    def test_unchanged_feed_is_not_modified_without_meeting_queries(self):
+        first = self.feed.get(self.feed_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.feed.get(self.feed_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertFalse(any('meetings_meeting' in q['sql'] for q in queries.captured_queries))
+
+        response = self.feed.get(self.feed_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_meeting_changes_produce_a_new_version(self):
+        first = self.feed.get(self.feed_url)
+        self.meeting.title = 'Index tuning II'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.meeting.save()
+        response = self.feed.get(self.feed_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Index tuning II', response.content.decode())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.remove_member(self.user)
+        response = self.feed.get(self.feed_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.content.decode().count('BEGIN:VEVENT'), 0)
+
+    def test_rebuild_only_renders_changed_events(self):
+        self.feed.get(self.feed_url)
+        self.meeting.description = 'Updated agenda'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.meeting.save()
+        rendered = []
+        original = ical.render_event
+
+        def spy(meeting, group_name):
+            rendered.append(meeting['id'])
+            return original(meeting, group_name)
+
+        with mock.patch.object(ical, 'render_event', spy):
+            response = self.feed.get(self.feed_url)
+        self.assertIn('DESCRIPTION:Updated agenda', response.content.decode())
+        self.assertEqual(rendered, [self.meeting.id])
+
+    def test_rotated_token_revokes_the_old_url(self):
+        link = self.client.post(reverse('meeting-calendar-link')).data['url']
+        self.assertEqual(self.feed.get(self.feed_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.feed.get(link[link.index('/api/'):]).status_code, status.HTTP_200_OK)
+        self.assertEqual(CalendarFeedToken.objects.filter(user=self.user).count(), 1)
+
+    def test_long_lines_are_folded(self):
+        line = ical.fold('DESCRIPTION:' + 'é' * 80)
+        for part in line.split('\r\n'):
+            self.assertLessEqual(len(part.encode('utf-8')), 75)
+        self.assertEqual(line.replace('\r\n ', ''), 'DESCRIPTION:' + 'é' * 80)
+
+
+class MeetingJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='jobs.user@nyu.edu',
+            password='segroup2',
+            first_name='Jobs',
+            last_name='User'
+        )
+        self.classmate = User.objects.create_user(
+            email='jobs.classmate@nyu.edu',
+            password='segroup2',
+            first_name='Jobs',
+            last_name='Classmate'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Networks',
+            description='TCP',
+            subject='CS',
+            creator=self.user
+        )
+        self.group.add_member(self.user)
+        self.group.add_member(self.classmate)
+        self.now = django_timezone.now().replace(second=0, microsecond=0)
+
+    def meeting_at(self, title, start, all_day=False):
+        return Meeting.objects.create(
+            title=title,
+            study_group=self.group,
+            creator=self.user,
+            date=start.date(),
+            time=None if all_day else start.time()
+        )
+
+    def test_past_meetings_are_completed_in_bulk(self):
+        over = self.meeting_at('Over', self.now - timedelta(hours=3))
+        running = self.meeting_at('Running', self.now - timedelta(minutes=20))
+        yesterday = self.meeting_at('Yesterday', self.now - timedelta(days=1), all_day=True)
+        today = self.meeting_at('Today', self.now, all_day=True)
+        undated = Meeting.objects.create(title='Someday', study_group=self.group, creator=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(meeting_jobs.complete_past_meetings(), 2)
+        self.assertEqual(len(callbacks), 2)  # calendar feeds and API cache
+        statuses = dict(Meeting.objects.values_list('title', 'status'))
+        self.assertEqual(statuses, {
+            'Over': 'COMPLETED',
+            'Running': 'UPCOMING',
+            'Yesterday': 'COMPLETED',
+            'Today': 'UPCOMING',
+            'Someday': 'UPCOMING',
+        })
+        self.assertEqual(meeting_jobs.complete_past_meetings(), 0)
+
+    def test_reminders_are_sent_once_to_every_member(self):
+        soon = self.meeting_at('Soon', self.now + timedelta(minutes=30))
+        self.meeting_at('Later', self.now + timedelta(hours=5))
+        self.meeting_at('Started', self.now - timedelta(minutes=5))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(meeting_jobs.send_meeting_reminders(), 2)
+        self.assertLessEqual(len(queries.captured_queries), 4)
+        reminders = Notification.objects.filter(notification_type='MEETING_REMINDER')
+        self.assertEqual(
+            sorted(reminders.values_list('user_id', flat=True)),
+            sorted([self.user.id, self.classmate.id])
+        )
+        self.assertIn("'Soon' (Networks) starts at", reminders.first().message)
+        soon.refresh_from_db()
+        self.assertIsNotNone(soon.reminder_sent_at)
+
+        self.assertEqual(meeting_jobs.send_meeting_reminders(), 0)
+        self.assertEqual(reminders.count(), 2)
+
+    def test_meeting_creation_queues_its_notification(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post(reverse('meeting-list'), {
+            'title': 'Lab prep',
+            'study_group_id': self.group.id,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Notification.objects.exists())
+
+        job = Job.objects.get(name='meetings.notify')
+        self.assertEqual(job.payload['user_id'], self.user.id)
+        Worker().execute(job)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.user)
+        self.assertIn('Lab prep', notification.message)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MeetingViewSet, AvailabilitySlotViewSet
+from .views import MeetingViewSet, AvailabilitySlotViewSet, calendar_feed
 
 router = DefaultRouter()
 router.register(r'', MeetingViewSet, basename='meeting')
@@ -10,6 +10,7 @@ availability_router = DefaultRouter()
 availability_router.register(r'', AvailabilitySlotViewSet, basename='availability')
 
 urlpatterns = [
+    path('calendar/<str:token>.ics', calendar_feed, name='meeting-calendar-feed'),
     path('', include(router.urls)),
     path('<int:meeting_pk>/availability/', include(availability_router.urls)),
 ]
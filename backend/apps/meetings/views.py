@@ -4,45 +4,85 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import connection
-from .models import Meeting, AvailabilitySlot
-from .serializers import MeetingSerializer, AvailabilitySlotSerializer
+from .models import Meeting, AvailabilitySlot, CalendarFeedToken
+from .serializers import MeetingSerializer, MeetingListSerializer, AvailabilitySlotSerializer, AvailabilityIntervalSerializer
 from apps.study_groups.models import StudyGroup
+from apps.study_groups.pagination import OptionalPageNumberPagination
+from .overlap import cached_common_windows, merge_intervals, invalidate_availability, upcoming_since
+from django.db import IntegrityError, transaction
+from datetime import datetime, timezone as dt_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import F, Prefetch
+from rest_framework.exceptions import ValidationError
 import logging
 from rest_framework.views import APIView
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+from . import ical
+from apps.jobs.queue import enqueue
+from apps.caching.resources import cached_response
 
 logger = logging.getLogger(__name__)
 
 def send_notification(user, message):
-    """Send a notification to a user."""
-    # This is a placeholder for the actual notification logic
-    logger.info(f"Sending notification to {user.email}: {message}")
+    """Queue a notification for a user; the job worker delivers it."""
+    enqueue('meetings.notify', {'user_id': user.id, 'message': message})
 
 class MeetingViewSet(viewsets.ModelViewSet):
     serializer_class = MeetingSerializer
     permission_classes = [IsAuthenticated]
 
+    pagination_class = OptionalPageNumberPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return MeetingListSerializer
+        return MeetingSerializer
+
     def get_queryset(self):
-        try:
-            logger.info(f"Fetching meetings for user: {self.request.user.email}")
-            
-            # First check if the user is in any study groups
-            user_groups = StudyGroup.objects.filter(members=self.request.user)
-            logger.info(f"User is in {user_groups.count()} study groups")
-            
-            # Get meetings where the user is a member of the study group
-            meetings = Meeting.objects.filter(
-                study_group__members=self.request.user
-            ).select_related('study_group', 'creator').prefetch_related('availability_slots')
-            
-            logger.info(f"Found {meetings.count()} meetings")
-            
-            # Log the SQL query for debugging
-            logger.info(f"SQL Query: {str(meetings.query)}")
-            
+        # A subquery rather than a join on study_group__members, so each
+        # meeting comes back once however the membership rows look.
+        meetings = Meeting.objects.filter(
+            study_group__in=StudyGroup.objects.filter(members=self.request.user).values('id')
+        ).select_related('study_group', 'creator')
+        if self.action == 'list':
+            return self.filter_list_queryset(meetings)
+        if self.action != 'retrieve':
             return meetings
-        except Exception as e:
-            logger.error(f"Error in get_queryset: {str(e)}", exc_info=True)
-            return Meeting.objects.none()
+        return meetings.prefetch_related(
+            Prefetch('availability_slots', queryset=AvailabilitySlot.objects.select_related('user'))
+        )
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, 'meetings.list', [f'meetings:user:{request.user.id}'],
+            lambda: super(MeetingViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def filter_list_queryset(self, queryset):
+        """Applies ?date_after=, ?date_before= and ?status=, soonest first."""
+        params = self.request.query_params
+
+        for param, lookup in (('date_after', 'date__gte'), ('date_before', 'date__lt')):
+            value = params.get(param)
+            if not value:
+                continue
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValidationError({param: 'Expected an ISO 8601 date.'})
+            queryset = queryset.filter(**{lookup: parsed})
+
+        meeting_status = params.get('status')
+        if meeting_status:
+            if meeting_status not in dict(Meeting.STATUS_CHOICES):
+                raise ValidationError({'status': 'Expected UPCOMING or COMPLETED.'})
+            queryset = queryset.filter(status=meeting_status)
+
+        return queryset.order_by(F('date').asc(nulls_last=True), F('time').asc(nulls_last=True), 'id')
 
     def create(self, request, *args, **kwargs):
         try:
@@ -115,7 +155,14 @@ class MeetingViewSet(viewsets.ModelViewSet):
                 # Create the availability slot
                 serializer = AvailabilitySlotSerializer(data=request.data)
                 if serializer.is_valid():
-                    serializer.save(user=request.user, meeting=meeting)
+                    try:
+                        with transaction.atomic():
+                            serializer.save(user=request.user, meeting=meeting)
+                    except IntegrityError:
+                        return Response(
+                            {'error': 'You already submitted this availability slot'},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
                     return Response(serializer.data, status=status.HTTP_201_CREATED)
                 else:
                     logger.error(f"Invalid availability data: {serializer.errors}")
@@ -128,6 +175,92 @@ class MeetingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'])
+    def common_availability(self, request, pk=None):
+        """Best windows when several members are free for this meeting.
+
+        ?min_duration= (minutes, default 30), ?min_attendees= (default 2)
+        and ?limit= (default 10, at most 50).
+        """
+        meeting = self.get_object()
+        return availability_windows_response(
+            request,
+            'meeting', meeting.id,
+            AvailabilitySlot.objects.filter(meeting=meeting)
+        )
+
+    @action(detail=False, methods=['get'])
+    def group_availability(self, request):
+        """Like common_availability, over the upcoming slots of every meeting in ?study_group=."""
+        study_group_id = request.query_params.get('study_group')
+        if not study_group_id or not study_group_id.isdigit():
+            return Response(
+                {'error': 'study_group is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not StudyGroup.objects.filter(id=study_group_id, members=request.user).exists():
+            return Response(
+                {'error': 'You are not a member of this study group'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        since = upcoming_since()
+        return availability_windows_response(
+            request,
+            'group', int(study_group_id),
+            AvailabilitySlot.objects.filter(
+                meeting__study_group_id=study_group_id,
+                end_time__gte=since
+            ),
+            since=since
+        )
+
+    @action(detail=False, methods=['get', 'post'])
+    def calendar_link(self, request):
+        """The user's iCalendar subscription URL; POST issues a new one."""
+        token = CalendarFeedToken.for_user(request.user)
+        if request.method == 'POST':
+            token.rotate()
+        return Response({
+            'url': request.build_absolute_uri(reverse('meeting-calendar-feed', args=[token.key]))
+        })
+
+def availability_windows_response(request, scope, object_id, slots, since=None):
+    try:
+        min_duration = int(request.query_params.get('min_duration', 30))
+        min_attendees = int(request.query_params.get('min_attendees', 2))
+        limit = min(int(request.query_params.get('limit', 10)), 50)
+        if min_duration < 0 or min_attendees < 1 or limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {'error': 'min_duration, min_attendees and limit must be positive integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def load_intervals():
+        return [
+            (user_id, start.timestamp(), end.timestamp())
+            for user_id, start, end in slots.values_list('user_id', 'start_time', 'end_time')
+        ]
+
+    windows = cached_common_windows(
+        scope, object_id, load_intervals,
+        since=since,
+        min_duration=min_duration * 60,
+        min_attendees=min_attendees,
+        limit=limit
+    )
+    return Response([
+        {
+            'start': datetime.fromtimestamp(window['start'], tz=dt_timezone.utc),
+            'end': datetime.fromtimestamp(window['end'], tz=dt_timezone.utc),
+            'duration_minutes': round(window['duration'] / 60),
+            'attendee_count': len(window['attendees']),
+            'attendees': window['attendees'],
+        }
+        for window in windows
+    ])
+
 class AvailabilitySlotViewSet(viewsets.ModelViewSet):
     serializer_class = AvailabilitySlotSerializer
     permission_classes = [IsAuthenticated]
@@ -137,7 +270,8 @@ class AvailabilitySlotViewSet(viewsets.ModelViewSet):
             meeting_id = self.kwargs.get('meeting_pk')
             return AvailabilitySlot.objects.filter(
                 meeting_id=meeting_id,
-                meeting__study_group__members=self.request.user
+                meeting__study_group__members=self.request.user,
+                meeting__study_group__deleted_at__isnull=True
             ).select_related('user', 'meeting')
         except Exception as e:
             logger.error(f"Error in get_queryset: {str(e)}", exc_info=True)
@@ -146,7 +280,7 @@ class AvailabilitySlotViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         try:
             meeting_id = self.kwargs.get('meeting_pk')
-            meeting = get_object_or_404(Meeting, id=meeting_id)
+            meeting = get_object_or_404(Meeting, id=meeting_id, study_group__deleted_at__isnull=True)
             
             # Check if user is a member of the study group
             if self.request.user not in meeting.study_group.members.all():
@@ -157,6 +291,53 @@ class AvailabilitySlotViewSet(viewsets.ModelViewSet):
             logger.error(f"Error in perform_create: {str(e)}", exc_info=True)
             raise
 
+    MAX_BULK_INTERVALS = 200
+
+    @action(detail=False, methods=['put'])
+    def bulk(self, request, meeting_pk=None):
+        """Replace the user's availability for this meeting in one request.
+
+        Body: {"slots": [{"start_time": ..., "end_time": ...}, ...]}, e.g. a
+        whole week grid. Overlapping and touching intervals are merged, then
+        the user's previous slots are swapped for the new set atomically.
+        An empty list clears the user's availability.
+        """
+        meeting = Meeting.objects.filter(
+            id=meeting_pk,
+            study_group__members=request.user,
+            study_group__deleted_at__isnull=True
+        ).first()
+        if meeting is None:
+            return Response(
+                {'error': 'You must be a member of the study group to add availability'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        slots = request.data.get('slots')
+        if not isinstance(slots, list) or len(slots) > self.MAX_BULK_INTERVALS:
+            return Response(
+                {'error': f'slots must be a list of at most {self.MAX_BULK_INTERVALS} intervals'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = AvailabilityIntervalSerializer(data=slots, many=True)
+        serializer.is_valid(raise_exception=True)
+        intervals = merge_intervals(
+            (interval['start_time'], interval['end_time']) for interval in serializer.validated_data
+        )
+
+        with transaction.atomic():
+            AvailabilitySlot.objects.filter(meeting=meeting, user=request.user).delete()
+            # bulk_create sends no post_save, so invalidate for the new set here.
+            created = AvailabilitySlot.objects.bulk_create([
+                AvailabilitySlot(meeting=meeting, user=request.user, start_time=start, end_time=end)
+                for start, end in intervals
+            ])
+            transaction.on_commit(lambda: invalidate_availability(meeting))
+
+        for slot in created:
+            slot.user = request.user
+        return Response(AvailabilitySlotSerializer(created, many=True).data)
+
 class MeetingAvailabilityView(APIView):
     def get(self, request, meeting_id):
         # Sample response, replace with actual logic
@@ -170,3 +351,38 @@ class StudyGroupMembersView(APIView):
     def get(self, request, group_id):
         # Sample response, replace with actual logic
         return Response({"message": f"GET members for study group {group_id}"}, status=status.HTTP_200_OK)
+
+@require_GET
+def calendar_feed(request, token):
+    """Serves the iCalendar feed behind a CalendarFeedToken.
+
+    Conditional requests are answered from the cached feed version alone;
+    meetings are only queried when the feed has to be rebuilt.
+    """
+    user_id = CalendarFeedToken.objects.filter(key=token).values_list('user_id', flat=True).first()
+    if user_id is None:
+        raise Http404
+
+    stamp = ical.feed_version(user_id)
+    etag = ical.feed_etag(user_id, stamp)
+    last_modified = int(stamp)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        response = not_modified
+    else:
+        def load_meetings():
+            return list(
+                Meeting.objects.filter(
+                    study_group__in=StudyGroup.objects.filter(members=user_id).values('id')
+                ).order_by('date', 'time', 'id').values(
+                    'id', 'title', 'description', 'date', 'time', 'updated_at', 'study_group__name'
+                )
+            )
+
+        body = ical.cached_feed(user_id, etag, load_meetings)
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="classbuddy.ics"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
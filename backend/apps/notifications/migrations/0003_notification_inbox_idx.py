@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notification_inbox_idx'),
+        ),
+    ]
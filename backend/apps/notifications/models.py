@@ -17,12 +17,18 @@ class Notification(models.Model):
     
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Inbox pages and unread counts.
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notification_inbox_idx'),
+        ]
+
     @staticmethod
     def create_notification(user_id, message, notification_type):
-        from apps.users.models import User 
-        user = User.objects.get(id=user_id)
-        Notification.objects.create(user=user, message=message, notification_type=notification_type)
+        from .services import notify_users
+        notify_users([user_id], message, notification_type)
 
     def mark_as_read(self):
+        from .services import mark_read
+        mark_read(self.user_id, ids=[self.pk])
         self.is_read = True
-        self.save()
@@ -0,0 +1,78 @@
+"""Creating notifications and keeping the cached unread counts honest.
+
+All writes go through here so the per-user unread count in the cache is
+dropped whenever it changes.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+
+UNREAD_TIMEOUT = 300
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def invalidate_unread(user_ids):
+    keys = [_unread_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        # After commit, so a concurrent read cannot cache the old count.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def create_notifications(notifications, batch_size=500):
+    """bulk_create for Notification instances, one INSERT per batch."""
+    created = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    invalidate_unread(notification.user_id for notification in notifications)
+    return created
+
+
+def notify_users(user_ids, message, notification_type):
+    """Sends the same notification to each user id, once per user."""
+    return create_notifications([
+        Notification(user_id=user_id, message=message, notification_type=notification_type)
+        for user_id in dict.fromkeys(user_ids)
+    ])
+
+
+def notify_group(group_id, message, notification_type, exclude=()):
+    """Fans a notification out to every member of a study group.
+
+    One query for the member ids and one INSERT, however large the group.
+    """
+    from apps.study_groups.models import StudyGroup
+
+    member_ids = (
+        StudyGroup.members.through.objects.filter(studygroup_id=group_id)
+        .exclude(user_id__in=list(exclude))
+        .values_list('user_id', flat=True)
+    )
+    return notify_users(member_ids, message, notification_type)
+
+
+def unread_count(user_id):
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def mark_read(user_id, ids=None, up_to=None):
+    """Marks the user's unread notifications read in one UPDATE.
+
+    Limited to `ids` and/or to ids up to `up_to` when given; with neither,
+    everything is marked read. Returns the number of rows changed.
+    """
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    if up_to is not None:
+        unread = unread.filter(id__lte=up_to)
+    updated = unread.update(is_read=True)
+    if updated:
+        invalidate_unread([user_id])
+    return updated
@@ -1,3 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.files.models import File
+from apps.study_groups.models import StudyGroup
+from .models import Notification
+from .services import notify_group, notify_users, unread_count
+
+User = get_user_model()
+
+
+class NotificationServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(
+                email=f'notified{i}@nyu.edu',
+                password='segroup2',
+                first_name='Notified',
+                last_name=str(i)
+            ) for i in range(8)
+        ]
+        self.group = StudyGroup.objects.create(
+            name='Algorithms',
+            description='Graphs',
+            subject='CS',
+            creator=self.users[0],
+            max_members=10
+        )
+        for user in self.users:
+            self.group.add_member(user)
+
+    def test_group_fan_out_is_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            created = notify_group(self.group.id, 'Exam moved', 'GROUP_UPDATE', exclude=[self.users[0].id])
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(created), 7)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(queries.captured_queries), 2)
+        self.assertFalse(Notification.objects.filter(user=self.users[0]).exists())
+
+    def test_unread_count_is_cached_and_invalidated_on_write(self):
+        user = self.users[1]
+        self.assertEqual(unread_count(user.id), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(user.id), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_users([user.id, user.id], 'Hello', 'GROUP_UPDATE')
+        self.assertEqual(unread_count(user.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.get(user=user).mark_as_read()
+        self.assertEqual(unread_count(user.id), 0)
+
+    def test_sharing_a_file_notifies_in_bulk(self):
+        file = File.objects.create(
+            name='notes.pdf',
+            file_type='PDF',
+            study_group=self.group,
+            uploaded_by=self.users[0],
+            file_path='uploads/notes.pdf'
+        )
+        file.share(self.users[1], self.users[2])
+        self.assertEqual(
+            set(Notification.objects.filter(notification_type='FILE_UPLOAD').values_list('user_id', flat=True)),
+            {self.users[1].id, self.users[2].id}
+        )
+
+        Notification.objects.all().delete()
+        file.share_with_group()
+        self.assertEqual(Notification.objects.count(), 7)
+        self.assertEqual(file.shared_with.count(), 7)
+        self.assertFalse(file.shared_with.filter(id=self.users[0].id).exists())
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='inbox.owner@nyu.edu',
+            password='segroup2',
+            first_name='Inbox',
+            last_name='Owner'
+        )
+        self.other = User.objects.create_user(
+            email='inbox.other@nyu.edu',
+            password='segroup2',
+            first_name='Inbox',
+            last_name='Other'
+        )
+        notify_users([self.other.id], 'Not yours', 'GROUP_UPDATE')
+        self.ids = [
+            notify_users([self.user.id], f'Update {i}', 'GROUP_UPDATE')[0].id
+            for i in range(6)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('notification-list')
+
+    def test_inbox_pages_newest_first(self):
+        response = self.client.get(self.url, {'limit': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['id'] for n in response.data], self.ids[::-1][:4])
+
+        response = self.client.get(self.url, {'limit': 4, 'before': response.data[-1]['id']})
+        self.assertEqual([n['id'] for n in response.data], self.ids[::-1][4:])
+
+        response = self.client.get(self.url, {'since_id': self.ids[3]})
+        self.assertEqual([n['id'] for n in response.data], self.ids[:3:-1])
+
+        response = self.client.get(self.url, {'limit': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inbox_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'limit': 50})
+        for i in range(40):
+            notify_users([self.user.id], f'More {i}', 'GROUP_UPDATE')
+        with CaptureQueriesContext(connection) as more:
+            response = self.client.get(self.url, {'limit': 50})
+        self.assertEqual(len(response.data), 46)
+        self.assertEqual(len(more.captured_queries), len(queries.captured_queries))
+
+    def test_bulk_mark_read_and_unread_count(self):
+        count_url = reverse('notification-unread-count')
+        mark_url = reverse('notification-mark-read')
+        self.assertEqual(self.client.get(count_url).data, {'unread_count': 6})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(mark_url, {'ids': self.ids[:2]}, format='json')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(self.client.get(count_url).data, {'unread_count': 4})
+        unread = self.client.get(self.url, {'unread': 'true'})
+        self.assertEqual([n['id'] for n in unread.data], self.ids[:1:-1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(mark_url, {'up_to': self.ids[3]}, format='json')
+        self.assertEqual(self.client.get(count_url).data, {'unread_count': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(mark_url, {'all': True}, format='json')
+        self.assertEqual(self.client.get(count_url).data, {'unread_count': 0})
+        self.assertTrue(Notification.objects.filter(user=self.other, is_read=False).exists())
+
+        for body in ({}, {'ids': 'all'}, {'up_to': 'x'}):
+            response = self.client.post(mark_url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,67 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from apps.study_groups.pagination import parse_page_params, keyset_page
+from .models import Notification
+from .serializers import NotificationSerializer
+from .services import unread_count, mark_read
+
+MAX_READ_IDS = 500
+
+
+class NotificationViewSet(viewsets.GenericViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
+    def list(self, request):
+        """The user's notifications, newest first.
+
+        Pages with ?limit= and ?before=<id>; ?since_id=<id> returns only newer
+        ones for polling, and ?unread=true leaves out read notifications.
+        """
+        try:
+            params = parse_page_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        notifications = self.get_queryset()
+        if request.query_params.get('unread') in ('1', 'true'):
+            notifications = notifications.filter(is_read=False)
+        try:
+            page = keyset_page(notifications, time_field='created_at', **params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        page.reverse()
+        return Response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': unread_count(request.user.id)})
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """Marks notifications read: {"ids": [...]}, {"up_to": id} or {"all": true}."""
+        ids = request.data.get('ids')
+        up_to = request.data.get('up_to')
+        if ids is not None:
+            if (not isinstance(ids, list) or len(ids) > MAX_READ_IDS
+                    or not all(isinstance(i, int) for i in ids)):
+                return Response(
+                    {'error': f'ids must be a list of at most {MAX_READ_IDS} notification ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif up_to is not None:
+            if not isinstance(up_to, int):
+                return Response({'error': 'up_to must be a notification id'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        elif request.data.get('all') is not True:
+            return Response({'error': 'Provide ids, up_to or all'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        updated = mark_read(request.user.id, ids=ids, up_to=up_to)
+        return Response({'updated': updated})
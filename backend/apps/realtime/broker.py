@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Returns the process-wide broker configured by settings.REALTIME_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
+
+
+def reset_broker():
+    """Drops the cached broker so the next get_broker() re-reads settings."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def group_channel(group_id):
+    return f'group.{group_id}'
+
+
+def user_channel(user_id):
+    return f'user.{user_id}'
+
+
+def token_fingerprint(key):
+    """Identifies an auth token in events without publishing the token itself."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class InMemorySubscription:
+    def __init__(self, broker, channels):
+        self._broker = broker
+        self.channels = set(channels)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def deliver(self, event):
+        # publish() may run on a request thread, so hand the event to the
+        # subscriber's own event loop instead of touching the queue directly.
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def get(self):
+        return await self._queue.get()
+
+    async def set_channels(self, channels):
+        self._broker._resubscribe(self, set(channels))
+
+    async def close(self):
+        self._broker._unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Fans events out to subscribers living in this process.
+
+    Good enough for a single ASGI worker and for tests. Deployments with
+    several workers need RedisBroker so every worker sees every event.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    async def subscribe(self, channels):
+        subscription = InMemorySubscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _resubscribe(self, subscription, channels):
+        with self._lock:
+            self._remove(subscription, subscription.channels - channels)
+            for channel in channels - subscription.channels:
+                self._subscribers[channel].add(subscription)
+            subscription.channels = channels
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            self._remove(subscription, subscription.channels)
+
+    def _remove(self, subscription, channels):
+        for channel in channels:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[channel]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub, prefix, channels):
+        self._pubsub = pubsub
+        self._prefix = prefix
+        self.channels = set(channels)
+
+    async def get(self):
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    async def set_channels(self, channels):
+        channels = set(channels)
+        added, removed = channels - self.channels, self.channels - channels
+        if added:
+            await self._pubsub.subscribe(*[self._prefix + channel for channel in added])
+        if removed:
+            await self._pubsub.unsubscribe(*[self._prefix + channel for channel in removed])
+        self.channels = channels
+
+    async def close(self):
+        await self._pubsub.unsubscribe()
+        await self._pubsub.aclose()
+
+
+class RedisBroker:
+    """Redis pub/sub broker shared by every worker process.
+
+    Uses settings.REDIS_URL, the same server that backs the default cache.
+    """
+
+    prefix = 'classbuddy:realtime:'
+
+    def __init__(self, url=None):
+        import redis
+        import redis.asyncio
+
+        self._url = url or settings.REDIS_URL
+        self._client = redis.Redis.from_url(self._url)
+        self._async_client = redis.asyncio.Redis.from_url(self._url)
+
+    def publish(self, channel, event):
+        self._client.publish(self.prefix + channel, json.dumps(event))
+
+    async def subscribe(self, channels):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(*[self.prefix + channel for channel in channels])
+        return RedisSubscription(pubsub, self.prefix, channels)
+
+
+def publish(channel, event):
+    """Publishes an event, logging rather than raising if the broker is down."""
+    try:
+        get_broker().publish(channel, event)
+    except Exception as e:
+        logger.error(f"Failed to publish realtime event to {channel}: {str(e)}", exc_info=True)
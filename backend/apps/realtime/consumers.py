@@ -0,0 +1,100 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+from .broker import get_broker, group_channel, token_fingerprint, user_channel
+
+logger = logging.getLogger(__name__)
+
+
+@sync_to_async
+def _user_id_for_token(key):
+    """Resolves a DRF token to the id of its active user, or None."""
+    from apps.users.authentication import get_token
+
+    token = get_token(key)
+    if token is None or not token.user.is_active:
+        return None
+    return token.user.id
+
+
+@sync_to_async
+def _group_ids(user_id):
+    from apps.study_groups.models import StudyGroup
+
+    return set(StudyGroup.objects.filter(members__id=user_id).values_list('id', flat=True))
+
+
+def _channels(user_id, group_ids):
+    return [user_channel(user_id)] + [group_channel(group_id) for group_id in group_ids]
+
+
+async def websocket_application(scope, receive, send):
+    """Pushes new group and direct messages to a connected client.
+
+    Clients connect to /ws/chat/?token=<auth token> and receive one JSON
+    frame per event on the groups they belong to and their own DMs.
+    Control events on the user's channel keep the connection current:
+    membership.changed re-reads the user's groups, and session.revoked
+    closes the socket when its token is deleted or the user deactivated.
+    Group events are also checked against the current groups before they
+    are sent, so nothing queued for a group the user left gets through.
+    """
+    if scope['path'].rstrip('/') != '/ws/chat':
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    key = query.get('token', [None])[0]
+    user_id = await _user_id_for_token(key) if key else None
+    if user_id is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    fingerprint = token_fingerprint(key)
+    group_ids = await _group_ids(user_id)
+    subscription = await get_broker().subscribe(_channels(user_id, group_ids))
+    await send({'type': 'websocket.accept'})
+
+    async def forward():
+        nonlocal group_ids
+        while True:
+            event = await subscription.get()
+            kind = event.get('type')
+            if kind == 'membership.changed':
+                group_ids = await _group_ids(user_id)
+                await subscription.set_channels(_channels(user_id, group_ids))
+                continue
+            if kind == 'session.revoked':
+                if event.get('token') in (None, fingerprint):
+                    await send({'type': 'websocket.close', 'code': 4401})
+                    return
+                continue
+            if 'group' in event and event['group'] not in group_ids:
+                continue
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    forwarder = asyncio.ensure_future(forward())
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] == 'websocket.receive' and message.get('text') == 'ping':
+                await send({'type': 'websocket.send', 'text': 'pong'})
+    finally:
+        forwarder.cancel()
+        try:
+            await forwarder
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Realtime connection closed with error: {str(e)}", exc_info=True)
+        await subscription.close()
@@ -0,0 +1,119 @@
+import json
+from functools import partial
+
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.study_groups.models import ChatMessage, StudyGroup
+from apps.direct_messages.models import DirectMessage
+from apps.direct_messages.signals import messages_bulk_created
+from .broker import publish, group_channel, token_fingerprint, user_channel
+
+User = get_user_model()
+
+
+def _plain(data):
+    # Serializer output contains datetimes; round-trip it so the event is
+    # plain JSON for every broker.
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _publish_chat_message(message_id, event_type):
+    """Serializes the message as committed, attachments included."""
+    from apps.study_groups.serializers import ChatMessageSerializer
+
+    message = ChatMessage.objects.with_related().filter(id=message_id).first()
+    if message is None:
+        return
+    publish(group_channel(message.study_group_id), {
+        'type': event_type,
+        'group': message.study_group_id,
+        'message': _plain(ChatMessageSerializer(message).data),
+    })
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # Attachments are linked after the row is saved, so build the event on
+    # commit rather than now.
+    transaction.on_commit(partial(_publish_chat_message, instance.pk, 'chat.message'))
+
+
+@receiver(m2m_changed, sender=ChatMessage.attachments.through)
+def chat_attachments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove'):
+        return
+    # reverse: attachment.messages.add(...), so pk_set holds message ids
+    message_ids = pk_set if reverse else [instance.pk]
+    for message_id in message_ids:
+        transaction.on_commit(partial(_publish_chat_message, message_id, 'chat.message.updated'))
+
+
+@receiver(post_save, sender=DirectMessage)
+def direct_message_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    from apps.direct_messages.serializers import DirectMessageSerializer
+
+    _publish_direct_message(instance, DirectMessageSerializer)
+
+
+@receiver(messages_bulk_created, sender=DirectMessage)
+def direct_messages_bulk_created(sender, messages, **kwargs):
+    from apps.direct_messages.serializers import DirectMessageSerializer
+
+    for message in messages:
+        _publish_direct_message(message, DirectMessageSerializer)
+
+
+def _publish_direct_message(message, serializer_class):
+    event = {
+        'type': 'direct.message',
+        'message': _plain(serializer_class(message).data),
+    }
+    for user_id in {message.sender_id, message.receiver_id}:
+        transaction.on_commit(partial(publish, user_channel(user_id), event))
+
+
+def _publish_to_users(user_ids, event):
+    """Publishes a control event to each user's channel once the change commits."""
+    for user_id in set(user_ids):
+        transaction.on_commit(partial(publish, user_channel(user_id), event))
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Open sockets re-read their groups; see consumers.websocket_application.
+    if action == 'pre_clear':
+        user_ids = [instance.pk] if reverse else list(instance.members.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = [instance.pk] if reverse else pk_set
+    else:
+        return
+    _publish_to_users(user_ids, {'type': 'membership.changed'})
+
+
+@receiver(post_save, sender=StudyGroup)
+def group_saved(sender, instance, created, **kwargs):
+    if instance.deleted_at is not None:
+        _publish_to_users(instance.members.values_list('id', flat=True), {'type': 'membership.changed'})
+
+
+@receiver(post_delete, sender=Token)
+def token_revoked(sender, instance, **kwargs):
+    _publish_to_users([instance.user_id], {
+        'type': 'session.revoked',
+        'token': token_fingerprint(instance.key),
+    })
+
+
+@receiver(post_save, sender=User)
+def user_deactivated(sender, instance, created, **kwargs):
+    if not created and not instance.is_active:
+        _publish_to_users([instance.pk], {'type': 'session.revoked', 'token': None})
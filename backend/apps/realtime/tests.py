@@ -0,0 +1,223 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+
+from apps.study_groups.models import StudyGroup, ChatMessage, FileAttachment
+from apps.direct_messages.models import DirectMessage, DirectChat
+from .broker import InMemoryBroker, get_broker, reset_broker
+from .consumers import websocket_application
+
+User = get_user_model()
+
+
+class InMemoryBrokerTests(SimpleTestCase):
+    def test_publish_from_another_thread_reaches_subscriber(self):
+        broker = InMemoryBroker()
+
+        async def scenario():
+            subscription = await broker.subscribe(['group.1'])
+            thread = threading.Thread(target=broker.publish, args=('group.1', {'n': 1}))
+            thread.start()
+            event = await asyncio.wait_for(subscription.get(), timeout=1)
+            thread.join()
+            await subscription.close()
+            return event
+
+        self.assertEqual(asyncio.run(scenario()), {'n': 1})
+
+    def test_only_subscribed_channels_are_delivered(self):
+        broker = InMemoryBroker()
+
+        async def scenario():
+            subscription = await broker.subscribe(['user.1'])
+            broker.publish('user.2', {'for': 2})
+            broker.publish('user.1', {'for': 1})
+            event = await asyncio.wait_for(subscription.get(), timeout=1)
+            await subscription.close()
+            broker.publish('user.1', {'after': 'close'})
+            return event
+
+        self.assertEqual(asyncio.run(scenario()), {'for': 1})
+        self.assertEqual(dict(broker._subscribers), {})
+
+
+@override_settings(REALTIME_BROKER='apps.realtime.broker.InMemoryBroker')
+class ChatWebSocketTests(TransactionTestCase):
+    def setUp(self):
+        reset_broker()
+        self.alice = User.objects.create_user(
+            email='alice@nyu.edu',
+            password='segroup2',
+            first_name='Alice',
+            last_name='A'
+        )
+        self.bob = User.objects.create_user(
+            email='bob@nyu.edu',
+            password='segroup2',
+            first_name='Bob',
+            last_name='B'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Compilers',
+            description='Parsing and codegen',
+            subject='CS',
+            creator=self.alice
+        )
+        self.group.members.add(self.alice, self.bob)
+        self.token = Token.objects.create(user=self.bob)
+
+    def tearDown(self):
+        reset_broker()
+
+    def connect_and_collect(self, action, token=None, frames=1):
+        """Connects as Bob, runs `action` in the sync world and collects frames.
+
+        `action` may also be a list of (action, frames) steps, run in turn.
+        """
+        steps = action if isinstance(action, list) else [(action, frames)]
+        scope = {
+            'type': 'websocket',
+            'path': '/ws/chat/',
+            'query_string': f'token={token or self.token.key}'.encode(),
+        }
+
+        async def scenario():
+            inbound = asyncio.Queue()
+            outbound = asyncio.Queue()
+            await inbound.put({'type': 'websocket.connect'})
+            connection = asyncio.ensure_future(
+                websocket_application(scope, inbound.get, outbound.put)
+            )
+            handshake = await asyncio.wait_for(outbound.get(), timeout=2)
+            received = []
+            if handshake['type'] == 'websocket.accept':
+                for step, count in steps:
+                    await sync_to_async(step)()
+                    for _ in range(count):
+                        frame = await asyncio.wait_for(outbound.get(), timeout=2)
+                        received.append(json.loads(frame['text']) if 'text' in frame else frame)
+            await inbound.put({'type': 'websocket.disconnect'})
+            await asyncio.wait_for(connection, timeout=2)
+            return handshake, received
+
+        return async_to_sync(scenario)()
+
+    def test_group_message_is_pushed_to_members(self):
+        handshake, events = self.connect_and_collect(
+            lambda: ChatMessage.objects.create(
+                study_group=self.group,
+                sender=self.alice,
+                content='Anyone up for the lab?'
+            )
+        )
+        self.assertEqual(handshake['type'], 'websocket.accept')
+        self.assertEqual(events[0]['type'], 'chat.message')
+        self.assertEqual(events[0]['group'], self.group.id)
+        self.assertEqual(events[0]['message']['content'], 'Anyone up for the lab?')
+
+    def attachment(self, name):
+        return FileAttachment.objects.create(
+            file=f'chat_files/{name}',
+            original_filename=name,
+            file_size=3,
+            uploaded_by=self.alice
+        )
+
+    def test_group_message_event_includes_attachments_linked_in_the_same_transaction(self):
+        def post_with_file():
+            with transaction.atomic():
+                message = ChatMessage.objects.create(
+                    study_group=self.group,
+                    sender=self.alice,
+                    content='Notes attached'
+                )
+                message.attachments.add(self.attachment('notes.pdf'))
+
+        handshake, events = self.connect_and_collect(post_with_file, frames=2)
+        self.assertEqual(events[0]['type'], 'chat.message')
+        self.assertEqual(
+            [a['original_filename'] for a in events[0]['message']['attachments']],
+            ['notes.pdf']
+        )
+        self.assertEqual(events[1]['type'], 'chat.message.updated')
+
+    def test_attaching_a_file_later_pushes_an_update(self):
+        message = ChatMessage.objects.create(study_group=self.group, sender=self.alice, content='Slides soon')
+        handshake, events = self.connect_and_collect(
+            lambda: message.attachments.add(self.attachment('slides.pdf'))
+        )
+        self.assertEqual(events[0]['type'], 'chat.message.updated')
+        self.assertEqual(events[0]['message']['id'], message.id)
+        self.assertEqual(events[0]['message']['attachments'][0]['original_filename'], 'slides.pdf')
+
+    def test_direct_message_is_pushed_to_receiver(self):
+        handshake, events = self.connect_and_collect(
+            lambda: DirectMessage.objects.create(
+                sender=self.alice,
+                receiver=self.bob,
+                content='Hi Bob'
+            )
+        )
+        self.assertEqual(events[0]['type'], 'direct.message')
+        self.assertEqual(events[0]['message']['content'], 'Hi Bob')
+
+    def test_batch_sent_messages_are_pushed(self):
+        handshake, events = self.connect_and_collect(
+            lambda: DirectChat.post_batch(self.alice, [(self.bob, 'first'), (self.bob, 'second')]),
+            frames=2
+        )
+        self.assertEqual([e['message']['content'] for e in events], ['first', 'second'])
+
+    def test_member_who_leaves_stops_receiving_group_events(self):
+        def leave_then_chat():
+            self.group.remove_member(self.bob)
+            ChatMessage.objects.create(study_group=self.group, sender=self.alice, content='Members only')
+            DirectMessage.objects.create(sender=self.alice, receiver=self.bob, content='Still friends')
+
+        handshake, events = self.connect_and_collect(leave_then_chat)
+        self.assertEqual(events[0]['type'], 'direct.message')
+        self.assertEqual(events[0]['message']['content'], 'Still friends')
+        self.assertEqual(set(get_broker()._subscribers), set())
+
+    def test_joining_a_group_subscribes_the_open_socket(self):
+        other = StudyGroup.objects.create(name='Networks', description='TCP', subject='CS', creator=self.alice)
+        other.members.add(self.alice)
+
+        def join():
+            other.add_member(self.bob)
+            # Published after the membership event, so once it arrives the
+            # socket has subscribed to the new group.
+            DirectMessage.objects.create(sender=self.alice, receiver=self.bob, content='Added you')
+
+        handshake, events = self.connect_and_collect([
+            (join, 1),
+            (lambda: ChatMessage.objects.create(study_group=other, sender=self.alice, content='Welcome'), 1),
+        ])
+        self.assertEqual((events[1]['group'], events[1]['message']['content']), (other.id, 'Welcome'))
+
+    def test_revoked_token_closes_its_socket(self):
+        def revoke():
+            Token.objects.filter(user=self.bob).delete()
+
+        handshake, events = self.connect_and_collect(revoke)
+        self.assertEqual(events, [{'type': 'websocket.close', 'code': 4401}])
+        self.assertEqual(get_broker()._subscribers, {})
+
+    def test_deactivated_user_is_disconnected(self):
+        def deactivate():
+            self.bob.is_active = False
+            self.bob.save()
+
+        handshake, events = self.connect_and_collect(deactivate)
+        self.assertEqual(events, [{'type': 'websocket.close', 'code': 4401}])
+
+    def test_invalid_token_is_rejected(self):
+        handshake, events = self.connect_and_collect(lambda: None, token='nope', frames=0)
+        self.assertEqual(handshake, {'type': 'websocket.close', 'code': 4401})
+        self.assertEqual(get_broker()._subscribers, {})
@@ -5,8 +5,12 @@ from .models import StudyGroup
 
 @admin.register(StudyGroup)
 class StudyGroupAdmin(admin.ModelAdmin):
-    list_display = ('name', 'creator', 'subject', 'members_count', 'created_at')
+    list_display = ('name', 'creator', 'subject', 'members_count', 'created_at', 'deleted_at')
     search_fields = ('name', 'subject', 'description')
-    list_filter = ('created_at',)
+    list_filter = ('created_at', 'deleted_at')
     readonly_fields = ('created_at',)
-    filter_horizontal = ('members',) 
\ No newline at end of file
+    filter_horizontal = ('members',)
+
+    def get_queryset(self, request):
+        # Admins can still see (and restore) soft-deleted groups.
+        return StudyGroup.all_objects.all() 
\ No newline at end of file
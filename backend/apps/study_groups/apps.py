@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudyGroupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.study_groups'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,122 @@
+import mimetypes
+import re
+import urllib.parse
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.crypto import salted_hmac
+from django.utils.http import parse_etags
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def attachment_etag(attachment):
+    """Attachments are never rewritten in place, so id + size + upload time is stable.
+
+    Blob-backed attachments derive it from the content hash, so caches share
+    one entry between copies of the same file. It is keyed with SECRET_KEY:
+    the raw hash would let anyone check whether they hold the same file.
+    """
+    if attachment.blob_id:
+        return f'"{salted_hmac("attachment-etag", attachment.blob_id).hexdigest()[:32]}"'
+    return f'"{attachment.id}-{attachment.file_size}-{int(attachment.uploaded_at.timestamp())}"'
+
+
+def parse_range(header, size):
+    """Returns (start, end) inclusive for a single byte range.
+
+    None means "serve the whole file" (no header, multiple ranges or a
+    syntax we do not handle); ValueError means the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError
+    return start, min(end, size - 1)
+
+
+def _read_range(fieldfile, start, length):
+    fieldfile.open('rb')
+    try:
+        fieldfile.seek(start)
+        while length > 0:
+            chunk = fieldfile.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fieldfile.close()
+
+
+def serve_attachment(request, attachment):
+    """Builds the download response for a FileAttachment the user may read.
+
+    Honours If-None-Match (304) and single byte ranges (206/416). With
+    FILE_DOWNLOAD_OFFLOAD set, only headers are produced and the web
+    server streams the bytes.
+    """
+    etag = attachment_etag(attachment)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    content_type, _ = mimetypes.guess_type(attachment.original_filename)
+    offload = getattr(settings, 'FILE_DOWNLOAD_OFFLOAD', '')
+
+    if offload == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        prefix = settings.FILE_DOWNLOAD_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f"{prefix}/{urllib.parse.quote(attachment.file.name)}"
+    elif offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['X-Sendfile'] = attachment.file.path
+    else:
+        size = attachment.file.size
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range.strip() == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                response['ETag'] = etag
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        response = StreamingHttpResponse(
+            _read_range(attachment.file, start, length),
+            status=206 if byte_range else 200,
+            content_type=content_type or 'application/octet-stream'
+        )
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    encoded_filename = urllib.parse.quote(attachment.original_filename)
+    response['Content-Disposition'] = f'attachment; filename="{encoded_filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response['Access-Control-Expose-Headers'] = (
+        'Content-Disposition, Content-Type, Content-Length, Content-Range, Accept-Ranges, ETag'
+    )
+    return response
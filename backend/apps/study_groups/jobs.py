@@ -0,0 +1,10 @@
+from datetime import timedelta
+
+from apps.jobs.queue import register
+from . import uploads
+
+
+@register('study_groups.purge_uploads', every=timedelta(hours=1))
+def purge_abandoned_uploads():
+    """Frees the disk held by resumable uploads that were never finalized."""
+    return uploads.purge_abandoned()
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from apps.files.models import File
+from apps.study_groups.models import StudyGroup, ChatMessage, FileAttachment
+
+
+class Command(BaseCommand):
+    help = "Hard-deletes study groups soft-deleted more than --days ago, with their messages and files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Only purge groups deleted at least this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows deleted per transaction.')
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        group_ids = list(
+            StudyGroup.all_objects.filter(deleted_at__lt=cutoff).values_list('id', flat=True)
+        )
+        messages = files = 0
+        for group_id in group_ids:
+            messages += self.purge_messages(group_id, batch_size)
+            files += self.purge_files(group_id, batch_size)
+            # Whatever is left (meetings, tasks, memberships) is small enough
+            # to go with the group row itself.
+            StudyGroup.all_objects.filter(id=group_id).delete()
+
+        self.stdout.write(
+            f"Purged {len(group_ids)} groups, {messages} messages and {files} files."
+        )
+
+    def purge_messages(self, group_id, batch_size):
+        """Deletes a group's chat history, batch_size messages per transaction."""
+        purged = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    ChatMessage.objects.filter(study_group_id=group_id)
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return purged
+                attachment_ids = list(
+                    FileAttachment.objects.filter(messages__id__in=ids)
+                    .values_list('id', flat=True).distinct()
+                )
+                ChatMessage.objects.filter(id__in=ids).delete()
+                orphans = FileAttachment.objects.filter(id__in=attachment_ids, messages__isnull=True)
+                self.delete_stored_files(orphans.filter(blob__isnull=True), 'file')
+                orphans.delete()
+                purged += len(ids)
+
+    def purge_files(self, group_id, batch_size):
+        """Deletes the group's shared files and their stored bytes in batches."""
+        purged = 0
+        while True:
+            with transaction.atomic():
+                batch = File.objects.filter(study_group_id=group_id).values_list('id', flat=True)[:batch_size]
+                files = File.objects.filter(id__in=list(batch))
+                self.delete_stored_files(files.filter(blob__isnull=True), 'file_path')
+                count = files.delete()[1].get(File._meta.label, 0)
+                if not count:
+                    return purged
+                purged += count
+
+    def delete_stored_files(self, queryset, field_name):
+        """Removes legacy (non-blob) files from storage once the rows are really gone.
+
+        Blob-backed rows release their blob from a post_delete signal.
+        """
+        storage = queryset.model._meta.get_field(field_name).storage
+        for name in queryset.values_list(field_name, flat=True):
+            if name:
+                transaction.on_commit(partial(storage.delete, name))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.study_groups.models import ChatMessage
+from apps.study_groups.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexes every chat message with the configured search backend. Run it "
+        "after changing CHAT_SEARCH_BACKEND; migrations only fill the index of "
+        "the database's default backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Messages indexed per transaction.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    ChatMessage.objects.filter(id__gt=last_id).order_by('id')[:batch_size]
+                )
+                if not batch:
+                    break
+                for message in batch:
+                    backend.index_message(message)
+            last_id = batch[-1].id
+            indexed += len(batch)
+
+        self.stdout.write(f"Indexed {indexed} messages with {type(backend).__name__}.")
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_groups', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['study_group', 'timestamp', 'id'], name='chatmsg_group_ts_idx'),
+        ),
+    ]
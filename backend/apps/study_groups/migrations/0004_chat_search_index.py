@@ -0,0 +1,98 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:45
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from collections import Counter
+
+# Frozen copy of apps.study_groups.search.tokenize and its weights as of
+# this migration, so later changes to that module cannot change it.
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 64
+CONTENT_WEIGHT = 2
+FILENAME_WEIGHT = 1
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        tokens.extend(part for part in token.split('_') if part)
+    return [token[:MAX_TERM_LENGTH] for token in tokens]
+
+
+def build_search_index(apps, schema_editor):
+    """Creates the GIN index on PostgreSQL and indexes existing messages."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX chatsearch_vector_gin ON study_groups_chatmessagesearchdocument USING GIN (vector)"
+        )
+        schema_editor.execute("""
+            INSERT INTO study_groups_chatmessagesearchdocument (message_id, study_group_id, vector)
+            SELECT m.id, m.study_group_id,
+                   setweight(to_tsvector('english', m.content), 'A') ||
+                   setweight(to_tsvector('english', regexp_replace(
+                       coalesce(string_agg(f.original_filename, ' '), ''), '[^[:alnum:]]+', ' ', 'g'
+                   )), 'B')
+            FROM study_groups_chatmessage m
+            LEFT JOIN study_groups_chatmessage_attachments a ON a.chatmessage_id = m.id
+            LEFT JOIN study_groups_fileattachment f ON f.id = a.fileattachment_id
+            GROUP BY m.id, m.study_group_id, m.content
+        """)
+        return
+
+    ChatMessage = apps.get_model('study_groups', 'ChatMessage')
+    ChatMessageSearchTerm = apps.get_model('study_groups', 'ChatMessageSearchTerm')
+    for message in ChatMessage.objects.prefetch_related('attachments').iterator(chunk_size=500):
+        weights = Counter()
+        for token in tokenize(message.content):
+            weights[token] += CONTENT_WEIGHT
+        for attachment in message.attachments.all():
+            for token in tokenize(attachment.original_filename):
+                weights[token] += FILENAME_WEIGHT
+        ChatMessageSearchTerm.objects.bulk_create([
+            ChatMessageSearchTerm(
+                message_id=message.id,
+                study_group_id=message.study_group_id,
+                term=term,
+                weight=weight
+            ) for term, weight in weights.items()
+        ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS chatsearch_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_groups', '0003_chatmessage_group_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMessageSearchDocument',
+            fields=[
+                ('message', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='study_groups.chatmessage')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('study_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='study_groups.studygroup')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatMessageSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='study_groups.chatmessage')),
+                ('study_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='study_groups.studygroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['study_group', 'term'], name='chatsearch_group_term_idx')],
+                'unique_together': {('message', 'term')},
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_count(apps, schema_editor):
+    StudyGroup = apps.get_model('study_groups', 'StudyGroup')
+    Membership = StudyGroup.members.through
+    counts = (
+        Membership.objects
+        .filter(studygroup_id=OuterRef('pk'))
+        .values('studygroup_id')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    StudyGroup.objects.update(member_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_groups', '0004_chat_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studygroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Denormalized number of members, maintained by add_member/remove_member'),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+    ]
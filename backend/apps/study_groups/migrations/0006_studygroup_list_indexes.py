@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_groups', '0005_studygroup_member_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['created_at'], name='studygroup_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(fields=['subject', 'created_at'], name='studygroup_subject_idx'),
+        ),
+    ]
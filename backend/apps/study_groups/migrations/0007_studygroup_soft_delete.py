@@ -0,0 +1,45 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:51
+
+from django.db import migrations, models
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_groups', '0006_studygroup_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='studygroup',
+            options={'base_manager_name': 'all_objects', 'ordering': ['-created_at'], 'verbose_name': 'Study Group'},
+        ),
+        migrations.AlterModelManagers(
+            name='studygroup',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='studygroup',
+            name='studygroup_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='studygroup',
+            name='studygroup_subject_idx',
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['created_at'], name='studygroup_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['subject', 'created_at'], name='studygroup_alive_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studygroup',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='studygroup_deleted_idx'),
+        ),
+    ]
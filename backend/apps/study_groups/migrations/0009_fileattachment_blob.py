@@ -0,0 +1,20 @@
+# Generated by Django 4.2.20 on 2026-10-17 22:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0003_blob'),
+        ('study_groups', '0008_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileattachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='files.blob'),
+        ),
+    ]
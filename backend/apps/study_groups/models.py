@@ -1,7 +1,12 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.timezone import now
 from django.core.validators import MinLengthValidator, MaxLengthValidator, MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 
 User = get_user_model()
 
@@ -11,23 +16,123 @@ class FileAttachment(models.Model):
     file_size = models.IntegerField()  # Size in bytes
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_files')
+    # Set for content-addressed uploads; `file` then names the shared blob.
+    blob = models.ForeignKey('files.Blob', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+
+    @classmethod
+    def from_blob(cls, blob, original_filename, uploaded_by):
+        """Creates an attachment for a blob the caller already holds a reference on."""
+        return cls.objects.create(
+            file=blob.name,
+            blob=blob,
+            original_filename=original_filename,
+            file_size=blob.size,
+            uploaded_by=uploaded_by
+        )
     
     def __str__(self):
         return self.original_filename
 
+class GroupFullError(Exception):
+    """Raised when joining would take a group past max_members."""
+
+class ChatMessageQuerySet(models.QuerySet):
+    def with_related(self):
+        """Loads everything ChatMessageSerializer touches up front.
+
+        The sender is joined in and attachments (with their uploader) are
+        fetched in one batched query, so serializing a page of messages costs
+        a constant number of queries however long the page is.
+        """
+        return self.select_related('sender').prefetch_related(
+            models.Prefetch(
+                'attachments',
+                queryset=FileAttachment.objects.select_related('uploaded_by')
+            )
+        )
+
 class ChatMessage(models.Model):
     study_group = models.ForeignKey('StudyGroup', on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     attachments = models.ManyToManyField(FileAttachment, blank=True, related_name='messages')
+
+    objects = ChatMessageQuerySet.as_manager()
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['study_group', 'timestamp', 'id'], name='chatmsg_group_ts_idx'),
+        ]
         
     def __str__(self):
         return f"{self.sender.get_full_name()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+class UploadSession(models.Model):
+    """A resumable upload of one attachment, sent in chunks.
+
+    Bytes accumulate in a part file on disk (see uploads.part_path);
+    `received` is the offset the next chunk must start at.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    message = models.ForeignKey(ChatMessage, on_delete=models.CASCADE, related_name='upload_sessions')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64, blank=True)  # hex SHA-256
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+class ChatMessageSearchTerm(models.Model):
+    """Inverted index row used by the pure-Python search backend.
+
+    One row per distinct token in a message's content or attachment names.
+    study_group is copied from the message so lookups never join messages.
+    """
+    message = models.ForeignKey(ChatMessage, on_delete=models.CASCADE, related_name='search_terms')
+    study_group = models.ForeignKey('StudyGroup', on_delete=models.CASCADE, related_name='+')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['message', 'term']
+        indexes = [
+            models.Index(fields=['study_group', 'term'], name='chatsearch_group_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.message_id})"
+
+class ChatMessageSearchDocument(models.Model):
+    """tsvector of a message and its attachment names for the Postgres backend.
+
+    Kept out of ChatMessage so history queries do not drag the vector along.
+    The GIN index on `vector` is created by migration on PostgreSQL only.
+    """
+    message = models.OneToOneField(ChatMessage, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    study_group = models.ForeignKey('StudyGroup', on_delete=models.CASCADE, related_name='+')
+    vector = SearchVectorField(null=True)
+
+    def __str__(self):
+        return f"Search document for message {self.message_id}"
+
+class StudyGroupQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+class ActiveStudyGroupManager(models.Manager.from_queryset(StudyGroupQuerySet)):
+    """Default manager: hides soft-deleted groups everywhere, including related managers."""
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
 class StudyGroup(models.Model):
     name = models.CharField(
         max_length=100,
@@ -52,6 +157,11 @@ class StudyGroup(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups')
     members = models.ManyToManyField(User, related_name='joined_groups')
+    member_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Denormalized number of members, maintained by add_member/remove_member"
+    )
     unique_identifier = models.CharField(
         max_length=50,
         unique=True,
@@ -71,16 +181,62 @@ class StudyGroup(models.Model):
             self.unique_identifier = f"{self.name}-{self.creator.username}-{timestamp}"
         super().save(*args, **kwargs)
 
-    def add_member(self, user):
-        """Adds a user to the study group."""
-        self.members.add(user)
+    def add_member(self, user, enforce_capacity=False):
+        """Adds a user to the study group.
+
+        Returns False if the user was already a member. With
+        enforce_capacity, raises GroupFullError instead of going past
+        max_members. Raises StudyGroup.DoesNotExist if the group has been
+        deleted. Joins should go through this method (or remove_member):
+        only these take the group row lock and check capacity. Direct edits
+        of members are still counted, see recount_members.
+        """
+        with transaction.atomic():
+            # The guarded UPDATE both reserves a seat and locks the group row,
+            # so concurrent joins to the same group are applied one at a time.
+            guarded = StudyGroup.objects.filter(pk=self.pk)
+            if enforce_capacity:
+                guarded = guarded.filter(member_count__lt=F('max_members'))
+            if not guarded.update(member_count=F('member_count') + 1):
+                if not StudyGroup.objects.filter(pk=self.pk).exists():
+                    raise StudyGroup.DoesNotExist("This study group no longer exists.")
+                raise GroupFullError("This group has reached its maximum member limit.")
+            if self.members.filter(id=user.id).exists():
+                transaction.set_rollback(True)
+                return False
+            self.members.add(user)
+        self.member_count += 1
         return True
 
     def remove_member(self, user):
-        """Removes a user from the study group"""
-        self.members.remove(user)
+        """Removes a user from the study group. Returns False if they were not a member."""
+        with transaction.atomic():
+            # Like add_member, the UPDATE locks the group row first. It is
+            # floored at 0 rather than guarded, so a counter that has drifted
+            # low never keeps an actual member in the group.
+            locked = StudyGroup.all_objects.filter(pk=self.pk).update(
+                member_count=Greatest(F('member_count') - 1, 0)
+            )
+            if not locked or not self.members.filter(id=user.id).exists():
+                transaction.set_rollback(True)
+                return False
+            self.members.remove(user)
+        self.member_count = max(self.member_count - 1, 0)
         return True
 
+    @classmethod
+    def recount_members(cls, group_ids):
+        """Sets member_count from the membership table for the given groups."""
+        Membership = cls.members.through
+        counts = (
+            Membership.objects
+            .filter(studygroup_id=OuterRef('pk'))
+            .values('studygroup_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        cls.all_objects.filter(pk__in=group_ids).update(member_count=Coalesce(Subquery(counts), 0))
+
     def get_members(self):
         """Returns all members of the study group."""
         return self.members.all()
@@ -91,9 +247,13 @@ class StudyGroup(models.Model):
         return Meeting.objects.create(study_group=self, **meeting_details)
 
     def delete_group(self):
-        """Marks the group as deleted (soft delete)."""
+        """Marks the group as deleted (soft delete).
+
+        The group disappears from StudyGroup.objects immediately; the
+        purge_deleted_groups command removes it and its data later.
+        """
         self.deleted_at = now()
-        self.save()
+        self.save(update_fields=['deleted_at'])
         return True
 
     def update_group_info(self, details):
@@ -108,13 +268,35 @@ class StudyGroup(models.Model):
         self.shared_files.add(file)
         return True
 
+    objects = ActiveStudyGroupManager()
+    all_objects = StudyGroupQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Study Group"
         ordering = ['-created_at']
+        # Forward relations (meeting.study_group, ...) still resolve deleted groups.
+        base_manager_name = 'all_objects'
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                name='studygroup_alive_created_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['subject', 'created_at'],
+                name='studygroup_alive_subject_idx',
+                condition=models.Q(deleted_at__isnull=True)
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='studygroup_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     @property
     def members_count(self):
-        return self.members.count()
\ No newline at end of file
+        return self.member_count
\ No newline at end of file
@@ -0,0 +1,89 @@
+from django.db.models import Q
+from rest_framework.pagination import PageNumberPagination
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """Page-number pagination that clients opt into with ?page_size=N.
+
+    Without page_size the endpoint keeps returning a plain list, so existing
+    clients are unaffected.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def parse_page_params(query_params):
+    """Reads before/after/since_id/limit from the query string.
+
+    Raises ValueError with a client-facing message on malformed input.
+    """
+    params = {}
+    for name in ('before', 'after', 'since_id'):
+        value = query_params.get(name)
+        if value in (None, ''):
+            params[name] = None
+            continue
+        try:
+            params[name] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{name}' must be a message id.")
+
+    limit = query_params.get('limit')
+    if limit in (None, ''):
+        params['limit'] = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            params['limit'] = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("'limit' must be a positive integer.")
+        if params['limit'] < 1:
+            raise ValueError("'limit' must be a positive integer.")
+        params['limit'] = min(params['limit'], MAX_PAGE_SIZE)
+
+    if sum(params[name] is not None for name in ('before', 'after', 'since_id')) > 1:
+        raise ValueError("Use only one of 'before', 'after' or 'since_id'.")
+    return params
+
+
+def _anchor(queryset, message_id, time_field):
+    anchor = queryset.filter(id=message_id).values(time_field, 'id').first()
+    if anchor is None:
+        raise ValueError(f"Message {message_id} is not part of this conversation.")
+    return anchor[time_field], anchor['id']
+
+
+def keyset_page(queryset, before=None, after=None, since_id=None,
+                limit=DEFAULT_PAGE_SIZE, time_field='timestamp'):
+    """Returns one page of messages in chronological order.
+
+    Pages are keyed on (time_field, id) so each request is an index range
+    scan instead of an OFFSET walk over the whole history:
+
+    * no cursor: the latest ``limit`` messages
+    * ``before``: the ``limit`` messages preceding that message id
+    * ``after``: the ``limit`` messages following that message id
+    * ``since_id``: delta mode for polling, messages with a higher id
+    """
+    ascending = (time_field, 'id')
+    descending = (f'-{time_field}', '-id')
+
+    if since_id is not None:
+        return list(queryset.filter(id__gt=since_id).order_by(*ascending)[:limit])
+
+    if after is not None:
+        ts, pk = _anchor(queryset, after, time_field)
+        newer = Q(**{f'{time_field}__gt': ts}) | Q(**{time_field: ts, 'id__gt': pk})
+        return list(queryset.filter(newer).order_by(*ascending)[:limit])
+
+    if before is not None:
+        ts, pk = _anchor(queryset, before, time_field)
+        older = Q(**{f'{time_field}__lt': ts}) | Q(**{time_field: ts, 'id__lt': pk})
+        queryset = queryset.filter(older)
+
+    page = list(queryset.order_by(*descending)[:limit])
+    page.reverse()
+    return page
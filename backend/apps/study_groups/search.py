@@ -0,0 +1,139 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+from django.utils.module_loading import import_string
+
+from .models import ChatMessage, ChatMessageSearchDocument, ChatMessageSearchTerm
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+CONTENT_WEIGHT = 2
+FILENAME_WEIGHT = 1
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Splits text into lowercase word tokens; 'Week-3_notes.pdf' -> week, 3, notes, pdf."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        tokens.extend(part for part in token.split('_') if part)
+    return [token[:MAX_TERM_LENGTH] for token in tokens]
+
+
+def query_terms(query):
+    """Distinct tokens of a search query, capped so a query stays cheap."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+class PythonSearchBackend:
+    """Inverted index kept in ChatMessageSearchTerm, usable on any database.
+
+    Every query token is matched as a prefix and all of them must match.
+    The rank is the summed weight of the matched terms, so content hits
+    outrank hits on attachment names.
+    """
+
+    def index_message(self, message):
+        weights = Counter()
+        for token in tokenize(message.content):
+            weights[token] += CONTENT_WEIGHT
+        for filename in message.attachments.values_list('original_filename', flat=True):
+            for token in tokenize(filename):
+                weights[token] += FILENAME_WEIGHT
+
+        ChatMessageSearchTerm.objects.filter(message=message).delete()
+        ChatMessageSearchTerm.objects.bulk_create([
+            ChatMessageSearchTerm(
+                message=message,
+                study_group_id=message.study_group_id,
+                term=term,
+                weight=weight
+            ) for term, weight in weights.items()
+        ])
+
+    def search(self, group, terms, offset, limit):
+        any_term = Q()
+        matched = {}
+        for i, term in enumerate(terms):
+            any_term |= Q(term__startswith=term)
+            matched[f'matched_{i}'] = Max(Case(
+                When(term__startswith=term, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            ))
+
+        hits = (
+            ChatMessageSearchTerm.objects
+            .filter(any_term, study_group=group)
+            .values('message_id')
+            .annotate(rank=Sum('weight'), **matched)
+            .filter(**{name: 1 for name in matched})
+            .order_by('-rank', '-message_id')
+            .values_list('message_id', flat=True)
+        )
+        return list(hits[offset:offset + limit])
+
+
+class PostgresSearchBackend:
+    """tsvector search over ChatMessageSearchDocument, served by a GIN index."""
+
+    config = 'english'
+
+    def index_message(self, message):
+        filenames = ' '.join(message.attachments.values_list('original_filename', flat=True))
+        ChatMessageSearchDocument.objects.update_or_create(
+            message=message,
+            defaults={'study_group_id': message.study_group_id}
+        )
+        ChatMessageSearchDocument.objects.filter(message=message).update(
+            vector=(
+                SearchVector(Value(message.content), weight='A', config=self.config)
+                + SearchVector(Value(' '.join(tokenize(filenames))), weight='B', config=self.config)
+            )
+        )
+
+    def search(self, group, terms, offset, limit):
+        # Tokens only contain word characters, so they are safe to splice
+        # into a raw tsquery. ':*' keeps the prefix matching users expect.
+        query = SearchQuery(
+            ' & '.join(f"{term}:*" for term in terms),
+            config=self.config,
+            search_type='raw'
+        )
+        hits = (
+            ChatMessageSearchDocument.objects
+            .filter(study_group=group, vector=query)
+            .annotate(rank=SearchRank(F('vector'), query))
+            .order_by('-rank', '-message_id')
+            .values_list('message_id', flat=True)
+        )
+        return list(hits[offset:offset + limit])
+
+
+def get_search_backend():
+    """Returns settings.CHAT_SEARCH_BACKEND, or the best backend for the database."""
+    path = getattr(settings, 'CHAT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return PythonSearchBackend()
+
+
+def index_message(message):
+    get_search_backend().index_message(message)
+
+
+def search_group_messages(group, query, offset=0, limit=50):
+    """Returns the group's messages matching `query`, best match first."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    message_ids = get_search_backend().search(group, terms, offset, limit)
+    messages = ChatMessage.objects.with_related().in_bulk(message_ids)
+    return [messages[message_id] for message_id in message_ids if message_id in messages]
@@ -1,9 +1,22 @@
 from rest_framework import serializers
-from .models import StudyGroup, ChatMessage, FileAttachment
+from .models import StudyGroup, ChatMessage, FileAttachment, UploadSession
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+class SparseFieldsetMixin:
+    """Limits the output to the fields named in ?fields=a,b,c. id is always kept."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request else None
+        if not fields:
+            return
+        wanted = {name.strip() for name in fields.split(',')} | {'id'}
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -24,6 +37,26 @@ class FileAttachmentSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.file.url)
         return None
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'checksum', 'offset', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate_size(self, value):
+        from .uploads import MAX_UPLOAD_SIZE
+        if value < 1 or value > MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {MAX_UPLOAD_SIZE} bytes.")
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest.")
+        return value
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     attachments = FileAttachmentSerializer(many=True, read_only=True)
@@ -34,7 +67,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['sender', 'timestamp']
 
 class StudyGroupSerializer(serializers.ModelSerializer):
-    members_count = serializers.IntegerField(read_only=True)
+    members_count = serializers.IntegerField(source='member_count', read_only=True)
     is_member = serializers.SerializerMethodField()
     is_creator = serializers.SerializerMethodField()
     members = UserSerializer(many=True, read_only=True)
@@ -53,7 +86,7 @@ class StudyGroupSerializer(serializers.ModelSerializer):
         
         # When updating, check against current member count
         if self.instance:  # This means we're updating an existing group
-            current_members = self.instance.members.count()
+            current_members = self.instance.member_count
             if value < current_members:
                 raise serializers.ValidationError(
                     f"Maximum members cannot be less than current member count ({current_members})"
@@ -68,6 +101,10 @@ class StudyGroupSerializer(serializers.ModelSerializer):
     def get_is_member(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # The list view computes the user's groups once per request.
+            member_group_ids = self.context.get('member_group_ids')
+            if member_group_ids is not None:
+                return obj.id in member_group_ids
             return obj.members.filter(id=request.user.id).exists()
         return False
 
@@ -80,5 +117,17 @@ class StudyGroupSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         group = StudyGroup.objects.create(creator=user, **validated_data)
-        group.members.add(user)  # Add creator as a member
-        return group 
\ No newline at end of file
+        group.add_member(user)  # Add creator as a member
+        return group 
+
+class StudyGroupListSerializer(SparseFieldsetMixin, StudyGroupSerializer):
+    """Compact group card for the browse list: counts and flags, no member list."""
+    is_full = serializers.SerializerMethodField()
+
+    class Meta(StudyGroupSerializer.Meta):
+        fields = ['id', 'name', 'description', 'subject', 'max_members',
+                 'created_at', 'creator', 'members_count', 'is_member',
+                 'is_creator', 'is_full']
+
+    def get_is_full(self, obj):
+        return obj.member_count >= obj.max_members
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.files.blobs import release_blob
+from .models import ChatMessage, FileAttachment, StudyGroup
+from .search import index_message
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ChatMessage)
+def reindex_message(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    index_message(instance)
+
+
+@receiver(m2m_changed, sender=ChatMessage.attachments.through)
+def reindex_message_attachments(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # instance is a FileAttachment; reindex every message it belongs to.
+        for message in instance.messages.all():
+            index_message(message)
+    else:
+        index_message(instance)
+
+
+@receiver(pre_delete, sender=FileAttachment)
+def remember_attachment_messages(sender, instance, **kwargs):
+    instance._indexed_message_ids = list(instance.messages.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=FileAttachment)
+def reindex_after_attachment_delete(sender, instance, **kwargs):
+    for message in ChatMessage.objects.filter(id__in=getattr(instance, '_indexed_message_ids', [])):
+        index_message(message)
+
+
+@receiver(post_delete, sender=FileAttachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+
+
+@receiver(m2m_changed, sender=StudyGroup.members.through)
+def recount_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    # add_member/remove_member adjust member_count themselves; this keeps it
+    # right for direct members.add/remove/clear, e.g. from the admin.
+    if action == 'pre_clear' and reverse:
+        instance._cleared_group_ids = list(instance.joined_groups.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            group_ids = [instance.pk]
+        elif action == 'post_clear':
+            group_ids = getattr(instance, '_cleared_group_ids', [])
+        else:
+            group_ids = pk_set
+        StudyGroup.recount_members(group_ids)
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_groups(sender, instance, **kwargs):
+    instance._member_group_ids = list(instance.joined_groups.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def recount_groups_of_deleted_user(sender, instance, **kwargs):
+    # Deleting a user removes their memberships without m2m_changed.
+    group_ids = getattr(instance, '_member_group_ids', [])
+    if group_ids:
+        StudyGroup.recount_members(group_ids)
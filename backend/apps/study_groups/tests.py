@@ -1,3 +1,967 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import StudyGroup, ChatMessage, ChatMessageSearchTerm, FileAttachment, GroupFullError, UploadSession
+from . import jobs as study_group_jobs, uploads
+from .downloads import attachment_etag
+from .views import ChatMessageViewSet
+from apps.files.blobs import store_blob
+
+User = get_user_model()
+
+class ChatHistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(
+            email='member@nyu.edu',
+            password='segroup2',
+            first_name='Member',
+            last_name='One'
+        )
+        self.outsider = User.objects.create_user(
+            email='outsider@nyu.edu',
+            password='segroup2',
+            first_name='Out',
+            last_name='Sider'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Algorithms',
+            description='Weekly problem sets',
+            subject='CS',
+            creator=self.member
+        )
+        self.group.members.add(self.member)
+        self.messages = [
+            ChatMessage.objects.create(
+                study_group=self.group,
+                sender=self.member,
+                content=f'Message {i}'
+            ) for i in range(7)
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+        self.url = reverse('study-group-messages', args=[self.group.id])
+
+    def ids(self, response):
+        return [m['id'] for m in response.data]
+
+    def test_latest_page_is_chronological(self):
+        response = self.client.get(self.url, {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(response), [m.id for m in self.messages[-3:]])
+
+    def test_before_cursor_walks_back_through_history(self):
+        response = self.client.get(self.url, {'limit': 3, 'before': self.messages[4].id})
+        self.assertEqual(self.ids(response), [m.id for m in self.messages[1:4]])
+
+        response = self.client.get(self.url, {'limit': 3, 'before': self.messages[1].id})
+        self.assertEqual(self.ids(response), [self.messages[0].id])
+
+    def test_after_cursor_pages_forward(self):
+        response = self.client.get(self.url, {'limit': 2, 'after': self.messages[2].id})
+        self.assertEqual(self.ids(response), [m.id for m in self.messages[3:5]])
+
+    def test_since_id_returns_only_new_messages(self):
+        last_seen = self.messages[-1].id
+        response = self.client.get(self.url, {'since_id': last_seen})
+        self.assertEqual(response.data, [])
+
+        new_message = ChatMessage.objects.create(
+            study_group=self.group,
+            sender=self.member,
+            content='Fresh'
+        )
+        response = self.client.get(self.url, {'since_id': last_seen})
+        self.assertEqual(self.ids(response), [new_message.id])
+
+    def test_invalid_cursors_are_rejected(self):
+        response = self.client.get(self.url, {'before': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'before': 1, 'after': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other_group = StudyGroup.objects.create(
+            name='Databases',
+            description='SQL practice',
+            subject='CS',
+            creator=self.outsider
+        )
+        foreign = ChatMessage.objects.create(
+            study_group=other_group,
+            sender=self.outsider,
+            content='Elsewhere'
+        )
+        response = self.client.get(self.url, {'after': foreign.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_member_cannot_read_history(self):
+        self.client.force_authenticate(user=self.outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ChatMessageQueryBudgetTests(TestCase):
+    """A page of chat history must cost the same number of queries at any size."""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f'student{i}@nyu.edu',
+                password='segroup2',
+                first_name='Student',
+                last_name=str(i)
+            ) for i in range(4)
+        ]
+        self.group = StudyGroup.objects.create(
+            name='Operating Systems',
+            description='Kernel hacking',
+            subject='CS',
+            creator=self.users[0]
+        )
+        self.group.members.add(*self.users)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.users[0])
+
+    def add_messages(self, count):
+        for i in range(count):
+            sender = self.users[i % len(self.users)]
+            message = ChatMessage.objects.create(
+                study_group=self.group,
+                sender=sender,
+                content=f'Note {i}'
+            )
+            attachment = FileAttachment.objects.create(
+                file=f'chat_files/notes{i}.txt',
+                original_filename=f'notes{i}.txt',
+                file_size=5,
+                uploaded_by=sender
+            )
+            message.attachments.add(attachment)
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def assertConstantQueries(self, url, params=None, page_size=None):
+        self.add_messages(2)
+        small, _ = self.count_queries(url, params)
+        self.add_messages(page_size or 60)
+        large, response = self.count_queries(url, params)
+        self.assertEqual(small, large)
+        self.assertGreater(len(response.data), 2)
+        return large
+
+    def test_group_history_page(self):
+        url = reverse('study-group-messages', args=[self.group.id])
+        queries = self.assertConstantQueries(url, {'limit': 200})
+        self.assertLessEqual(queries, 6)
+
+    def test_message_list(self):
+        url = reverse('chat-message-list')
+        queries = self.assertConstantQueries(url, {'group_id': self.group.id})
+        self.assertLessEqual(queries, 5)
+
+    def test_search(self):
+        url = reverse('search-messages', args=[self.group.id])
+        queries = self.assertConstantQueries(url, {'q': 'note'})
+        self.assertLessEqual(queries, 5)
+
+
+class ChatSearchTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(
+            email='searcher@nyu.edu',
+            password='segroup2',
+            first_name='Search',
+            last_name='Er'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Linear Algebra',
+            description='Matrices',
+            subject='Math',
+            creator=self.member
+        )
+        self.group.members.add(self.member)
+        self.other_group = StudyGroup.objects.create(
+            name='Statistics',
+            description='Distributions',
+            subject='Math',
+            creator=self.member
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+        self.url = reverse('search-messages', args=[self.group.id])
+
+    def post(self, content, group=None):
+        return ChatMessage.objects.create(
+            study_group=group or self.group,
+            sender=self.member,
+            content=content
+        )
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [m['id'] for m in response.data]
+
+    def test_matches_all_terms_by_prefix(self):
+        both = self.post('Eigenvalues homework is due Friday')
+        self.post('Homework two is easy')
+        self.post('Eigenvalues homework', group=self.other_group)
+
+        self.assertEqual(self.search('eigen HOMEWORK'), [both.id])
+
+    def test_content_outranks_attachment_names(self):
+        attachment_hit = self.post('Slides from today')
+        attachment_hit.attachments.add(FileAttachment.objects.create(
+            file='chat_files/determinants.pdf',
+            original_filename='determinants.pdf',
+            file_size=10,
+            uploaded_by=self.member
+        ))
+        content_hit = self.post('Determinants cheat sheet')
+
+        self.assertEqual(self.search('determinants'), [content_hit.id, attachment_hit.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        message = self.post('Gaussian elimination')
+        message.content = 'Row reduction'
+        message.save()
+        self.assertEqual(self.search('gaussian'), [])
+        self.assertEqual(self.search('reduction'), [message.id])
+
+        attachment = FileAttachment.objects.create(
+            file='chat_files/pivot.txt',
+            original_filename='pivot_table.txt',
+            file_size=10,
+            uploaded_by=self.member
+        )
+        message.attachments.add(attachment)
+        self.assertEqual(self.search('pivot'), [message.id])
+        attachment.delete()
+        self.assertEqual(self.search('pivot'), [])
+
+    def test_pagination(self):
+        ids = [self.post(f'Quiz review {i}').id for i in range(5)]
+        first = self.search('quiz', limit=2)
+        second = self.search('quiz', limit=2, offset=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(first, ids[::-1][:2])
+
+        response = self.client.get(self.url, {'q': 'quiz', 'limit': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CHAT_SEARCH_BACKEND='apps.study_groups.search.PythonSearchBackend')
+    def test_rebuild_command_backfills_the_configured_backend(self):
+        first = self.post('Orthogonal projections')
+        second = self.post('Orthogonal complements')
+        ChatMessageSearchTerm.objects.all().delete()
+        self.assertEqual(self.search('orthogonal'), [])
+
+        out = StringIO()
+        call_command('rebuild_chat_search_index', '--batch-size', '1', stdout=out)
+        self.assertEqual(self.search('orthogonal'), [second.id, first.id])
+        self.assertIn('Indexed 2 messages with PythonSearchBackend', out.getvalue())
+
+
+class MemberCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(
+                email=f'peer{i}@nyu.edu',
+                password='segroup2',
+                first_name='Peer',
+                last_name=str(i)
+            ) for i in range(3)
+        ]
+        self.creator = self.users[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.creator)
+
+    def create_group(self, name, creator=None, max_members=5):
+        self.client.force_authenticate(user=creator or self.creator)
+        response = self.client.post(reverse('study-group-list'), {
+            'name': name,
+            'description': 'Study group',
+            'subject': 'CS',
+            'max_members': max_members
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return StudyGroup.objects.get(id=response.data['id'])
+
+    def test_count_follows_join_and_leave(self):
+        group = self.create_group('Networks')
+        self.assertEqual(group.member_count, 1)
+
+        self.client.force_authenticate(user=self.users[1])
+        self.client.post(reverse('study-group-join', args=[group.id]))
+        self.client.post(reverse('study-group-join', args=[group.id]))
+        group.refresh_from_db()
+        self.assertEqual(group.member_count, 2)
+
+        self.client.post(reverse('study-group-leave', args=[group.id]))
+        group.refresh_from_db()
+        self.assertEqual(group.member_count, 1)
+        self.assertEqual(group.member_count, group.members.count())
+
+    def test_add_and_remove_member_report_changes(self):
+        group = self.create_group('Graphics')
+        self.assertFalse(group.add_member(self.creator))
+        self.assertTrue(group.add_member(self.users[1]))
+        self.assertTrue(self.users[2].join_group(group))
+        self.assertTrue(group.remove_member(self.users[1]))
+        self.assertFalse(group.remove_member(self.users[1]))
+        group.refresh_from_db()
+        self.assertEqual(group.member_count, 2)
+
+    def test_direct_membership_edits_keep_the_count(self):
+        group = self.create_group('Compilers')
+        other = self.create_group('Databases')
+
+        def counts():
+            # (stored counter, actual members) per group
+            return [(StudyGroup.objects.get(pk=g.pk).member_count, g.members.count()) for g in (group, other)]
+
+        # The admin's filter_horizontal saves with members.set().
+        group.members.set(self.users)
+        self.assertEqual(counts(), [(3, 3), (1, 1)])
+        group.members.remove(self.users[2])
+        self.users[1].joined_groups.add(other)
+        self.assertEqual(counts(), [(2, 2), (2, 2)])
+        self.users[1].joined_groups.clear()
+        self.assertEqual(counts(), [(1, 1), (1, 1)])
+        group.members.add(self.users[2])
+        self.users[2].delete()
+        self.assertEqual(counts(), [(1, 1), (1, 1)])
+
+    def test_list_query_count_is_independent_of_page_size(self):
+        url = reverse('study-group-list')
+        self.create_group('Group A')
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        for i, user in enumerate(self.users):
+            group = self.create_group(f'Group B{i}', creator=user)
+            for other in self.users:
+                group.add_member(other)
+
+        self.client.force_authenticate(user=self.users[1])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+        flags = {g['name']: g['is_member'] for g in response.data}
+        self.assertEqual(flags, {'Group A': False, 'Group B0': True, 'Group B1': True, 'Group B2': True})
+        self.assertTrue(all(g['members_count'] == 3 for g in response.data if g['name'] != 'Group A'))
+
+
+class JoinCapacityTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                email=f'joiner{i}@nyu.edu',
+                password='segroup2',
+                first_name='Joiner',
+                last_name=str(i)
+            ) for i in range(4)
+        ]
+        self.group = StudyGroup.objects.create(
+            name='Robotics',
+            description='Build night',
+            subject='ECE',
+            max_members=2,
+            creator=self.users[0]
+        )
+        self.group.add_member(self.users[0])
+        self.client = APIClient()
+
+    def test_full_group_rejects_join(self):
+        self.assertTrue(self.group.add_member(self.users[1], enforce_capacity=True))
+        with self.assertRaises(GroupFullError):
+            self.group.add_member(self.users[2], enforce_capacity=True)
+
+        self.client.force_authenticate(user=self.users[3])
+        response = self.client.post(reverse('study-group-join', args=[self.group.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('maximum member limit', response.data['detail'])
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 2)
+        self.assertEqual(self.group.members.count(), 2)
+
+    def test_rejoin_does_not_consume_a_seat(self):
+        self.assertFalse(self.group.add_member(self.users[0], enforce_capacity=True))
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 1)
+
+    def test_guarded_update_rejects_a_join_based_on_a_stale_count(self):
+        # Two requests loaded the group while one seat was left; the second
+        # to write must not be let in on the strength of its stale copy.
+        first = StudyGroup.objects.get(pk=self.group.pk)
+        second = StudyGroup.objects.get(pk=self.group.pk)
+        self.assertEqual(second.member_count, 1)
+
+        self.assertTrue(first.add_member(self.users[1], enforce_capacity=True))
+        with self.assertRaises(GroupFullError):
+            second.add_member(self.users[2], enforce_capacity=True)
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 2)
+        self.assertEqual(
+            set(self.group.members.values_list('id', flat=True)),
+            {self.users[0].id, self.users[1].id}
+        )
+
+    def test_joining_a_deleted_group_is_not_reported_as_full(self):
+        stale = StudyGroup.objects.get(pk=self.group.pk)
+        self.group.delete_group()
+        with self.assertRaises(StudyGroup.DoesNotExist):
+            stale.add_member(self.users[1], enforce_capacity=True)
+        self.assertEqual(self.group.members.count(), 1)
+
+    def test_member_is_removed_even_if_the_counter_drifted(self):
+        StudyGroup.objects.filter(pk=self.group.pk).update(member_count=0)
+        self.group.refresh_from_db()
+        self.assertTrue(self.group.remove_member(self.users[0]))
+        self.assertFalse(self.group.members.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, 0)
+        self.assertFalse(self.group.remove_member(self.users[0]))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+class ConcurrentJoinTests(TransactionTestCase):
+    """Hammers join from a thread pool; the cap must hold with no lost updates."""
+
+    joiners = 24
+    max_latency = 5.0
+
+    def setUp(self):
+        self.creator = User.objects.create_user(
+            email='host@nyu.edu',
+            password='segroup2',
+            first_name='Host',
+            last_name='User'
+        )
+        self.users = [
+            User.objects.create_user(
+                email=f'rush{i}@nyu.edu',
+                password='segroup2',
+                first_name='Rush',
+                last_name=str(i)
+            ) for i in range(self.joiners)
+        ]
+        self.group = StudyGroup.objects.create(
+            name='Popular Group',
+            description='Everyone wants in',
+            subject='CS',
+            max_members=5,
+            creator=self.creator
+        )
+        self.group.add_member(self.creator)
+
+    def join(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        started = time.monotonic()
+        try:
+            response = client.post(reverse('study-group-join', args=[self.group.id]))
+            return response.status_code, time.monotonic() - started
+        finally:
+            connection.close()
+
+    def test_cap_holds_under_concurrent_joins(self):
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(self.join, self.users))
+
+        joined = [code for code, _ in results if code == status.HTTP_200_OK]
+        rejected = [code for code, _ in results if code == status.HTTP_400_BAD_REQUEST]
+        self.assertEqual(len(joined), self.group.max_members - 1)
+        self.assertEqual(len(joined) + len(rejected), self.joiners)
+        self.assertLess(max(latency for _, latency in results), self.max_latency)
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, self.group.max_members)
+        self.assertEqual(self.group.members.count(), self.group.max_members)
+
+
+class StudyGroupListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='browser@nyu.edu',
+            password='segroup2',
+            first_name='Browse',
+            last_name='R'
+        )
+        self.groups = {}
+        for name, subject in [('Calculus I', 'Math'), ('Biology Lab', 'Bio'), ('Calculus II', 'Math')]:
+            group = StudyGroup.objects.create(
+                name=name,
+                description='Study group',
+                subject=subject,
+                max_members=2,
+                creator=self.user
+            )
+            self.groups[name] = group
+        self.groups['Calculus I'].add_member(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('study-group-list')
+
+    def test_list_is_compact(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        card = next(g for g in response.data if g['name'] == 'Calculus I')
+        self.assertNotIn('members', card)
+        self.assertNotIn('creator_details', card)
+        self.assertEqual(card['members_count'], 1)
+        self.assertTrue(card['is_member'])
+        self.assertFalse(card['is_full'])
+
+        detail = self.client.get(reverse('study-group-detail', args=[card['id']]))
+        self.assertEqual(len(detail.data['members']), 1)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(self.url, {'fields': 'name,members_count'})
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'members_count'})
+
+    def test_filter_and_order(self):
+        response = self.client.get(self.url, {'subject': 'Math', 'ordering': 'name'})
+        self.assertEqual([g['name'] for g in response.data], ['Calculus I', 'Calculus II'])
+
+        response = self.client.get(self.url, {'ordering': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'created_after': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pagination_is_opt_in(self):
+        response = self.client.get(self.url, {'page_size': 2, 'ordering': 'created_at'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        from apps.meetings.models import Meeting
+        from apps.group_tasks.models import Task
+
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='leaver@nyu.edu',
+            password='segroup2',
+            first_name='Lea',
+            last_name='Ver'
+        )
+        self.group = StudyGroup.objects.create(
+            name='Organic Chemistry',
+            description='Reaction mechanisms',
+            subject='Chem',
+            creator=self.user
+        )
+        self.group.add_member(self.user)
+        self.meeting = Meeting.objects.create(
+            title='Exam prep',
+            study_group=self.group,
+            creator=self.user
+        )
+        self.task = Task.objects.create(group=self.group, title='Read chapter 4')
+        self.message = ChatMessage.objects.create(
+            study_group=self.group,
+            sender=self.user,
+            content='See the attached notes'
+        )
+        self.attachment = FileAttachment.objects.create(
+            file='chat_files/notes.txt',
+            original_filename='notes.txt',
+            file_size=10,
+            uploaded_by=self.user
+        )
+        self.message.attachments.add(self.attachment)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_dismiss_hides_group_everywhere(self):
+        response = self.client.post(reverse('study-group-dismiss', args=[self.group.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertTrue(StudyGroup.all_objects.filter(id=self.group.id, deleted_at__isnull=False).exists())
+        self.assertFalse(StudyGroup.objects.filter(id=self.group.id).exists())
+        self.assertEqual(self.client.get(reverse('study-group-list')).data, [])
+        detail = self.client.get(reverse('study-group-detail', args=[self.group.id]))
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/meetings/').data, [])
+        self.assertEqual(self.client.get('/api/group_tasks/').data, [])
+        download = self.client.get(
+            reverse('chat-message-download-file'), {'file_id': self.attachment.id}
+        )
+        self.assertEqual(download.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(list(self.user.joined_groups.all()), [])
+
+        # Forward relations still resolve the deleted group.
+        self.meeting.refresh_from_db()
+        self.assertEqual(self.meeting.study_group.name, 'Organic Chemistry')
+
+    def test_destroy_is_soft(self):
+        response = self.client.delete(reverse('study-group-detail', args=[self.group.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(ChatMessage.objects.filter(id=self.message.id).exists())
+
+    def test_purge_removes_expired_groups_in_batches(self):
+        recent = StudyGroup.objects.create(
+            name='Physics',
+            description='Mechanics',
+            subject='Phys',
+            creator=self.user
+        )
+        recent.delete_group()
+        self.group.delete_group()
+        StudyGroup.all_objects.filter(id=self.group.id).update(deleted_at=now() - timedelta(days=45))
+        for i in range(4):
+            ChatMessage.objects.create(study_group=self.group, sender=self.user, content=f'old {i}')
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=False):
+            call_command('purge_deleted_groups', days=30, batch_size=2, stdout=out)
+
+        self.assertIn('Purged 1 groups, 5 messages', out.getvalue())
+        self.assertFalse(StudyGroup.all_objects.filter(id=self.group.id).exists())
+        self.assertFalse(ChatMessage.objects.filter(study_group_id=self.group.id).exists())
+        self.assertFalse(FileAttachment.objects.filter(id=self.attachment.id).exists())
+        self.assertFalse(self.group.meetings.model.objects.filter(id=self.meeting.id).exists())
+        self.assertTrue(StudyGroup.all_objects.filter(id=recent.id).exists())
+
+
+class AttachmentDownloadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.member = User.objects.create_user(
+            email='reader@nyu.edu',
+            password='segroup2',
+            first_name='Rea',
+            last_name='Der'
+        )
+        self.outsider = User.objects.create_user(
+            email='lurker@nyu.edu',
+            password='segroup2',
+            first_name='Lur',
+            last_name='Ker'
+        )
+        group = StudyGroup.objects.create(
+            name='Databases',
+            description='Query planning',
+            subject='CS',
+            creator=self.member
+        )
+        group.add_member(self.member)
+        self.payload = bytes(range(256)) * 4
+        self.attachment = FileAttachment.objects.create(
+            file=SimpleUploadedFile('lecture.pdf', self.payload),
+            original_filename='lecture.pdf',
+            file_size=len(self.payload),
+            uploaded_by=self.member
+        )
+        message = ChatMessage.objects.create(study_group=group, sender=self.member, content='Slides')
+        message.attachments.add(self.attachment)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+        self.url = reverse('chat-message-download-file')
+
+    def download(self, **headers):
+        return self.client.get(self.url, {'file_id': self.attachment.id}, **headers)
+
+    def test_full_download(self):
+        response = self.download()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.payload)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], str(len(self.payload)))
+        self.assertIn('lecture.pdf', response['Content-Disposition'])
+
+    def test_byte_ranges(self):
+        response = self.download(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.payload)}')
+        self.assertEqual(b''.join(response.streaming_content), self.payload[10:20])
+
+        response = self.download(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.payload[-5:])
+
+        response = self.download(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(b''.join(response.streaming_content), self.payload[1000:])
+
+        response = self.download(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.payload)}')
+
+    def test_stale_if_range_gets_full_file(self):
+        response = self.download(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_none_match(self):
+        etag = self.download()['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Attachment lookup plus the single permission exists().
+        self.assertEqual(len(queries), 2)
+
+    @override_settings(FILE_DOWNLOAD_OFFLOAD='x-accel-redirect', FILE_DOWNLOAD_ACCEL_PREFIX='/protected/')
+    def test_accel_redirect_offload(self):
+        response = self.download()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.attachment.file.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_outsider_is_forbidden(self):
+        self.client.force_authenticate(user=self.outsider)
+        self.assertEqual(self.download().status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(self.url, {'file_id': 9999})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.member = User.objects.create_user(
+            email='uploader@nyu.edu',
+            password='segroup2',
+            first_name='Up',
+            last_name='Loader'
+        )
+        group = StudyGroup.objects.create(
+            name='Operating Systems',
+            description='Scheduling',
+            subject='CS',
+            creator=self.member
+        )
+        group.add_member(self.member)
+        self.message = ChatMessage.objects.create(study_group=group, sender=self.member, content='Recording')
+        self.payload = os.urandom(3000)
+        self.checksum = hashlib.sha256(self.payload).hexdigest()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.member)
+
+    def start(self, **extra):
+        data = {'filename': 'lecture.mp4', 'size': len(self.payload)}
+        data.update(extra)
+        response = self.client.post(
+            reverse('chat-message-start-upload', args=[self.message.id]), data, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def put_chunk(self, session_id, offset, data):
+        url = reverse('chat-message-upload-chunk', kwargs={'session_id': session_id})
+        return self.client.put(
+            f'{url}?offset={offset}', data, content_type='application/octet-stream'
+        )
+
+    def finalize(self, session_id, **data):
+        url = reverse('chat-message-finalize-upload', kwargs={'session_id': session_id})
+        return self.client.post(url, data, format='json')
+
+    def test_resumable_upload(self):
+        session_id = self.start(checksum=self.checksum)
+
+        self.assertEqual(self.put_chunk(session_id, 0, self.payload[:1000]).data['offset'], 1000)
+        # A retried chunk is rejected and tells the client where to resume.
+        response = self.put_chunk(session_id, 0, self.payload[:1000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 1000)
+
+        status_url = reverse('chat-message-upload-chunk', kwargs={'session_id': session_id})
+        self.assertEqual(self.client.get(status_url).data['offset'], 1000)
+        self.assertEqual(self.finalize(session_id).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.put_chunk(session_id, 1000, self.payload[1000:])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalize(session_id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        attachment = self.message.attachments.get()
+        self.assertEqual(attachment.original_filename, 'lecture.mp4')
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.payload)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'chat_uploads')), [])
+
+    def test_racing_chunk_never_touches_the_part_file(self):
+        session_id = self.start()
+        session = UploadSession.objects.get(id=session_id)
+        stale = UploadSession.objects.get(id=session_id)
+
+        uploads.write_chunk(session, BytesIO(self.payload[:1000]), 0, 1000)
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(stale, BytesIO(b'x' * 1000), 0, 1000)
+        with open(uploads.part_path(session), 'rb') as part:
+            self.assertEqual(part.read(), self.payload[:1000])
+
+    def test_chunk_is_received_before_the_session_is_locked(self):
+        session = UploadSession.objects.get(id=self.start())
+        queries_during_reads = []
+
+        class SlowClient(BytesIO):
+            def read(self, size=-1):
+                queries_during_reads.append(len(queries.captured_queries))
+                return super().read(size)
+
+        with CaptureQueriesContext(connection) as queries:
+            uploads.write_chunk(session, SlowClient(self.payload), 0, len(self.payload))
+        self.assertEqual(set(queries_during_reads), {0})
+        self.assertTrue(queries.captured_queries)
+        with open(uploads.part_path(session), 'rb') as part:
+            self.assertEqual(part.read(), self.payload)
+        self.assertEqual(os.listdir(uploads.part_dir()), [f'{session.id}.part'])
+
+    def test_abandoned_uploads_are_purged(self):
+        kept = self.start()
+        expired = self.start()
+        UploadSession.objects.filter(id=expired).update(created_at=now() - timedelta(days=2))
+        orphan = os.path.join(self.media_root, 'chat_uploads', f'{uuid.uuid4()}.part')
+        open(orphan, 'wb').close()
+        staged = os.path.join(self.media_root, 'chat_uploads', f'{kept}.abc123.chunk')
+        open(staged, 'wb').close()
+        old = time.time() - 2 * 24 * 3600
+        os.utime(orphan, (old, old))
+        os.utime(staged, (old, old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(study_group_jobs.purge_abandoned_uploads(), (1, 2))
+        self.assertEqual(list(UploadSession.objects.values_list('id', flat=True)), [uuid.UUID(kept)])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'chat_uploads')), [f'{kept}.part'])
+
+    def test_oversized_chunk_is_rejected(self):
+        session_id = self.start()
+        response = self.put_chunk(session_id, 0, self.payload + b'extra')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checksum_mismatch_discards_upload(self):
+        session_id = self.start()
+        self.put_chunk(session_id, 0, self.payload)
+        response = self.finalize(session_id, checksum='0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(self.message.attachments.exists())
+
+    def test_malformed_checksum_is_a_client_error(self):
+        session_id = self.start()
+        self.put_chunk(session_id, 0, self.payload)
+        for checksum in (12345, ['abc']):
+            response = self.finalize(session_id, checksum=checksum)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(UploadSession.objects.filter(id=session_id).exists())
+
+    def test_losing_a_finalize_race_is_a_conflict(self):
+        session_id = self.start(checksum=self.checksum)
+        self.put_chunk(session_id, 0, self.payload)
+        # Both calls loaded the session before either locked it.
+        stale = UploadSession.objects.get(id=session_id)
+        self.assertEqual(self.finalize(session_id).status_code, status.HTTP_201_CREATED)
+
+        with mock.patch.object(ChatMessageViewSet, 'get_upload_session', return_value=stale):
+            response = self.finalize(session_id)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.message.attachments.count(), 1)
+
+    def test_sessions_are_private(self):
+        session_id = self.start()
+        other = User.objects.create_user(
+            email='snoop@nyu.edu',
+            password='segroup2',
+            first_name='Sn',
+            last_name='Oop'
+        )
+        self.client.force_authenticate(user=other)
+        response = self.put_chunk(session_id, 0, self.payload)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(
+            reverse('chat-message-start-upload', args=[self.message.id]),
+            {'filename': 'x.bin', 'size': 10},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_known_content_is_attached_without_transfer(self):
+        session_id = self.start(checksum=self.checksum)
+        self.put_chunk(session_id, 0, self.payload)
+        self.finalize(session_id)
+
+        response = self.client.post(
+            reverse('chat-message-start-upload', args=[self.message.id]),
+            {'filename': 'copy.mp4', 'size': len(self.payload), 'checksum': self.checksum},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['complete'])
+        first, second = self.message.attachments.order_by('id')
+        self.assertEqual(first.blob_id, self.checksum)
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(first.blob.ref_count, 2)
+        self.assertNotIn(self.checksum, attachment_etag(first))
+
+    def test_hash_of_someone_elses_file_is_not_enough(self):
+        owner = User.objects.create_user(
+            email='owner@nyu.edu',
+            password='segroup2',
+            first_name='Ow',
+            last_name='Ner'
+        )
+        private = StudyGroup.objects.create(name='Private', description='', subject='CS', creator=owner)
+        private.add_member(owner)
+        secret = ChatMessage.objects.create(study_group=private, sender=owner, content='Answers')
+        secret.attachments.add(FileAttachment.from_blob(
+            store_blob(SimpleUploadedFile('answers.pdf', self.payload)), 'answers.pdf', owner
+        ))
+
+        # Claiming the hash only opens a normal upload session...
+        session_id = self.start(checksum=self.checksum)
+        self.assertFalse(self.message.attachments.exists())
+        # ...and the bytes are shared once the server has hashed them.
+        self.put_chunk(session_id, 0, self.payload)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.finalize(session_id).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.message.attachments.get().blob.ref_count, 2)
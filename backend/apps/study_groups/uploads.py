@@ -0,0 +1,152 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+CHUNK_SIZE = 5 * 1024 * 1024
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+# An upload has this long from start_upload to finalize before it is purged.
+SESSION_TTL = timedelta(days=1)
+_COPY_BUFFER = 64 * 1024
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the session left off."""
+
+
+def part_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'chat_uploads')
+
+
+def part_path(session):
+    return os.path.join(part_dir(), f'{session.id}.part')
+
+
+def create_part_file(session):
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+def discard_part_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_chunk(session, stream, offset, length):
+    """Copies `length` bytes from `stream` into the part file at `offset`.
+
+    The request body is copied in small buffers, never held in memory as a
+    whole, into a staging file first, so no lock is held while a slow
+    client sends it. Only then is the session row locked, and only if it
+    is still at `offset` are the staged bytes copied into the part file;
+    a duplicated or racing chunk is rejected without touching it.
+    """
+    from .models import UploadSession
+
+    if offset != session.received:
+        raise OffsetMismatch
+    if length < 1 or offset + length > session.size:
+        raise ValueError(f"Chunk must be between 1 and {session.size - offset} bytes.")
+
+    os.makedirs(part_dir(), exist_ok=True)
+    fd, staged_path = tempfile.mkstemp(dir=part_dir(), prefix=f'{session.id}.', suffix='.chunk')
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as staged:
+            while written < length:
+                data = stream.read(min(_COPY_BUFFER, length - written))
+                if not data:
+                    break
+                staged.write(data)
+                written += len(data)
+        if written != length:
+            raise ValueError("Request body was shorter than Content-Length.")
+
+        with transaction.atomic():
+            # The guarded UPDATE takes the row lock; a concurrent chunk for the
+            # same offset waits here and then finds the offset has moved on.
+            if not UploadSession.objects.filter(id=session.id, received=offset).update(received=offset):
+                raise OffsetMismatch
+            with open(staged_path, 'rb') as staged, open(part_path(session), 'r+b') as part:
+                part.seek(offset)
+                shutil.copyfileobj(staged, part, _COPY_BUFFER)
+            UploadSession.objects.filter(id=session.id).update(received=offset + length)
+    finally:
+        discard_part_file(staged_path)
+    session.received = offset + length
+    return session.received
+
+
+def acquire_readable_blob(user, sha256, size):
+    """acquire_blob() limited to content the user can already download.
+
+    Knowing a hash is not proof of having the file, so anything else goes
+    through a normal upload and is deduplicated once the server has hashed
+    the bytes itself. Callers cannot tell the two cases apart, so this is
+    no oracle for which files exist.
+    """
+    from apps.files.blobs import acquire_blob
+    from .models import ChatMessage, FileAttachment
+
+    readable = (
+        FileAttachment.objects.filter(blob_id=sha256, uploaded_by=user).exists()
+        or ChatMessage.objects.filter(
+            attachments__blob_id=sha256,
+            study_group__members=user,
+            study_group__deleted_at__isnull=True
+        ).exists()
+    )
+    return acquire_blob(sha256, size) if readable else None
+
+
+def part_checksum(session):
+    digest = hashlib.sha256()
+    with open(part_path(session), 'rb') as part:
+        for block in iter(lambda: part.read(_COPY_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def purge_abandoned(now=None):
+    """Deletes sessions older than SESSION_TTL and part files left without a session.
+
+    Part files lose their session when its message or group is deleted;
+    they are only removed once untouched for SESSION_TTL as well. Staged
+    chunks left behind by a crashed request are removed after SESSION_TTL.
+    """
+    from .models import UploadSession
+
+    cutoff = (now or timezone.now()) - SESSION_TTL
+    expired = list(UploadSession.objects.filter(created_at__lt=cutoff))
+    UploadSession.objects.filter(id__in=[session.id for session in expired]).delete()
+    for session in expired:
+        transaction.on_commit(partial(discard_part_file, part_path(session)))
+
+    orphans = 0
+    try:
+        names = os.listdir(part_dir())
+    except FileNotFoundError:
+        names = []
+    live = {str(session_id) for session_id in UploadSession.objects.values_list('id', flat=True)}
+    for name in names:
+        path = os.path.join(part_dir(), name)
+        session_id = name[:-len('.part')]
+        if not name.endswith('.chunk') and (not name.endswith('.part') or session_id in live):
+            continue
+        try:
+            stale = os.path.getmtime(path) < cutoff.timestamp()
+        except FileNotFoundError:
+            continue
+        if stale:
+            transaction.on_commit(partial(discard_part_file, path))
+            orphans += 1
+    return len(expired), orphans
@@ -1,15 +1,16 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 from .views import StudyGroupViewSet, ChatMessageViewSet
 
 router = DefaultRouter()
 router.register(r'', StudyGroupViewSet, basename='study-group')
-message_router = DefaultRouter()
+message_router = SimpleRouter()
 message_router.register(r'messages', ChatMessageViewSet, basename='chat-message')
 
-# Add search messages endpoint directly
+# Add search messages endpoint directly. The message routes go first so
+# that messages/ is not swallowed by the study group detail route.
 urlpatterns = [
-    path('', include(router.urls)),
     path('', include(message_router.urls)),
+    path('', include(router.urls)),
     path('<int:group_id>/search_messages/', ChatMessageViewSet.as_view({'get': 'search_messages'}), name='search-messages'),
 ] 
\ No newline at end of file
@@ -3,13 +3,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import FileResponse
-from .models import StudyGroup, ChatMessage, FileAttachment
-from .serializers import StudyGroupSerializer, ChatMessageSerializer, FileAttachmentSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.db import transaction
+from django.http import Http404
+from .models import StudyGroup, ChatMessage, FileAttachment, GroupFullError, UploadSession
+from .serializers import StudyGroupSerializer, StudyGroupListSerializer, ChatMessageSerializer, FileAttachmentSerializer, UserSerializer, UploadSessionSerializer
+from .pagination import parse_page_params, keyset_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, OptionalPageNumberPagination
+from django.utils.dateparse import parse_datetime, parse_date
+from .search import search_group_messages
+from .downloads import serve_attachment
+from . import uploads
+from apps.files.blobs import store_blob, adopt_file
+from apps.caching.resources import cached_response
 import os
-import mimetypes
-import urllib.parse
+from functools import partial
 
 # Create your views here.
 
@@ -24,17 +32,16 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         
         # For detail actions (like upload_file), we need to return all messages
         # so that get_object can find the specific message by ID
-        if self.action in ['upload_file', 'delete_file']:
+        if self.action in ['upload_file', 'delete_file', 'start_upload']:
             print("Returning all messages for detail action")
-            return ChatMessage.objects.all()
+            return ChatMessage.objects.filter(study_group__deleted_at__isnull=True)
             
         # For list actions, filter by group_id
         group_id = self.request.query_params.get('group_id')
         if group_id:
             print(f"Filtering messages by group_id: {group_id}")
-            group = StudyGroup.objects.get(id=group_id)
-            if self.request.user in group.members.all():
-                return ChatMessage.objects.filter(study_group_id=group_id)
+            if StudyGroup.objects.filter(id=group_id, members=self.request.user).exists():
+                return ChatMessage.objects.filter(study_group_id=group_id).with_related()
         
         print("No group_id provided, returning empty queryset")
         return ChatMessage.objects.none()
@@ -73,15 +80,11 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             uploaded_file = request.FILES['file']
             print(f"File received: {uploaded_file.name}, size: {uploaded_file.size}")
             
-            file_attachment = FileAttachment.objects.create(
-                file=uploaded_file,
-                original_filename=uploaded_file.name,
-                file_size=uploaded_file.size,
-                uploaded_by=request.user
-            )
-            
-            print(f"File attachment created: {file_attachment.id}")
-            message.attachments.add(file_attachment)
+            with transaction.atomic():
+                blob = store_blob(uploaded_file)
+                file_attachment = FileAttachment.from_blob(blob, uploaded_file.name, request.user)
+                print(f"File attachment created: {file_attachment.id}")
+                message.attachments.add(file_attachment)
             print(f"File attachment added to message")
             
             serializer = FileAttachmentSerializer(file_attachment, context={'request': request})
@@ -94,6 +97,147 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['post'], parser_classes=[JSONParser, FormParser])
+    def start_upload(self, request, pk=None):
+        """Open a resumable upload session for an attachment on this message.
+
+        Body: filename, size and optionally checksum (hex SHA-256). The
+        client then PUTs chunks to uploads/<id>/?offset=N and POSTs
+        uploads/<id>/finalize/.
+        """
+        message = self.get_object()
+        if not message.study_group.members.filter(id=request.user.id).exists():
+            return Response(
+                {"detail": "You must be a member of the group to upload files."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Content the user can already download is attached without any
+        # transfer; everything else is uploaded and deduplicated on finalize.
+        checksum = serializer.validated_data.get('checksum')
+        if checksum:
+            with transaction.atomic():
+                blob = uploads.acquire_readable_blob(
+                    request.user, checksum, serializer.validated_data['size']
+                )
+                if blob is not None:
+                    file_attachment = FileAttachment.from_blob(
+                        blob, serializer.validated_data['filename'], request.user
+                    )
+                    message.attachments.add(file_attachment)
+            if blob is not None:
+                attachment_data = FileAttachmentSerializer(file_attachment, context={'request': request}).data
+                return Response({'complete': True, 'attachment': attachment_data}, status=status.HTTP_201_CREATED)
+
+        session = serializer.save(message=message, uploaded_by=request.user)
+        uploads.create_part_file(session)
+
+        data = dict(serializer.data, chunk_size=uploads.CHUNK_SIZE, complete=False)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def get_upload_session(self, request, session_id):
+        return get_object_or_404(
+            UploadSession,
+            id=session_id,
+            uploaded_by=request.user,
+            message__study_group__deleted_at__isnull=True
+        )
+
+    @action(detail=False, methods=['get', 'put', 'delete'], url_path=r'uploads/(?P<session_id>[0-9a-f-]{36})')
+    def upload_chunk(self, request, session_id=None):
+        """GET reports the offset to resume from, PUT appends a chunk, DELETE aborts.
+
+        A chunk is the raw request body and must start at ?offset=, which
+        has to equal the bytes received so far (409 otherwise).
+        """
+        session = self.get_upload_session(request, session_id)
+
+        if request.method == 'GET':
+            return Response(UploadSessionSerializer(session).data)
+
+        if request.method == 'DELETE':
+            uploads.discard_part_file(uploads.part_path(session))
+            session.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response(
+                {"detail": "'offset' must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            uploads.write_chunk(session, request.stream, offset, length)
+        except uploads.OffsetMismatch:
+            session.refresh_from_db(fields=['received'])
+            return Response(
+                {"detail": "Chunk does not start at the current offset.", "offset": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(UploadSessionSerializer(session).data)
+
+    @action(detail=False, methods=['post'], url_path=r'uploads/(?P<session_id>[0-9a-f-]{36})/finalize',
+            parser_classes=[JSONParser, FormParser])
+    def finalize_upload(self, request, session_id=None):
+        """Verify the assembled file and attach it to the message."""
+        session = self.get_upload_session(request, session_id)
+
+        checksum = request.data.get('checksum') or session.checksum
+        if not isinstance(checksum, str):
+            return Response(
+                {"detail": "'checksum' must be a hex-encoded SHA-256 string."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        expected = checksum.lower()
+        if not expected:
+            return Response(
+                {"detail": "A SHA-256 checksum is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            # Concurrent finalize calls for one session queue on this lock;
+            # the later one finds the session already gone.
+            session = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+            if session is None:
+                return Response(
+                    {"detail": "This upload has already been finalized."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if session.received != session.size:
+                return Response(
+                    {"detail": "Upload is incomplete.", "offset": session.received},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            path = uploads.part_path(session)
+            actual = uploads.part_checksum(session)
+            if actual != expected:
+                # The bytes on disk cannot be trusted any more; start over.
+                session.delete()
+                transaction.on_commit(partial(uploads.discard_part_file, path))
+                return Response(
+                    {"detail": "Checksum mismatch, the upload has been discarded."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            blob = adopt_file(path, actual, session.size)
+            file_attachment = FileAttachment.from_blob(blob, session.filename, request.user)
+            session.message.attachments.add(file_attachment)
+            session.delete()
+
+        serializer = FileAttachmentSerializer(file_attachment, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['delete'])
     def delete_file(self, request, pk=None):
         """Delete a file attachment from a message."""
@@ -116,8 +260,9 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # Delete the file from storage
-            if file_attachment.file:
+            # Delete the file from storage. Shared blobs are released by the
+            # post_delete signal and only removed with their last reference.
+            if file_attachment.file and not file_attachment.blob_id:
                 if os.path.isfile(file_attachment.file.path):
                     os.remove(file_attachment.file.path)
             
@@ -132,7 +277,10 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def download_file(self, request):
-        """Download a file attachment."""
+        """Download a file attachment.
+
+        Supports Range requests and If-None-Match, see serve_attachment.
+        """
         try:
             file_id = request.query_params.get('file_id')
             print(f"Downloading file with ID: {file_id}")
@@ -144,42 +292,23 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                 )
             
             file_attachment = get_object_or_404(FileAttachment, id=file_id)
-            print(f"Found file attachment: {file_attachment.id}, {file_attachment.original_filename}")
             
             # Check if user has permission to download the file
-            message = ChatMessage.objects.filter(attachments=file_attachment).first()
-            if not message or request.user not in message.study_group.members.all():
+            allowed = ChatMessage.objects.filter(
+                attachments=file_attachment,
+                study_group__members=request.user,
+                study_group__deleted_at__isnull=True
+            ).exists()
+            if not allowed:
                 return Response(
                     {"detail": "You don't have permission to download this file."},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            print(f"User has permission to download file")
-            
-            # Create the response with the file
-            response = FileResponse(file_attachment.file, as_attachment=True)
-            
-            # Set the Content-Disposition header with the original filename
-            # Make sure to properly encode the filename for HTTP headers
-            encoded_filename = urllib.parse.quote(file_attachment.original_filename)
-            content_disposition = f'attachment; filename="{encoded_filename}"'
-            print(f"Setting Content-Disposition header: {content_disposition}")
-            response['Content-Disposition'] = content_disposition
-            
-            # Set the Content-Type header based on the file extension
-            content_type, _ = mimetypes.guess_type(file_attachment.original_filename)
-            if content_type:
-                print(f"Setting Content-Type header: {content_type}")
-                response['Content-Type'] = content_type
-            else:
-                print("Could not determine Content-Type, using application/octet-stream")
-                response['Content-Type'] = 'application/octet-stream'
-            
-            # Set Access-Control-Expose-Headers to ensure the frontend can access these headers
-            response['Access-Control-Expose-Headers'] = 'Content-Disposition, Content-Type'
-            
-            return response
+            return serve_attachment(request, file_attachment)
             
+        except Http404:
+            raise
         except Exception as e:
             print(f"Error downloading file: {str(e)}")
             return Response(
@@ -189,7 +318,11 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def search_messages(self, request, group_id=None):
-        """Search messages in a specific group."""
+        """Search messages in a specific group.
+
+        Matches message text and attachment names, best match first.
+        Pages with ?limit and ?offset.
+        """
         try:
             group = StudyGroup.objects.get(id=group_id)
             if request.user not in group.members.all():
@@ -205,12 +338,19 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
+            try:
+                limit = min(int(request.query_params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+                offset = int(request.query_params.get('offset', 0))
+                if limit < 1 or offset < 0:
+                    raise ValueError
+            except ValueError:
+                return Response(
+                    {"detail": "'limit' and 'offset' must be non-negative integers."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             print(f"Searching messages in group {group_id} for query: {query}")
-            messages = ChatMessage.objects.filter(
-                study_group=group,
-                content__icontains=query
-            ).order_by('-timestamp')
-            print(f"Found {messages.count()} messages")
+            messages = search_group_messages(group, query, offset=offset, limit=limit)
             
             serializer = ChatMessageSerializer(messages, many=True)
             return Response(serializer.data)
@@ -231,9 +371,59 @@ class StudyGroupViewSet(viewsets.ModelViewSet):
     queryset = StudyGroup.objects.all()
     serializer_class = StudyGroupSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalPageNumberPagination
+    ordering_fields = {'name', 'subject', 'created_at'}
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return StudyGroupListSerializer
+        return StudyGroupSerializer
 
     def get_queryset(self):
-        return StudyGroup.objects.all().prefetch_related('members')
+        if self.action in ('join', 'leave', 'dismiss'):
+            # Membership changes only need the group row itself.
+            return StudyGroup.objects.all()
+        if self.action == 'list':
+            return self.filter_list_queryset(StudyGroup.objects.all())
+        return StudyGroup.objects.all().select_related('creator').prefetch_related('members')
+
+    def filter_list_queryset(self, queryset):
+        """Applies ?subject=, ?created_after=, ?created_before= and ?ordering=."""
+        params = self.request.query_params
+
+        subject = params.get('subject')
+        if subject:
+            queryset = queryset.filter(subject=subject)
+
+        for param, lookup in (('created_after', 'created_at__gte'), ('created_before', 'created_at__lt')):
+            value = params.get(param)
+            if not value:
+                continue
+            parsed = parse_datetime(value) or parse_date(value)
+            if parsed is None:
+                raise ValidationError({param: 'Expected an ISO 8601 date or datetime.'})
+            queryset = queryset.filter(**{lookup: parsed})
+
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering.lstrip('-') not in self.ordering_fields:
+                raise ValidationError({'ordering': f"Order by one of: {', '.join(sorted(self.ordering_fields))}."})
+            queryset = queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, 'study_groups.list', ['study_groups'],
+            lambda: super(StudyGroupViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve') and self.request.user.is_authenticated:
+            context['member_group_ids'] = set(
+                self.request.user.joined_groups.values_list('id', flat=True)
+            )
+        return context
     
     def update(self, request, *args, **kwargs):
         group = self.get_object()
@@ -256,19 +446,25 @@ class StudyGroupViewSet(viewsets.ModelViewSet):
     def partial_update(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        # Soft delete; purge_deleted_groups removes the rows later.
+        instance.delete_group()
+
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None):
         """Get all members of a study group."""
         group = self.get_object()
-        if request.user not in group.members.all():
+        response = cached_response(
+            request, 'study_groups.members', [f'study_group:{group.pk}'],
+            lambda: Response(UserSerializer(group.members.all(), many=True).data),
+            per_user=False
+        )
+        if not any(member['id'] == request.user.id for member in response.data):
             return Response(
                 {"detail": "You must be a member of the group to view members."},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        members = group.members.all()
-        serializer = UserSerializer(members, many=True)
-        return Response(serializer.data)
+        return response
 
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
@@ -281,13 +477,18 @@ class StudyGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if group.members.count() >= group.max_members:
+        try:
+            joined = group.add_member(user, enforce_capacity=True)
+        except GroupFullError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except StudyGroup.DoesNotExist as e:
+            return Response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        if not joined:
             return Response(
-                {'detail': 'This group has reached its maximum member limit.'},
+                {'detail': 'You are already a member of this group.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        group.members.add(user)
         return Response({'detail': 'Successfully joined the group.'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -301,18 +502,18 @@ class StudyGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if group.creator == user and group.members.count() > 1:
+        if group.creator == user and group.member_count > 1:
             return Response(
                 {'detail': 'As the creator, you cannot leave the group while other members are present.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # If creator is leaving and they're the only member, delete the group
-        if group.creator == user and group.members.count() == 1:
-            group.delete()
+        if group.creator == user and group.member_count == 1:
+            group.delete_group()
             return Response({'detail': 'Group has been dismissed.'}, status=status.HTTP_200_OK)
 
-        group.members.remove(user)
+        group.remove_member(user)
         return Response({'detail': 'Successfully left the group.'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -326,26 +527,39 @@ class StudyGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if group.members.count() > 1:
+        if group.member_count > 1:
             return Response(
                 {'detail': 'Cannot dismiss group while other members are present.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        group.delete()
+        group.delete_group()
         return Response({'detail': 'Group has been dismissed.'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
-        """Get chat messages for a specific group."""
+        """Get chat messages for a specific group.
+
+        Returns the latest page by default. Older history is fetched with
+        ?before=<message id>, newer pages with ?after=<message id>, and
+        pollers pass ?since_id=<last seen id> to receive only new messages.
+        """
         group = self.get_object()
         if request.user not in group.members.all():
             return Response(
                 {"detail": "You must be a member of the group to view messages."},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        messages = ChatMessage.objects.filter(study_group=group)
+
+        try:
+            params = parse_page_params(request.query_params)
+            messages = keyset_page(
+                ChatMessage.objects.filter(study_group=group).with_related(),
+                **params
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = ChatMessageSerializer(messages, many=True)
         return Response(serializer.data)
 
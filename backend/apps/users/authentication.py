@@ -0,0 +1,132 @@
+"""Token authentication without a database query per request.
+
+Resolved tokens are kept in two tiers: a small LRU in each process and
+the shared Django cache. Deleting a token or saving its user (password
+reset, deactivation, profile edits) drops both tiers in the process
+that made the change and the shared tier everywhere; other processes
+may serve their local copy for up to TOKEN_CACHE_LOCAL_TTL seconds.
+
+The cached user never carries its password hash or one-time codes; those
+fields are deferred and read from the database if a view needs them.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of pickled tokens with a per-entry expiry.
+
+    Entries are stored pickled so concurrent requests never share, and
+    mutate, the same User instance.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, token):
+        data = pickle.dumps(token)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_tokens = LocalTokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_LOCAL_TTL)
+
+# Secrets that must not be copied into the cache with the user.
+UNCACHED_USER_FIELDS = ('password', 'verification_code', 'reset_code')
+
+
+def _cache_key(key):
+    # Raw tokens are credentials; keep them out of cache key names.
+    return 'auth_token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def get_token(key):
+    """Returns the Token for `key` with its user loaded, or None.
+
+    The user's UNCACHED_USER_FIELDS are deferred.
+    """
+    cache_key = _cache_key(key)
+    token = local_tokens.get(cache_key)
+    if token is not None:
+        return token
+    token = cache.get(cache_key)
+    if token is None:
+        token = (
+            Token.objects.select_related('user')
+            .defer(*(f'user__{name}' for name in UNCACHED_USER_FIELDS))
+            .filter(key=key).first()
+        )
+        if token is None:
+            return None
+        cache.set(cache_key, token, settings.TOKEN_CACHE_TTL)
+    local_tokens.set(cache_key, token)
+    return token
+
+
+def _forget_now(keys):
+    cache_keys = [_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_tokens.delete(cache_key)
+    cache.delete_many(cache_keys)
+
+
+def forget_tokens(keys):
+    """Drops cached tokens now and again once the transaction commits, so a
+    request racing the change cannot put the old state back."""
+    keys = list(keys)
+    if keys:
+        _forget_now(keys)
+        transaction.on_commit(lambda: _forget_now(keys))
+
+
+def forget_user_tokens(user_id):
+    forget_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that resolves tokens through get_token()."""
+
+    def authenticate_credentials(self, key):
+        token = get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
@@ -50,13 +50,11 @@ class User(AbstractUser):
 
     def join_group(self, group):
         """Joins an existing study group."""
-        group.members.add(self)
-        return True
+        return group.add_member(self)
 
     def leave_group(self, group):
         """Leaves a study group."""
-        group.members.remove(self)
-        return True
+        return group.remove_member(self)
 
     def update_profile(self, details):
         """Updates user profile based on the provided dictionary."""
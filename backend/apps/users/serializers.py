@@ -2,7 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.utils.crypto import get_random_string
-from django.core.mail import send_mail
+from django.db import transaction
+from apps.mailer.outbox import queue_email
 
 User = get_user_model()
 
@@ -29,6 +30,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"password": "Password fields didn't match."})
         return attrs
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data.pop('password2')
         verification_code = get_random_string(length=6, allowed_chars='0123456789')
@@ -43,13 +45,11 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.set_password(validated_data['password'])
         user.save()
 
-        # Send email with the code
-        send_mail(
-        subject="Verify your email",
-        message=f"Your verification code is: {verification_code}",
-        from_email=None,  # Uses DEFAULT_FROM_EMAIL
-        recipient_list=[user.email],
-        fail_silently=False,  # <--- So we get error messages if it fails
+        # Queue the email with the code; the job worker sends it
+        queue_email(
+            subject="Verify your email",
+            body=f"Your verification code is: {verification_code}",
+            to=[user.email],
         )
 
         return user
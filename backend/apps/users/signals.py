@@ -0,0 +1,45 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens, forget_user_tokens
+from .models import User
+
+# Fields whose change has to reach requests served from a cached token:
+# the auth state, plus the profile fields the cached copy of the user
+# answers with. Bookkeeping saves such as last_login leave the cache alone.
+TRACKED_USER_FIELDS = frozenset((
+    'password', 'is_active', 'is_verified', 'is_staff', 'is_superuser',
+    'email', 'first_name', 'last_name',
+))
+
+_UNLOADED = object()
+
+
+def _tracked_state(user):
+    # Read __dict__ so deferred fields are not loaded just to be remembered.
+    return {name: user.__dict__.get(name, _UNLOADED) for name in TRACKED_USER_FIELDS}
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._tracked_state = _tracked_state(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    # Cached tokens carry a copy of the user; a password reset or
+    # deactivation has to take effect on the next request.
+    saved_state = _tracked_state(instance)
+    previous_state, instance._tracked_state = instance._tracked_state, saved_state
+    if created:
+        return
+    if update_fields is not None and not TRACKED_USER_FIELDS.intersection(update_fields):
+        return
+    if saved_state != previous_state:
+        forget_user_tokens(instance.pk)
@@ -1,3 +1,167 @@
+from django.contrib.auth.models import update_last_login
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from apps.mailer.models import OutgoingEmail
+from apps.mailer.outbox import deliver_pending
+from .authentication import CachedTokenAuthentication, LocalTokenCache, _cache_key, local_tokens
+from .models import User
+
+
+class AccountEmailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register_queues_the_verification_email(self):
+        response = self.client.post(reverse('register'), {
+            'email': 'new.student@nyu.edu',
+            'password': 'Segroup2-strong',
+            'password2': 'Segroup2-strong',
+            'first_name': 'New',
+            'last_name': 'Student',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().to, ['new.student@nyu.edu'])
+
+        deliver_pending()
+        user = User.objects.get(email='new.student@nyu.edu')
+        self.assertEqual(mail.outbox[0].subject, 'Verify your email')
+        self.assertIn(user.verification_code, mail.outbox[0].body)
+
+    def test_reset_code_is_queued(self):
+        user = User.objects.create_user(
+            email='forgetful@nyu.edu',
+            password='segroup2',
+            first_name='For',
+            last_name='Getful'
+        )
+        response = self.client.post(reverse('send-reset-code'), {'email': user.email}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+
+        deliver_pending()
+        user.refresh_from_db()
+        self.assertEqual(mail.outbox[0].from_email, 'ClassBuddy <no-reply@classbuddy.dev>')
+        self.assertIn(user.reset_code, mail.outbox[0].body)
+
+
+class TokenAuthCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = User.objects.create_user(
+            email='tokened@nyu.edu',
+            password='segroup2',
+            first_name='Token',
+            last_name='Holder',
+            is_verified=True
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_needs_no_query(self):
+        self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('get_user'))
+        self.assertEqual(response.data['email'], 'tokened@nyu.edu')
+
+        # A process with a cold LRU is served by the shared tier.
+        local_tokens.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(reverse('get_user'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_reset_evicts_the_cached_token(self):
+        self.client.get(reverse('get_user'))
+        self.user.reset_code = '123456'
+        self.user.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(reverse('reset-password'), {
+                'email': self.user.email,
+                'code': '123456',
+                'new_password': 'Segroup2-new'
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The token stays valid; only the cached copy is dropped.
+        self.assertTrue(Token.objects.filter(key=self.token.key).exists())
+        self.assertIsNone(cache.get(_cache_key(self.token.key)))
+        self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_200_OK)
+
+    def test_last_login_update_keeps_the_cache(self):
+        self.client.get(reverse('get_user'))
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_200_OK)
+
+    def test_profile_edit_evicts_the_cached_token(self):
+        self.client.get(reverse('get_user'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('profile'), {'first_name': 'Renamed'}, format='json')
+        self.assertEqual(self.client.get(reverse('get_user')).data['first_name'], 'Renamed')
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('get_user'))
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('get_user')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_local_cache_is_a_bounded_lru(self):
+        lru = LocalTokenCache(size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+        expired = LocalTokenCache(size=2, ttl=0)
+        expired.set('a', 1)
+        self.assertIsNone(expired.get('a'))
+
+    def test_benchmark_auth_cost_per_request(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        rounds = 500
+
+        def run(backend):
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(rounds):
+                    user, _ = backend.authenticate(request)
+            self.assertEqual(user, self.user)
+            return len(queries)
+
+        self.assertEqual(run(TokenAuthentication()), rounds)
+        cached = CachedTokenAuthentication()
+        cached.authenticate(request)
+        self.assertEqual(run(cached), 0)
+
+    def test_cached_user_has_no_secrets(self):
+        self.user.verification_code = '654321'
+        self.user.save()
+        self.client.get(reverse('get_user'))
+
+        cached = cache.get(_cache_key(self.token.key))
+        for name in ('password', 'verification_code', 'reset_code'):
+            self.assertNotIn(name, cached.user.__dict__)
+        pickled = b''.join(data for _, data in local_tokens.entries.values())
+        self.assertNotIn(self.user.password.encode(), pickled)
+        self.assertNotIn(b'654321', pickled)
+
+        # Deferred fields are still readable when a view needs them.
+        with self.assertNumQueries(1):
+            self.assertTrue(cached.user.check_password('segroup2'))
@@ -6,7 +6,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from apps.mailer.outbox import queue_email
+from apps.caching.resources import cached_response
 from django.utils.crypto import get_random_string
 from .serializers import UserSerializer, RegisterSerializer
 
@@ -129,12 +130,11 @@ def send_reset_code(request):
         code = get_random_string(length=6, allowed_chars='0123456789')
         user.reset_code = code
         user.save()
-        send_mail(
+        queue_email(
             'Reset Your Password',
             f'Your password reset code is: {code}',
-            'ClassBuddy <no-reply@classbuddy.dev>',
             [user.email],
-            fail_silently=False
+            from_email='ClassBuddy <no-reply@classbuddy.dev>'
         )
         return Response({'message': 'Password reset code sent.'})
     except User.DoesNotExist:
@@ -165,10 +165,15 @@ def reset_password(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_users(request):
-    users = User.objects.filter(is_active=True, is_verified=True).exclude(id=request.user.id)
-    return Response([{
-        'id': user.id,
-        'email': user.email,
-        'first_name': user.first_name,
-        'last_name': user.last_name
-    } for user in users])
+    # One cached directory for everyone; the caller is filtered out per request.
+    def build():
+        users = User.objects.filter(is_active=True, is_verified=True)
+        return Response([{
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name
+        } for user in users])
+
+    response = cached_response(request, 'users.list', ['users'], build, per_user=False)
+    return Response([user for user in response.data if user['id'] != request.user.id])
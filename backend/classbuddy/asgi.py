@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'classbuddy.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.realtime.consumers import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Routes WebSocket connections to the realtime app, HTTP to Django."""
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
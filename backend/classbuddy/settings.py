@@ -80,11 +80,14 @@ INSTALLED_APPS = [
     'apps.meetings.apps.MeetingsConfig',
     'apps.notifications.apps.NotificationsConfig',
     'apps.group_tasks.apps.GroupTasksConfig',
-    'apps.direct_messages.apps.DirectMessagesConfig'
+    'apps.direct_messages.apps.DirectMessagesConfig',
+    'apps.realtime.apps.RealtimeConfig',
+    'apps.jobs.apps.JobsConfig',
+    'apps.mailer.apps.MailerConfig',
+    'apps.caching.apps.CachingConfig',
 ]
 
 AUTH_USER_MODEL = 'users.User'
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
@@ -98,7 +101,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 ROOT_URLCONF = 'classbuddy.urls'
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Mail is queued in the apps.mailer outbox and sent by the job worker.
+# For local development set EMAIL_BACKEND to the console or file backend
+# (django.core.mail.backends.filebased.EmailBackend writes to EMAIL_FILE_PATH);
+# the test runner always swaps in the locmem backend.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -134,16 +143,48 @@ DATABASES = {
     'default': dj_database_url.config(conn_max_age=600, ssl_require=True)
 }
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://classbuddy_redis:6379/1',
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+REDIS_URL = config('REDIS_URL', default='redis://classbuddy_redis:6379/1')
+
+# The test suite, and setups without Redis (REDIS_URL=''), get a
+# per-process locmem cache instead.
+if TESTING or not REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'classbuddy',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            }
         }
     }
+
+# Read-through cache for hot API endpoints (apps.caching): seconds an entry
+# may be served. Entries are also dropped as soon as their data changes.
+API_CACHE_TTLS = {
+    'study_groups.list': 60,
+    'study_groups.members': 300,
+    'meetings.list': 120,
+    'tasks.list': 60,
+    'users.list': 300,
 }
 
+# Realtime chat delivery
+# The in-memory broker only reaches clients connected to the same process;
+# it is used by the test suite. Multi-worker deployments use Redis.
+REALTIME_BROKER = config(
+    'REALTIME_BROKER',
+    default='apps.realtime.broker.InMemoryBroker' if TESTING else 'apps.realtime.broker.RedisBroker'
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -165,13 +206,19 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# CachedTokenAuthentication: entries in each process's LRU, and seconds a
+# token is cached locally and in the shared cache.
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_LOCAL_TTL = 10
+TOKEN_CACHE_TTL = 300
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -209,3 +256,14 @@ SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 MEDIA_ROOT = '/app/backend/chat_files'
 MEDIA_URL = '/media/'
+
+# Chat attachment downloads
+# '' streams through Django. 'x-accel-redirect' hands the transfer to nginx
+# (an internal location at FILE_DOWNLOAD_ACCEL_PREFIX aliased to MEDIA_ROOT),
+# 'x-sendfile' to Apache/lighttpd.
+FILE_DOWNLOAD_OFFLOAD = config('FILE_DOWNLOAD_OFFLOAD', default='')
+FILE_DOWNLOAD_ACCEL_PREFIX = config('FILE_DOWNLOAD_ACCEL_PREFIX', default='/protected-media/')
+
+# Background jobs (python manage.py run_worker)
+# Members get a MEETING_REMINDER notification this long before a meeting.
+MEETING_REMINDER_LEAD_MINUTES = config('MEETING_REMINDER_LEAD_MINUTES', default=60, cast=int)
@@ -26,6 +26,7 @@ urlpatterns = [
     path('api/meetings/', include('apps.meetings.urls')),
     path('api/', include('apps.group_tasks.urls')),
     path('api/direct-messages/', include('apps.direct_messages.urls')),
+    path('api/notifications/', include('apps.notifications.urls')),
     path('meetings/<int:meeting_id>/availability/', views.MeetingAvailabilityView.as_view()),
     path('study-groups/<int:group_id>/members/', views.StudyGroupMembersView.as_view()),
 ]
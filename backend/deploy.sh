@@ -13,5 +13,5 @@ export DJANGO_SUPERUSER_LAST_NAME=admin
 export DJANGO_SUPERUSER_PASSWORD=admin
 python manage.py createsuperuser --noinput --first_name $DJANGO_SUPERUSER_FIRST_NAME --last_name "$DJANGO_SUPERUSER_LAST_NAME" --email $DJANGO_SUPERUSER_EMAIL
 
-# run the backend
-python manage.py runserver 0.0.0.0:8000
+# run the backend (ASGI, so the realtime WebSocket endpoint is served too)
+uvicorn classbuddy.asgi:application --host 0.0.0.0 --port 8000
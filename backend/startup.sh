@@ -1,4 +1,4 @@
 #!/bin/bash
 python manage.py collectstatic --noinput
 python manage.py migrate
-gunicorn classbuddy.wsgi:application --bind=0.0.0.0:8000
\ No newline at end of file
+gunicorn classbuddy.asgi:application -k uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
\ No newline at end of file
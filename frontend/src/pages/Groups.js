@@ -6,6 +6,8 @@ import { FaPencilAlt, FaPaperclip, FaDownload, FaTrash, FaSearch } from 'react-i
 import { toast } from 'react-hot-toast';
 import TaskBoard from '../components/TaskBoard';
 
+const MESSAGE_PAGE_SIZE = 50;
+
 const Groups = () => {
   const [groups, setGroups] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -23,6 +25,8 @@ const Groups = () => {
     max_members: 5
   });
   const [messages, setMessages] = useState([]);
+  const [hasOlderMessages, setHasOlderMessages] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [newMessage, setNewMessage] = useState('');
   const [messagePollingInterval, setMessagePollingInterval] = useState(null);
   const [editGroupData, setEditGroupData] = useState({
@@ -55,17 +59,48 @@ const Groups = () => {
     }
   }, []);
 
+  // The messages endpoint returns the latest MESSAGE_PAGE_SIZE messages;
+  // older history is fetched page by page with ?before=<oldest loaded id>.
   const fetchMessages = useCallback(async (groupId) => {
     try {
       const response = await axios.get(`${process.env.REACT_APP_API_URL}/api/study-groups/${groupId}/messages/`, {
-        headers: { Authorization: `Token ${sessionStorage.getItem('token')}` }
+        headers: { Authorization: `Token ${sessionStorage.getItem('token')}` },
+        params: { limit: MESSAGE_PAGE_SIZE }
       });
-      setMessages(response.data);
+      const latest = response.data;
+      // Refresh the latest page but keep any older pages already loaded.
+      setMessages(prev => {
+        if (latest.length === 0) {
+          return [];
+        }
+        return [...prev.filter(message => message.id < latest[0].id), ...latest];
+      });
+      setHasOlderMessages(prev => prev || latest.length === MESSAGE_PAGE_SIZE);
     } catch (error) {
       console.error('Error fetching messages:', error);
     }
   }, []);
 
+  const fetchOlderMessages = async () => {
+    if (!selectedGroup || messages.length === 0) {
+      return;
+    }
+    try {
+      setLoadingOlder(true);
+      const response = await axios.get(`${process.env.REACT_APP_API_URL}/api/study-groups/${selectedGroup.id}/messages/`, {
+        headers: { Authorization: `Token ${sessionStorage.getItem('token')}` },
+        params: { before: messages[0].id, limit: MESSAGE_PAGE_SIZE }
+      });
+      const older = response.data;
+      setMessages(prev => [...older, ...prev]);
+      setHasOlderMessages(older.length === MESSAGE_PAGE_SIZE);
+    } catch (error) {
+      console.error('Error fetching older messages:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   useEffect(() => {
     fetchGroups();
   }, [fetchGroups]);
@@ -151,9 +186,18 @@ const Groups = () => {
     }
   };
 
-  const handleGroupClick = (group) => {
-    setSelectedGroup(group);
+  const handleGroupClick = async (group) => {
+    // The list only carries counts; load the member list for the modal.
+    setSelectedGroup({ ...group, members: [] });
     setShowMembersModal(true);
+    try {
+      const response = await axios.get(`${process.env.REACT_APP_API_URL}/api/study-groups/${group.id}/`, {
+        headers: { Authorization: `Token ${sessionStorage.getItem('token')}` }
+      });
+      setSelectedGroup(response.data);
+    } catch (error) {
+      console.error('Error fetching group details:', error);
+    }
   };
 
   const sendMessage = async (e) => {
@@ -185,6 +229,7 @@ const Groups = () => {
   const handleCloseChatModal = () => {
     setShowChatModal(false);
     setMessages([]);
+    setHasOlderMessages(false);
     setIsSearchFormVisible(false);
     setSearchQuery('');
     setSearchResults([]);
@@ -762,7 +807,18 @@ const Groups = () => {
                   No messages found matching your search.
                 </div>
               ) : (
-                messages.map((message) => (
+                <>
+                {hasOlderMessages && (
+                  <button
+                    type="button"
+                    className="load-older-btn"
+                    onClick={fetchOlderMessages}
+                    disabled={loadingOlder}
+                  >
+                    {loadingOlder ? 'Loading...' : 'Load older messages'}
+                  </button>
+                )}
+                {messages.map((message) => (
                   <div 
                     key={message.id} 
                     className={`message ${message.sender.id === user.id ? 'message-own' : 'message-other'}`}
@@ -804,7 +860,8 @@ const Groups = () => {
                       </div>
                     )}
                   </div>
-                ))
+                ))}
+                </>
               )}
             </div>
 